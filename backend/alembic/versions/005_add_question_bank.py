@@ -0,0 +1,39 @@
+"""Add question_bank table
+
+Revision ID: 005_question_bank
+Revises: 004_refinement_date
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005_question_bank"
+down_revision: Union[str, None] = "004_refinement_date"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "question_bank",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("topic_fingerprint", sa.String(length=32), nullable=False),
+        sa.Column("difficulty", sa.String(), nullable=False),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("question_hash", sa.String(length=32), nullable=False),
+        sa.Column("times_served", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("topic_fingerprint", "question_hash", name="uq_question_bank_topic_question"),
+    )
+    op.create_index(op.f("ix_question_bank_id"), "question_bank", ["id"], unique=False)
+    op.create_index(op.f("ix_question_bank_topic_fingerprint"), "question_bank", ["topic_fingerprint"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_question_bank_topic_fingerprint"), table_name="question_bank")
+    op.drop_index(op.f("ix_question_bank_id"), table_name="question_bank")
+    op.drop_table("question_bank")
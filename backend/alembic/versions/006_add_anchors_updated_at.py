@@ -0,0 +1,27 @@
+"""Add anchors_updated_at to questions
+
+Revision ID: 006_anchors_updated_at
+Revises: 005_question_bank
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006_anchors_updated_at"
+down_revision: Union[str, None] = "005_question_bank"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "questions",
+        sa.Column("anchors_updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("questions", "anchors_updated_at")
@@ -0,0 +1,38 @@
+"""Add answer_evaluations table
+
+Revision ID: 007_answer_evaluations
+Revises: 006_anchors_updated_at
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "007_answer_evaluations"
+down_revision: Union[str, None] = "006_anchors_updated_at"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "answer_evaluations",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("question_id", sa.Integer(), nullable=False),
+        sa.Column("answer_hash", sa.String(length=32), nullable=False),
+        sa.Column("minhash", sa.JSON(), nullable=False),
+        sa.Column("evaluation", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["question_id"], ["questions.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_answer_evaluations_id"), "answer_evaluations", ["id"], unique=False)
+    op.create_index(op.f("ix_answer_evaluations_question_id"), "answer_evaluations", ["question_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_answer_evaluations_question_id"), table_name="answer_evaluations")
+    op.drop_index(op.f("ix_answer_evaluations_id"), table_name="answer_evaluations")
+    op.drop_table("answer_evaluations")
@@ -0,0 +1,39 @@
+"""Add partial index on open study sessions by last_interaction_time
+
+Revision ID: 009_open_sessions_index
+Revises: 008_idempotency_keys
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "009_open_sessions_index"
+down_revision: Union[str, None] = "008_idempotency_keys"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so study_sessions stays writable on PostgreSQL
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_study_sessions_open_last_interaction",
+            "study_sessions",
+            ["last_interaction_time"],
+            unique=False,
+            postgresql_where=sa.text("end_time IS NULL"),
+            postgresql_concurrently=True,
+            sqlite_where=sa.text("end_time IS NULL"),
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_study_sessions_open_last_interaction",
+            table_name="study_sessions",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,69 @@
+"""
+Deadlines and client-disconnect cancellation for LLM-backed routes.
+
+The llm_deadline dependency sets the route's deadline for its LLM calls
+and watches request.is_disconnected(). When the client goes away it
+cancels the request. That abandons the in-flight provider call instead of
+waiting for (and paying for) the full generation and its retries.
+Cancelled attempts and their estimated output tokens are counted by the
+LLM client.
+"""
+import asyncio
+import logging
+
+from fastapi import HTTPException, Request
+from prometheus_client import Counter
+
+from app.config import settings
+from app.llm.deadline import deadline_after
+
+logger = logging.getLogger(__name__)
+
+DISCONNECT_POLL_SECONDS = 0.25
+CLIENT_CLOSED_REQUEST = 499  # nginx's status for a request the client abandoned
+
+CLIENT_DISCONNECTS = Counter(
+    "llm_client_disconnects_total",
+    "LLM-backed requests cancelled because the client disconnected",
+    ("route",),
+)
+
+
+def deadline_seconds(route: str) -> float:
+    deadlines = settings.LLM_DEADLINE_SECONDS
+    return deadlines.get(route, deadlines["default"])
+
+
+async def _cancel_on_disconnect(request: Request, task: asyncio.Task, disconnected: asyncio.Event) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+    disconnected.set()
+    task.cancel()
+
+
+def llm_deadline(route: str):
+    """
+    Dependency giving a route's LLM calls a deadline and cancelling them if the
+    client disconnects, e.g.
+
+        @router.post("/suggest_new", dependencies=[Depends(llm_deadline("suggest_new"))])
+    """
+    async def dependency(request: Request):
+        task = asyncio.current_task()
+        disconnected = asyncio.Event()
+        watcher = asyncio.get_running_loop().create_task(_cancel_on_disconnect(request, task, disconnected))
+        try:
+            with deadline_after(deadline_seconds(route)):
+                yield
+        except asyncio.CancelledError:
+            if not disconnected.is_set():
+                raise
+            # Our own cancellation: report the abandoned request rather than unwinding the server's task
+            task.uncancel()
+            CLIENT_DISCONNECTS.labels(route).inc()
+            logger.info("Client disconnected from %s; LLM work cancelled", route)
+            raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+        finally:
+            watcher.cancel()
+
+    return dependency
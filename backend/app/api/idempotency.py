@@ -0,0 +1,285 @@
+"""
+Idempotency-Key support for mutating study endpoints.
+
+A client retrying start_session, evaluate_answer, generate_story or
+end_session with the same Idempotency-Key gets the original response replayed
+byte-for-byte instead of creating duplicate rows and LLM spend. Keys are
+scoped per user and stored in idempotency_keys for IDEMPOTENCY_TTL_SECONDS.
+
+The first request claims the key by inserting an in-progress row; a concurrent
+duplicate (in any worker) polls until that row completes, for up to
+IDEMPOTENCY_WAIT_SECONDS, then gets 409. 5xx, 429 and 499 (client
+disconnected) responses and exceptions release the key so the client can
+retry. Reusing a key with a different request body or path is rejected with
+422. Key bookkeeping is synchronous DB I/O, so it runs in a worker thread
+rather than on the event loop.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.routing import Match
+
+from app.api.cancellation import CLIENT_CLOSED_REQUEST
+from app.config import settings
+from app.database import SessionLocal
+from app.models.idempotency import IdempotencyKey
+from app.utils.clerk import get_clerk_user_id
+
+IDEMPOTENT_ROUTES = {
+    ("POST", f"{settings.API_V1_PREFIX}/study/start_session"),
+    ("POST", f"{settings.API_V1_PREFIX}/study/evaluate_answer/{{session_id}}"),
+    ("POST", f"{settings.API_V1_PREFIX}/study/generate_story/{{session_id}}"),
+    ("PUT", f"{settings.API_V1_PREFIX}/study/end_session/{{session_id}}"),
+}
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL_SECONDS = 0.05
+PURGE_EVERY_CLAIMS = 500  # expired keys are deleted opportunistically
+RETRYABLE_STATUSES = {429, CLIENT_CLOSED_REQUEST}  # released like 5xx rather than replayed
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+CLAIMED, REPLAY, MISMATCH = "claimed", "replay", "mismatch"
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def claim_key(db: Session, user_id: str, key: str, request_hash: str) -> tuple[str, IdempotencyKey | None]:
+    """
+    Try to take ownership of a key. Returns (CLAIMED, None), (REPLAY, record),
+    (MISMATCH, record) or (IN_PROGRESS, None) when another request holds it.
+    """
+    now = datetime.now(timezone.utc)
+    record = db.get(IdempotencyKey, (user_id, key), populate_existing=True)
+    if record is not None:
+        expired = _utc(record.expires_at) <= now
+        abandoned = record.status == IN_PROGRESS and now - _utc(record.created_at) > timedelta(
+            seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS
+        )
+        if expired or abandoned:
+            db.delete(record)
+            db.commit()
+            record = None
+
+    if record is None:
+        db.add(IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            status=IN_PROGRESS,
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+        ))
+        try:
+            db.commit()
+            return CLAIMED, None
+        except IntegrityError:
+            # Lost the race to a concurrent duplicate
+            db.rollback()
+            record = db.get(IdempotencyKey, (user_id, key), populate_existing=True)
+            if record is None:
+                return IN_PROGRESS, None
+
+    if record.request_hash != request_hash:
+        return MISMATCH, record
+    if record.status == COMPLETED:
+        return REPLAY, record
+    return IN_PROGRESS, None
+
+
+def complete_key(db: Session, user_id: str, key: str, status: int, headers: list, body: bytes) -> None:
+    db.query(IdempotencyKey).filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key).update({
+        IdempotencyKey.status: COMPLETED,
+        IdempotencyKey.response_status: status,
+        IdempotencyKey.response_headers: headers,
+        IdempotencyKey.response_body: body,
+    })
+    db.commit()
+
+
+def release_key(db: Session, user_id: str, key: str) -> None:
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.status == IN_PROGRESS,
+    ).delete()
+    db.commit()
+
+
+def purge_expired_keys(db: Session) -> int:
+    deleted = db.query(IdempotencyKey).filter(IdempotencyKey.expires_at <= datetime.now(timezone.utc)).delete()
+    db.commit()
+    return deleted
+
+
+async def _send_response(send, status: int, headers: list, body: bytes) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_error(send, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await _send_response(send, status, [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ], body)
+
+
+class IdempotencyMiddleware:
+    """Pure ASGI middleware applying Idempotency-Key semantics to IDEMPOTENT_ROUTES"""
+
+    def __init__(
+        self,
+        app,
+        routes,
+        idempotent_routes=IDEMPOTENT_ROUTES,
+        session_factory: Callable[[], Session] | None = None,  # defaults to SessionLocal
+    ):
+        self.app = app
+        self.routes = routes
+        self.idempotent_routes = idempotent_routes
+        self.session_factory = session_factory
+        self._claims = 0
+
+    @contextmanager
+    def _db_session(self):
+        db = (self.session_factory or SessionLocal)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _claim(self, user_id: str, key: str, request_hash: str) -> tuple[str, tuple | None]:
+        """claim_key in a fresh session; a replay comes back as (status, headers, body)"""
+        with self._db_session() as db:
+            outcome, record = claim_key(db, user_id, key, request_hash)
+            if outcome == REPLAY:
+                return outcome, (record.response_status, record.response_headers, record.response_body)
+            return outcome, None
+
+    async def _in_thread(self, fn, *args):
+        """Run fn(db, *args) with a fresh session in a worker thread"""
+        def call():
+            with self._db_session() as db:
+                return fn(db, *args)
+
+        return await asyncio.to_thread(call)
+
+    def _applies(self, scope) -> bool:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return (scope["method"], getattr(route, "path_format", route.path)) in self.idempotent_routes
+        return False
+
+    @staticmethod
+    def _user_id(headers: dict) -> str | None:
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if not authorization.lower().startswith("bearer "):
+            return None
+        try:
+            return get_clerk_user_id(authorization[7:])
+        except HTTPException:
+            return None  # let the route reject the credentials
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        key = headers.get(HEADER, b"").decode("latin-1").strip()
+        if not key or not self._applies(scope):
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await _send_error(send, 400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+            return
+        user_id = self._user_id(headers)
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Buffer the body so it can be fingerprinted and then handed to the app
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+        request_hash = hashlib.sha256(
+            b"\0".join([scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            outcome, stored = await asyncio.to_thread(self._claim, user_id, key, request_hash)
+            if outcome == REPLAY:
+                stored_status, stored_headers, stored_body = stored
+                await _send_response(
+                    send,
+                    stored_status,
+                    [(n.encode("latin-1"), v.encode("latin-1")) for n, v in stored_headers]
+                    + [(b"idempotent-replayed", b"true")],
+                    stored_body,
+                )
+                return
+            if outcome == MISMATCH:
+                await _send_error(send, 422, "Idempotency-Key was already used for a different request")
+                return
+            if outcome == CLAIMED:
+                self._claims += 1
+                if self._claims % PURGE_EVERY_CLAIMS == 0:
+                    await self._in_thread(purge_expired_keys)
+                break
+            if time.monotonic() >= deadline:
+                await _send_error(send, 409, "A request with this Idempotency-Key is still being processed")
+                return
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status = None
+        response_headers: list = []
+        response_body = bytearray()
+
+        async def capture_send(message):
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = [
+                    [bytes(n).decode("latin-1"), bytes(v).decode("latin-1")] for n, v in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                response_body.extend(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        except BaseException:
+            # The thread finishes the release even if this task is cancelled again meanwhile
+            await self._in_thread(release_key, user_id, key)
+            raise
+        if status is not None and status < 500 and status not in RETRYABLE_STATUSES:
+            await self._in_thread(complete_key, user_id, key, status, response_headers, bytes(response_body))
+        else:
+            # Transient failures (e.g. LLM unavailable, throttled, dropped connection) stay retryable under the same key
+            await self._in_thread(release_key, user_id, key)
@@ -0,0 +1,169 @@
+"""
+Adaptive load shedding for LLM-backed endpoints.
+
+All LLM routes in a worker share one concurrency limit that follows the
+provider's latency, in the style of a gradient limiter. A slow moving
+baseline of request latency is compared with each new sample. Only
+requests that actually called the provider give a sample; ones served
+from the question bank, the answer reuse index and so on just free
+their slot, so cache hits don't drag the baseline down. While
+latency stays within LOAD_SHEDDING_LATENCY_TOLERANCE of the baseline the
+limit grows by about sqrt(limit). As latency rises the limit shrinks in
+proportion, and each 5xx cuts it by BACKOFF.
+
+Requests beyond the limit are rejected at once with 503 and Retry-After
+rather than queueing until they time out. Read-only endpoints don't take
+this dependency and keep serving normally. Optional LLM work (the
+start_session question prefetch, end_session's reconciliation) takes a
+slot through run_admitted and is skipped when there is none.
+"""
+import math
+import time
+from typing import Any, Awaitable, Callable
+
+from fastapi import HTTPException, Request
+from prometheus_client import Counter, Gauge
+
+from app.config import settings
+from app.observability.context import RequestStats, current_request_stats
+
+SMOOTHING = 0.2  # weight of each new limit estimate
+BASELINE_WINDOW = 500  # samples; the baseline latency is an EWMA over roughly this many
+BACKOFF = 0.9  # multiplicative decrease on 5xx
+
+LLM_CONCURRENCY_LIMIT = Gauge("llm_concurrency_limit", "Current adaptive limit on in-flight LLM requests")
+LLM_IN_FLIGHT = Gauge("llm_requests_in_flight", "In-flight requests on LLM-backed routes")
+LOAD_SHED = Counter("load_shed_total", "LLM-backed requests rejected with 503 by the adaptive limiter", ("route",))
+
+
+class AdaptiveConcurrencyLimiter:
+    """Gradient-style concurrency limit driven by observed latency"""
+
+    def __init__(self, initial_limit: float, min_limit: int, max_limit: int, tolerance: float):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self.baseline: float | None = None  # seconds
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        LLM_IN_FLIGHT.set(self.in_flight)
+        return True
+
+    def release(self, latency: float | None = None, failed: bool = False) -> None:
+        """Return a slot; latency feeds the limit, failed backs off, neither (e.g. cancelled) just frees it"""
+        in_flight = self.in_flight
+        self.in_flight -= 1
+        LLM_IN_FLIGHT.set(self.in_flight)
+        if failed:
+            self._set_limit(self.limit * BACKOFF)
+        elif latency is not None and latency > 0:
+            self._observe(latency, in_flight)
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.baseline or 1))
+
+    def _observe(self, latency: float, in_flight: int) -> None:
+        if self.baseline is None:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) / BASELINE_WINDOW
+            # Recover quickly if a past slowdown left the baseline well above current latency
+            if self.baseline > 2 * latency:
+                self.baseline *= 0.95
+        gradient = max(0.5, min(1.0, self.tolerance * self.baseline / latency))
+        # Don't grow the limit on behalf of traffic that isn't using it
+        headroom = math.sqrt(self.limit) if in_flight >= self.limit / 2 else 0.0
+        estimate = self.limit * gradient + headroom
+        self._set_limit(self.limit * (1 - SMOOTHING) + estimate * SMOOTHING)
+
+    def _set_limit(self, limit: float) -> None:
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), limit))
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+
+def _new_limiter() -> AdaptiveConcurrencyLimiter:
+    return AdaptiveConcurrencyLimiter(
+        initial_limit=settings.LOAD_SHEDDING_INITIAL_LIMIT,
+        min_limit=settings.LOAD_SHEDDING_MIN_LIMIT,
+        max_limit=settings.LOAD_SHEDDING_MAX_LIMIT,
+        tolerance=settings.LOAD_SHEDDING_LATENCY_TOLERANCE,
+    )
+
+
+llm_limiter = _new_limiter()
+
+
+def reset_load_shedding() -> None:
+    """Start over from the configured initial limit (e.g. between tests)"""
+    global llm_limiter
+    llm_limiter = _new_limiter()
+
+
+def _provider_latency(stats: RequestStats | None, calls_before: int, started: float) -> float | None:
+    """Latency sample for the limiter, or None if the work was served without a provider call"""
+    if stats is not None and stats.llm_calls == calls_before:
+        return None
+    return time.perf_counter() - started
+
+
+async def shed_load(request: Request):
+    """Dependency admitting a request to an LLM-backed route, or rejecting it with 503"""
+    if not settings.LOAD_SHEDDING_ENABLED:
+        yield
+        return
+    limiter = llm_limiter
+    if not limiter.try_acquire():
+        route = request.scope.get("route")
+        LOAD_SHED.labels(getattr(route, "name", request.url.path)).inc()
+        raise HTTPException(
+            status_code=503,
+            detail="Service is busy. Please try again shortly.",
+            headers={"Retry-After": str(limiter.retry_after)},
+        )
+    stats = current_request_stats()
+    calls_before = stats.llm_calls if stats is not None else 0
+    started = time.perf_counter()
+    try:
+        yield
+    except HTTPException as e:
+        # 4xx responses are rejected before reaching the LLM, so they say nothing about its latency
+        limiter.release(failed=e.status_code >= 500)
+        raise
+    except Exception:
+        limiter.release(failed=True)
+        raise
+    except BaseException:
+        limiter.release()
+        raise
+    else:
+        limiter.release(_provider_latency(stats, calls_before, started))
+
+
+async def run_admitted(route: str, work: Callable[[], Awaitable[Any]]) -> Any | None:
+    """Run optional LLM work in a limiter slot; None, without running it, if shedding"""
+    if not settings.LOAD_SHEDDING_ENABLED:
+        return await work()
+    limiter = llm_limiter
+    if not limiter.try_acquire():
+        LOAD_SHED.labels(route).inc()
+        return None
+    stats = current_request_stats()
+    calls_before = stats.llm_calls if stats is not None else 0
+    started = time.perf_counter()
+    try:
+        result = await work()
+    except Exception:
+        limiter.release(failed=True)
+        raise
+    except BaseException:
+        limiter.release()
+        raise
+    limiter.release(_provider_latency(stats, calls_before, started))
+    return result
@@ -0,0 +1,236 @@
+"""
+Per-user admission control for LLM-backed endpoints.
+
+Each (route, user) pair gets a token bucket refilled at per_minute tokens per
+minute up to burst, plus a cap on concurrent in-flight requests. Requests
+over either limit get 429 with Retry-After. Limits are RATE_LIMIT_DEFAULT
+overlaid with the route's RATE_LIMITS entry.
+
+State is kept in process by default. With RATE_LIMIT_BACKEND="redis" it is
+shared through RATE_LIMIT_REDIS_URL so limits hold across workers, using the
+redis package from requirements.txt.
+"""
+import math
+import time
+from dataclasses import dataclass
+from typing import Protocol
+
+from fastapi import Depends, HTTPException
+from prometheus_client import Counter
+
+from app.api.dependencies import get_current_user
+from app.config import settings
+from app.models.user import User
+
+CONCURRENCY_RETRY_AFTER_SECONDS = 1
+CONCURRENCY_KEY_TTL_SECONDS = 300  # shared slot counters expire if a worker dies holding them
+MAX_BUCKETS = 10000  # in-memory buckets; full ones are pruned past this
+
+RATE_LIMITED = Counter(
+    "rate_limited_total",
+    "Requests rejected with 429 by route and reason: rate, concurrency, or skipped (optional LLM work not run)",
+    ("route", "reason"),
+)
+
+
+@dataclass(frozen=True)
+class RouteLimits:
+    per_minute: float
+    burst: float
+    concurrency: int
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60
+
+
+def limits_for(route: str) -> RouteLimits:
+    values = {**settings.RATE_LIMIT_DEFAULT, **settings.RATE_LIMITS.get(route, {})}
+    return RouteLimits(
+        per_minute=float(values["per_minute"]),
+        burst=float(values["burst"]),
+        concurrency=int(values["concurrency"]),
+    )
+
+
+class RateLimitBackend(Protocol):
+    async def take_token(self, key: str, limits: RouteLimits) -> float:
+        """Consume one token; returns 0 on success, else seconds until one is available"""
+
+    async def acquire_slot(self, key: str, limits: RouteLimits) -> bool: ...
+
+    async def release_slot(self, key: str) -> None: ...
+
+
+class InMemoryBackend:
+    """Buckets and slot counts for this process only"""
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float, float]] = {}  # key -> (tokens, updated, refill seconds)
+        self._slots: dict[str, int] = {}
+        self._prune_at = 0  # bucket count that triggers the next prune
+
+    async def take_token(self, key: str, limits: RouteLimits) -> float:
+        now = time.monotonic()
+        tokens, updated, _ = self._buckets.get(key, (limits.burst, now, 0.0))
+        tokens = min(limits.burst, tokens + (now - updated) * limits.per_second)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / limits.per_second
+        # Routes refill at different rates, so each bucket keeps its own refill time for pruning
+        self._buckets[key] = (tokens, now, limits.burst / limits.per_second)
+        if len(self._buckets) > max(MAX_BUCKETS, self._prune_at):
+            self._prune(now)
+        return retry_after
+
+    async def acquire_slot(self, key: str, limits: RouteLimits) -> bool:
+        in_flight = self._slots.get(key, 0)
+        if in_flight >= limits.concurrency:
+            return False
+        self._slots[key] = in_flight + 1
+        return True
+
+    async def release_slot(self, key: str) -> None:
+        in_flight = self._slots.get(key, 0) - 1
+        if in_flight > 0:
+            self._slots[key] = in_flight
+        else:
+            self._slots.pop(key, None)
+
+    def reset(self) -> None:
+        self._buckets.clear()
+        self._slots.clear()
+        self._prune_at = 0
+
+    def _prune(self, now: float) -> None:
+        # A bucket that would have refilled by now is indistinguishable from a missing one
+        for key in [k for k, (_, updated, refill) in self._buckets.items() if now - updated >= refill]:
+            del self._buckets[key]
+        # Scan again only once the live buckets have doubled, so each scan is paid for by
+        # as many inserts as it visits instead of running on every request past the cap
+        self._prune_at = 2 * len(self._buckets)
+
+
+_TAKE_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class RedisBackend:
+    """Buckets and slot counts shared by all workers through Redis"""
+
+    def __init__(self, url: str, prefix: str = "rate_limit:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError('RATE_LIMIT_BACKEND="redis" requires the redis package') from e
+        self._redis = redis_asyncio.from_url(url)
+        self._take_token = self._redis.register_script(_TAKE_TOKEN_SCRIPT)
+        self.prefix = prefix
+
+    async def take_token(self, key: str, limits: RouteLimits) -> float:
+        # Redis server time, so workers with skewed clocks share one refill schedule
+        seconds, micros = await self._redis.time()
+        retry_after = await self._take_token(
+            keys=[f"{self.prefix}bucket:{key}"],
+            args=[limits.per_second, limits.burst, seconds + micros / 1e6],
+        )
+        return float(retry_after)
+
+    async def acquire_slot(self, key: str, limits: RouteLimits) -> bool:
+        slot_key = f"{self.prefix}slots:{key}"
+        async with self._redis.pipeline(transaction=True) as pipe:
+            in_flight, _ = await pipe.incr(slot_key).expire(slot_key, CONCURRENCY_KEY_TTL_SECONDS).execute()
+        if in_flight > limits.concurrency:
+            await self._redis.decr(slot_key)
+            return False
+        return True
+
+    async def release_slot(self, key: str) -> None:
+        await self._redis.decr(f"{self.prefix}slots:{key}")
+
+
+_backend: RateLimitBackend | None = None
+
+
+def get_rate_limit_backend() -> RateLimitBackend:
+    global _backend
+    if _backend is None:
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            _backend = RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+        else:
+            _backend = InMemoryBackend()
+    return _backend
+
+
+def reset_rate_limits() -> None:
+    """Forget in-process limiter state (e.g. between tests)"""
+    global _backend
+    _backend = None
+
+
+def _bucket_key(route: str, user_id: str) -> str:
+    return f"{route}:{user_id}"
+
+
+async def take_optional_token(route: str, user_id: str) -> bool:
+    """Charge optional LLM work (e.g. a prefetch) to the user's bucket for route; False, to skip it, if over"""
+    if not settings.RATE_LIMIT_ENABLED:
+        return True
+    if await get_rate_limit_backend().take_token(_bucket_key(route, user_id), limits_for(route)) > 0:
+        RATE_LIMITED.labels(route, "skipped").inc()
+        return False
+    return True
+
+
+def rate_limit(route: str):
+    """
+    Dependency enforcing the per-user limits configured for route, e.g.
+
+        @router.post("/suggest_new", dependencies=[Depends(rate_limit("suggest_new"))])
+    """
+    async def dependency(current_user: User = Depends(get_current_user)):
+        if not settings.RATE_LIMIT_ENABLED:
+            yield
+            return
+        limits = limits_for(route)
+        backend = get_rate_limit_backend()
+        key = _bucket_key(route, current_user.clerk_user_id)
+        if not await backend.acquire_slot(key, limits):
+            RATE_LIMITED.labels(route, "concurrency").inc()
+            raise HTTPException(
+                status_code=429,
+                detail="Too many concurrent requests. Please wait for the previous one to finish.",
+                headers={"Retry-After": str(CONCURRENCY_RETRY_AFTER_SECONDS)},
+            )
+        try:
+            retry_after = await backend.take_token(key, limits)
+            if retry_after > 0:
+                RATE_LIMITED.labels(route, "rate").inc()
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests. Please slow down.",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+            yield
+        finally:
+            await backend.release_slot(key)
+
+    return dependency
@@ -3,6 +3,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.api.dependencies import get_current_user
+from app.api.cancellation import llm_deadline
+from app.api.load_shedding import shed_load
+from app.api.rate_limit import rate_limit
 from app.models.user import User
 from app.models.plan import PlanTopic, TopicProgress
 from app.models.session import RawUserContext
@@ -16,6 +19,7 @@ from app.schemas.plan import (
 )
 from app.llm.suggest_plan import suggest_plan
 from app.llm.suggest_changes import suggest_plan_changes
+from app.services.session_context import session_contexts
 
 router = APIRouter(prefix="/plan", tags=["plan"])
 
@@ -56,7 +60,11 @@ async def update_user_context(
     return UserContextResponse(context_text=ctx.context_text or "")
 
 
-@router.post("/suggest_new", response_model=PlanResponse)
+@router.post(
+    "/suggest_new",
+    response_model=PlanResponse,
+    dependencies=[Depends(rate_limit("suggest_new")), Depends(shed_load), Depends(llm_deadline("suggest_new"))],
+)
 async def suggest_new_plan(
     request: SuggestNewPlanRequest,
     current_user: User = Depends(get_current_user),
@@ -92,7 +100,11 @@ async def can_refine_plan(
     return {"can_refine": can_refine}
 
 
-@router.post("/suggest_changes", response_model=PlanResponse)
+@router.post(
+    "/suggest_changes",
+    response_model=PlanResponse,
+    dependencies=[Depends(rate_limit("suggest_changes")), Depends(shed_load), Depends(llm_deadline("suggest_changes"))],
+)
 async def suggest_plan_changes_endpoint(
     request: SuggestChangesRequest,
     current_user: User = Depends(get_current_user),
@@ -160,6 +172,9 @@ async def approve_plan(
         # Refresh to get IDs
         for topic in created_topics:
             db.refresh(topic)
+
+        # Open sessions' cached topic details refer to the replaced topics
+        session_contexts.invalidate_user(current_user.clerk_user_id)
         
         return {
             "status": "success",
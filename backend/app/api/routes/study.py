@@ -1,7 +1,13 @@
+from functools import partial
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.database import get_db
 from app.api.dependencies import get_current_user
+from app.api.cancellation import deadline_seconds, llm_deadline
+from app.api.load_shedding import run_admitted, shed_load
+from app.api.rate_limit import rate_limit, take_optional_token
 from app.models.user import User
 from app.models.session import StudySession
 from app.models.question import QuestionAttempt, Question, StoryStructure
@@ -16,10 +22,17 @@ from app.schemas.question import (
     StoryStructureResponse,
     UpdateStoryRequest,
 )
-from app.llm.generate_questions import generate_questions
 from app.llm.evaluate_answer import evaluate_answer
 from app.llm.reconcile_session import reconcile_session
 from app.llm.generate_story_structure import generate_story_structure
+from app.llm.deadline import deadline_after
+from app.services.answer_anchors import anchors_are_stale, schedule_anchor_refresh
+from app.services.answer_reuse import answer_index
+from app.services.question_bank import complete_question_set, plan_question_set, top_up
+from app.services.interaction_heartbeats import touch_session
+from app.services.session_context import SessionContext, session_contexts
+from app.services.question_prefetch import question_prefetcher
+from app.observability.context import end_request_stats, start_request_stats
 from datetime import datetime, timezone
 
 router = APIRouter(prefix="/study", tags=["study"])
@@ -51,25 +64,22 @@ async def suggested_session(
         .all()
     )
     progress_by_topic = {p.topic_id: p for p in progress}
-    last_session_by_topic = {}
-    for tid in topic_ids:
-        last = (
-            db.query(StudySession)
-            .filter(
-                StudySession.user_id == current_user.clerk_user_id,
-                StudySession.topic_id == tid,
-            )
-            .order_by(StudySession.start_time.desc())
-            .first()
+    # Latest session start per topic in one grouped query
+    last_start_by_topic = dict(
+        db.query(StudySession.topic_id, func.max(StudySession.start_time))
+        .filter(
+            StudySession.user_id == current_user.clerk_user_id,
+            StudySession.topic_id.in_(topic_ids),
         )
-        last_session_by_topic[tid] = last
+        .group_by(StudySession.topic_id)
+        .all()
+    )
     now = datetime.utcnow()
     candidates = []
     for t in topics:
-        last_sess = last_session_by_topic.get(t.id)
+        st = last_start_by_topic.get(t.id)
         days_since = None
-        if last_sess and last_sess.start_time:
-            st = last_sess.start_time
+        if st:
             st_naive = st.replace(tzinfo=None) if getattr(st, "tzinfo", None) else st
             days_since = (now - st_naive).days
         prog = progress_by_topic.get(t.id)
@@ -92,12 +102,12 @@ async def suggested_session(
         "topic_id": best.id,
         "topic_name": best.name,
         "planned_study_time": best.planned_daily_study_time,
-        "reason": _suggested_reason(best, last_session_by_topic.get(best.id), progress_by_topic.get(best.id)),
+        "reason": _suggested_reason(best, last_start_by_topic.get(best.id), progress_by_topic.get(best.id)),
     }
 
 
-def _suggested_reason(topic: PlanTopic, last_session, progress) -> str:
-    if not last_session:
+def _suggested_reason(topic: PlanTopic, last_start_time, progress) -> str:
+    if not last_start_time:
         return f"You haven't studied {topic.name} yet."
     strength = progress.strength_rating if progress else None
     if strength is not None and strength < 6:
@@ -142,10 +152,66 @@ async def start_session(
     db.add(session)
     db.commit()
     db.refresh(session)
+
+    # Cache what the per-answer endpoints need, so they don't re-read the session and topic
+    topic = db.query(PlanTopic).filter(PlanTopic.id == session.topic_id).first()
+    session_contexts.put(SessionContext(
+        session_id=session.id,
+        user_id=current_user.clerk_user_id,
+        topic_id=session.topic_id,
+        topic_name=topic.name if topic else None,
+        topic_description=topic.description if topic else None,
+    ))
+
+    # The client asks for questions next; pick them from the bank and start any LLM top-up now
+    if settings.QUESTION_PREFETCH_ENABLED and topic:
+        previously_asked = _previously_asked(db, topic.id)
+        question_plan = plan_question_set(db, topic.name, topic.description or "", previously_asked)
+        question_prefetcher.start(session.id, partial(
+            _prefetch_questions,
+            current_user.clerk_user_id,
+            partial(top_up, question_plan, topic.name, topic.description or "", previously_asked),
+        ))
     return session
 
 
-@router.put("/end_session/{session_id}", response_model=StudySessionResponse)
+async def _prefetch_questions(user_id: str, generate):
+    """
+    start_session's background question generation, limited like a generate_questions request:
+    charged to the user's bucket, admitted by the load-shedding limiter (skipped, returning None,
+    when either refuses) and bounded by the route's deadline.
+    """
+    if not await take_optional_token("generate_questions", user_id):
+        return None
+    # Count the prefetch's provider calls on their own, not on the start_session request that scheduled it
+    _, token = start_request_stats()
+    try:
+        with deadline_after(deadline_seconds("generate_questions")):
+            return await run_admitted("start_session_prefetch", generate)
+    finally:
+        end_request_stats(token)
+
+
+@router.post("/heartbeat/{session_id}", status_code=204)
+async def session_heartbeat(
+    session_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Record that the user is still working in a session (e.g. from the timer).
+    """
+    _session_context(db, session_id, current_user)
+    touch_session(db, session_id)
+    db.commit()
+
+
+@router.put(
+    "/end_session/{session_id}",
+    response_model=StudySessionResponse,
+    # Never rate limited or shed: ending a session always succeeds, only its reconciliation is optional
+    dependencies=[Depends(llm_deadline("end_session"))],
+)
 async def end_session(
     session_id: int,
     current_user: User = Depends(get_current_user),
@@ -153,6 +219,9 @@ async def end_session(
 ):
     """
     End a study session and trigger reconciliation.
+
+    Reconciliation is skipped, and the session closed without a strength rating,
+    when the user is over the end_session rate limit or the LLM is shedding load.
     """
     session = db.query(StudySession).filter(
         StudySession.id == session_id,
@@ -161,16 +230,15 @@ async def end_session(
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+    if session.end_time is not None:
+        # Already ended (e.g. auto-closed by the stale-session sweeper); don't count its time twice
+        return session
     
-    session.end_time = datetime.now(timezone.utc)
+    question_prefetcher.discard(session_id)
+    session_contexts.invalidate(session_id)
 
     # Gather question attempts for this session
-    attempts = (
-        db.query(QuestionAttempt, Question)
-        .join(Question, Question.id == QuestionAttempt.question_id)
-        .filter(QuestionAttempt.study_session_id == session_id)
-        .all()
-    )
+    attempts = _session_attempts(db, session_id)
 
     question_attempt_dicts = [
         {
@@ -180,23 +248,47 @@ async def end_session(
         }
         for attempt, question in attempts
     ]
+    user_id = current_user.clerk_user_id  # read before the commit expires it
+    # Don't keep a transaction open across the LLM call
+    db.commit()
 
     # Call LLM to reconcile the session and summarize performance (graceful: session still ends if LLM fails)
     avg_score = None
-    if question_attempt_dicts:
+    if question_attempt_dicts and await take_optional_token("end_session", user_id):
         try:
-            summary = await reconcile_session(question_attempt_dicts)
-            best_scores = [qa.best_score for qa in summary.question_attempts]
+            summary = await run_admitted("end_session", partial(reconcile_session, question_attempt_dicts))
+            best_scores = [qa.best_score for qa in summary.question_attempts] if summary else []
             if best_scores:
                 avg_score = int(sum(best_scores) / len(best_scores))
         except Exception:
             pass  # Session still ends; topic progress updated without avg_score
 
+    _close_session(db, session, avg_score)
+    db.refresh(session)
+
+    return session
+
+
+def _close_session(db: Session, session: StudySession, avg_score: int | None) -> bool:
+    """
+    End a session and add its time to topic progress in one short transaction.
+
+    The conditional UPDATE claims the session, so one the stale-session sweeper (or a
+    concurrent end_session) closed meanwhile isn't counted twice. Returns whether it was claimed.
+    """
+    claimed = db.query(StudySession).filter(
+        StudySession.id == session.id,
+        StudySession.end_time.is_(None),
+    ).update({StudySession.end_time: datetime.now(timezone.utc)}, synchronize_session=False)
+    if not claimed:
+        db.rollback()
+        return False
+
     # Update topic progress for this user/topic
     topic_progress = (
         db.query(TopicProgress)
         .filter(
-            TopicProgress.user_id == current_user.clerk_user_id,
+            TopicProgress.user_id == session.user_id,
             TopicProgress.topic_id == session.topic_id,
         )
         .first()
@@ -204,7 +296,7 @@ async def end_session(
 
     if not topic_progress:
         topic_progress = TopicProgress(
-            user_id=current_user.clerk_user_id,
+            user_id=session.user_id,
             topic_id=session.topic_id,
             strength_rating=avg_score,
             total_time_spent=session.planned_duration,
@@ -216,12 +308,50 @@ async def end_session(
         topic_progress.total_time_spent = (topic_progress.total_time_spent or 0) + session.planned_duration
 
     db.commit()
-    db.refresh(session)
+    return True
 
-    return session
+
+def _session_context(db: Session, session_id: int, user: User) -> SessionContext:
+    """The user's session and its topic, from the active-session cache when possible."""
+    context = session_contexts.load(db, session_id, user.clerk_user_id)
+    if context is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return context
+
+
+def _session_attempts(db: Session, session_id: int) -> list[tuple[QuestionAttempt, Question]]:
+    """All attempts in a session joined to their questions (used by end_session)."""
+    return (
+        db.query(QuestionAttempt, Question)
+        .join(Question, Question.id == QuestionAttempt.question_id)
+        .filter(QuestionAttempt.study_session_id == session_id)
+        .all()
+    )
+
+
+def _topic_attempt_history(db: Session, topic_id: int) -> list[tuple[Question, QuestionAttempt]]:
+    """Every attempt at every question in a topic (used by generate_questions)."""
+    return (
+        db.query(Question, QuestionAttempt)
+        .join(QuestionAttempt, Question.id == QuestionAttempt.question_id)
+        .filter(Question.topic_id == topic_id)
+        .all()
+    )
+
+
+def _previously_asked(db: Session, topic_id: int) -> list[dict]:
+    """Previously asked questions for a topic with their attempt scores."""
+    return [
+        {"question": question.question, "rating": attempt.score_rating or 0}
+        for question, attempt in _topic_attempt_history(db, topic_id)
+    ]
 
 
-@router.post("/generate_questions/{session_id}", response_model=GenerateQuestionsResponse)
+@router.post(
+    "/generate_questions/{session_id}",
+    response_model=GenerateQuestionsResponse,
+    dependencies=[Depends(rate_limit("generate_questions")), Depends(shed_load), Depends(llm_deadline("generate_questions"))],
+)
 async def generate_questions_endpoint(
     session_id: int,
     current_user: User = Depends(get_current_user),
@@ -230,49 +360,37 @@ async def generate_questions_endpoint(
     """
     Generate questions for a study session.
     """
-    session = db.query(StudySession).filter(
-        StudySession.id == session_id,
-        StudySession.user_id == current_user.clerk_user_id
-    ).first()
-    
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Get topic information
-    topic = db.query(PlanTopic).filter(PlanTopic.id == session.topic_id).first()
-    if not topic:
-        raise HTTPException(status_code=404, detail="Topic not found for session")
-    
-    # Get previously asked questions for this topic with their attempt scores
-    previously_asked = []
-    existing_questions = (
-        db.query(Question, QuestionAttempt)
-        .join(QuestionAttempt, Question.id == QuestionAttempt.question_id)
-        .filter(Question.topic_id == session.topic_id)
-        .all()
-    )
-    
-    for question, attempt in existing_questions:
-        previously_asked.append({
-            "question": question.question,
-            "rating": attempt.score_rating or 0
-        })
-    
-    try:
-        result = await generate_questions(
-            topic_name=topic.name,
-            topic_description=topic.description or "",
-            previously_asked=previously_asked if previously_asked else None
-        )
-        return {"questions": [q.model_dump() for q in result.questions]}
-    except Exception as e:
-        raise HTTPException(
-            status_code=503,
-            detail="LLM temporarily unavailable. Please try again.",
-        )
+    context = _session_context(db, session_id, current_user)
+
+    # Question set prepared in the background at start_session (awaits it if still running)
+    question_plan = await question_prefetcher.claim(session_id)
+    if question_plan is None:
+        if context.topic_name is None:
+            raise HTTPException(status_code=404, detail="Topic not found for session")
+        topic_description = context.topic_description or ""
 
+        # Get previously asked questions for this topic with their attempt scores
+        previously_asked = _previously_asked(db, context.topic_id)
 
-@router.post("/evaluate_answer/{session_id}", response_model=EvaluateAnswerResponse)
+        # Serve what the shared question bank has; the LLM only fills the gaps
+        question_plan = plan_question_set(db, context.topic_name, topic_description, previously_asked)
+        try:
+            question_plan = await top_up(question_plan, context.topic_name, topic_description, previously_asked)
+        except Exception as e:
+            raise HTTPException(
+                status_code=503,
+                detail="LLM temporarily unavailable. Please try again.",
+            )
+
+    questions = complete_question_set(db, question_plan)
+    return {"questions": [q.model_dump() for q in questions]}
+
+
+@router.post(
+    "/evaluate_answer/{session_id}",
+    response_model=EvaluateAnswerResponse,
+    dependencies=[Depends(rate_limit("evaluate_answer")), Depends(shed_load), Depends(llm_deadline("evaluate_answer"))],
+)
 async def evaluate_answer_endpoint(
     session_id: int,
     request: EvaluateAnswerRequest,
@@ -282,48 +400,58 @@ async def evaluate_answer_endpoint(
     """
     Evaluate a user's answer to a question.
     """
-    session = db.query(StudySession).filter(
-        StudySession.id == session_id,
-        StudySession.user_id == current_user.clerk_user_id
-    ).first()
-    
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Get topic for context
-    topic = db.query(PlanTopic).filter(PlanTopic.id == session.topic_id).first()
-    question_context = topic.description if topic else None
+    context = _session_context(db, session_id, current_user)
+    question_context = context.topic_description
+
+    # Existing Question record for this topic; its stored anchors become the rubric
+    question = (
+        db.query(Question)
+        .filter(
+            Question.topic_id == context.topic_id,
+            Question.question == request.question
+        )
+        .first()
+    )
+    stored_anchors = question.answer_anchors if question and settings.ANSWER_ANCHORS_REUSE else None
+
+    # Resubmitted (identical or near-identical) answers get the stored evaluation back
+    if question and settings.ANSWER_REUSE_ENABLED:
+        reused = answer_index.lookup(db, question.id, request.raw_answer)
+        if reused is not None:
+            db.add(QuestionAttempt(
+                question_id=question.id,
+                study_session_id=session_id,
+                raw_answer=request.raw_answer,
+                score_rating=reused.score,
+                answer_time_seconds=request.answer_time_seconds,
+            ))
+            touch_session(db, session_id)
+            db.commit()
+            return reused.model_dump()
     
     try:
-        # Evaluate the answer using LLM
+        # Evaluate the answer using LLM (score and feedback only when anchors are stored)
         result = await evaluate_answer(
             question=request.question,
             answer=request.raw_answer,
-            question_context=question_context
-        )
-        
-        # Find or create Question record for this topic
-        question = (
-            db.query(Question)
-            .filter(
-                Question.topic_id == session.topic_id,
-                Question.question == request.question
-            )
-            .first()
+            question_context=question_context,
+            anchors=stored_anchors or None,
         )
         
         anchors_payload = [{"name": a.name, "anchor": a.anchor} for a in result.anchors] if result.anchors else None
         if not question:
             question = Question(
-                topic_id=session.topic_id,
+                topic_id=context.topic_id,
                 question=request.question,
                 answer_anchors=anchors_payload,
+                anchors_updated_at=datetime.now(timezone.utc) if anchors_payload else None,
             )
             db.add(question)
             db.flush()  # Get question.id without committing
-        else:
-            # Update anchors from latest evaluation (best anchors)
-            question.answer_anchors = anchors_payload if anchors_payload else question.answer_anchors
+        elif not stored_anchors and anchors_payload:
+            # Anchors were generated by this evaluation
+            question.answer_anchors = anchors_payload
+            question.anchors_updated_at = datetime.now(timezone.utc)
         
         # Create QuestionAttempt record
         attempt = QuestionAttempt(
@@ -334,11 +462,16 @@ async def evaluate_answer_endpoint(
             answer_time_seconds=request.answer_time_seconds,
         )
         db.add(attempt)
+        if settings.ANSWER_REUSE_ENABLED:
+            answer_index.add(db, question.id, request.raw_answer, result)
         
         # Update session last interaction time
-        session.last_interaction_time = datetime.now(timezone.utc)
+        touch_session(db, session_id)
         
         db.commit()
+
+        if stored_anchors and anchors_are_stale(question):
+            schedule_anchor_refresh(db, question.id, request.question, question_context)
         
         return result.model_dump()
     except Exception as e:
@@ -349,7 +482,10 @@ async def evaluate_answer_endpoint(
         )
 
 
-@router.post("/generate_story/{session_id}")
+@router.post(
+    "/generate_story/{session_id}",
+    dependencies=[Depends(rate_limit("generate_story")), Depends(shed_load), Depends(llm_deadline("generate_story"))],
+)
 async def generate_story_endpoint(
     session_id: int,
     request: GenerateStoryRequest,
@@ -360,14 +496,8 @@ async def generate_story_endpoint(
     Generate a story structure for a question and save it.
     Returns question_id, story_id, and structure_text.
     """
-    session = db.query(StudySession).filter(
-        StudySession.id == session_id,
-        StudySession.user_id == current_user.clerk_user_id
-    ).first()
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    topic = db.query(PlanTopic).filter(PlanTopic.id == session.topic_id).first()
-    topic_context = topic.description if topic else None
+    context = _session_context(db, session_id, current_user)
+    topic_context = context.topic_description
     try:
         result = await generate_story_structure(
             question=request.question,
@@ -382,14 +512,14 @@ async def generate_story_endpoint(
     question = (
         db.query(Question)
         .filter(
-            Question.topic_id == session.topic_id,
+            Question.topic_id == context.topic_id,
             Question.question == request.question,
         )
         .first()
     )
     if not question:
         question = Question(
-            topic_id=session.topic_id,
+            topic_id=context.topic_id,
             question=request.question,
             answer_anchors=None,
         )
@@ -481,18 +611,25 @@ async def list_sessions(
         .all()
     ) if topic_ids else []
     topic_by_id = {t.id: t for t in topics}
+    # Attempt count and average score for all listed sessions in one grouped query
+    session_ids = [s.id for s in sessions]
+    attempt_stats = (
+        db.query(
+            QuestionAttempt.study_session_id,
+            func.count(QuestionAttempt.id),
+            func.avg(QuestionAttempt.score_rating),
+        )
+        .filter(QuestionAttempt.study_session_id.in_(session_ids))
+        .group_by(QuestionAttempt.study_session_id)
+        .all()
+    ) if session_ids else []
+    stats_by_session = {sid: (count, avg) for sid, count, avg in attempt_stats}
     result = []
     for s in sessions:
         topic = topic_by_id.get(s.topic_id)
         topic_name = topic.name if topic else f"Topic {s.topic_id}"
-        attempts = (
-            db.query(QuestionAttempt)
-            .filter(QuestionAttempt.study_session_id == s.id)
-            .all()
-        )
-        questions_answered = len(attempts)
-        scores = [a.score_rating for a in attempts if a.score_rating is not None]
-        avg_score = int(sum(scores) / len(scores)) if scores else None
+        questions_answered, avg = stats_by_session.get(s.id, (0, None))
+        avg_score = int(avg) if avg is not None else None
         start = s.start_time
         end = s.end_time
         result.append({
@@ -12,21 +12,118 @@ class Settings(BaseSettings):
     CLERK_SECRET_KEY: str = ""
     
     # LLM Configuration
-    LLM_PROVIDER: Literal["openai", "anthropic"] = "openai"
+    LLM_PROVIDER: Literal["openai", "anthropic", "fake"] = "openai"
     USE_STUB_LLM: bool = False  # Use stub client for testing
     OPENAI_API_KEY: str = ""
     ANTHROPIC_API_KEY: str = ""
     
     # OpenAI specific
     OPENAI_MODEL: str = "gpt-4-turbo-preview"
+    OPENAI_BASE_URL: str = ""  # e.g. http://127.0.0.1:8787/v1 for the benchmarks.llm_standin server
     
     # Anthropic specific
     ANTHROPIC_MODEL: str = "claude-3-5-sonnet-20241022"
+    ANTHROPIC_BASE_URL: str = ""  # e.g. http://127.0.0.1:8787
+    
+    # Fake provider (LLM_PROVIDER=fake) for load tests and benchmarks: canned responses
+    # with injected latency and failures, deterministic for a given seed
+    FAKE_LLM_SEED: int = 0
+    FAKE_LLM_LATENCY_MS: dict[str, float] = {"default": 0}  # median time to first token per mode
+    FAKE_LLM_LATENCY_SIGMA: float = 0.5  # lognormal spread around the median
+    FAKE_LLM_TOKENS_PER_SECOND: float = 0  # output streaming speed; 0 = instant
+    FAKE_LLM_ERROR_RATE: float = 0.0  # provider 5xx-style failures
+    FAKE_LLM_RATE_LIMIT_RATE: float = 0.0  # 429s
+    FAKE_LLM_TRUNCATION_RATE: float = 0.0  # output cut off at max_tokens
+    FAKE_LLM_MALFORMED_RATE: float = 0.0  # JSON wrapped in prose / trailing commas (locally repairable)
+    FAKE_LLM_INVALID_RATE: float = 0.0  # output that is not JSON at all
+    
+    # Size max_tokens per mode from observed output (p99 + margin), capped at the MODES default
+    LLM_ADAPTIVE_MAX_TOKENS: bool = True
+    
+    # Deadline for all LLM work (attempts, retries and backoff) done by a route, by route name
+    LLM_DEADLINE_SECONDS: dict[str, float] = {"default": 60, "suggest_new": 90, "suggest_changes": 90}
+    
+    # Generate questions in the background at start_session; unclaimed prefetches expire after the TTL
+    QUESTION_PREFETCH_ENABLED: bool = True
+    QUESTION_PREFETCH_TTL_SECONDS: int = 900
+    QUESTION_PREFETCH_MAX_ENTRIES: int = 1000
+    
+    # Serve question sets from the shared per-topic bank; the LLM only tops up missing difficulties
+    QUESTION_BANK_ENABLED: bool = True
+    QUESTION_BANK_DIFFICULTY_MIX: dict[str, int] = {"easy": 1, "medium": 2, "hard": 2}
+    QUESTION_BANK_MASTERED_SCORE: int = 8  # attempts scoring at least this are not served again
+    
+    # Evaluate against a question's stored anchors (score + feedback only); stale anchors are refreshed in the background
+    ANSWER_ANCHORS_REUSE: bool = True
+    ANSWER_ANCHORS_MAX_AGE_DAYS: int = 30
+    
+    # Return the stored evaluation for resubmitted answers (exact match or MinHash similarity >= threshold)
+    ANSWER_REUSE_ENABLED: bool = True
+    ANSWER_REUSE_SIMILARITY: float = 0.85
+    ANSWER_REUSE_MAX_PER_QUESTION: int = 20  # stored evaluations kept per question
+    ANSWER_REUSE_CACHE_QUESTIONS: int = 1000  # questions whose signatures are held in memory
+    
+    # Idempotency-Key support on mutating study endpoints
+    IDEMPOTENCY_TTL_SECONDS: int = 86400  # how long a stored response is replayed
+    IDEMPOTENCY_WAIT_SECONDS: float = 30  # how long a duplicate waits for the in-flight original
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: int = 300  # in-flight claims older than this are treated as abandoned
+    
+    # Per-worker cache of active sessions' owner and topic, filled at start_session
+    SESSION_CONTEXT_CACHE_ENABLED: bool = True
+    SESSION_CONTEXT_CACHE_TTL_SECONDS: int = 600  # bounds staleness after end_session/plan approval on another worker
+    SESSION_CONTEXT_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Buffer sessions' last_interaction_time in memory and write it in one batched UPDATE per interval
+    HEARTBEAT_BUFFER_ENABLED: bool = True
+    HEARTBEAT_FLUSH_INTERVAL_SECONDS: float = 10
+    
+    # Auto-close sessions idle this long (tab closed without end_session), in bounded batches
+    SESSION_SWEEP_ENABLED: bool = True
+    SESSION_SWEEP_INTERVAL_SECONDS: float = 300
+    SESSION_IDLE_TIMEOUT_MINUTES: float = 120
+    SESSION_SWEEP_BATCH_SIZE: int = 500
+    SESSION_SWEEP_MAX_BATCHES: int = 20  # per run; the rest waits for the next interval
+    
+    # Per-user limits on LLM-backed routes: token bucket (per_minute, burst) plus concurrent requests.
+    # RATE_LIMITS entries override RATE_LIMIT_DEFAULT per route; "redis" shares state across workers.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_DEFAULT: dict[str, float] = {"per_minute": 20, "burst": 10, "concurrency": 2}
+    RATE_LIMITS: dict[str, dict[str, float]] = {
+        "suggest_new": {"per_minute": 2, "burst": 5, "concurrency": 1},
+        "suggest_changes": {"per_minute": 2, "burst": 5, "concurrency": 1},
+        "generate_questions": {"per_minute": 6, "burst": 10},
+        "generate_story": {"per_minute": 6, "burst": 10},
+        "end_session": {"per_minute": 6, "burst": 10},
+    }
+    
+    # Adaptive per-worker limit on in-flight LLM-backed requests; excess requests get 503 + Retry-After
+    LOAD_SHEDDING_ENABLED: bool = True
+    LOAD_SHEDDING_INITIAL_LIMIT: int = 20
+    LOAD_SHEDDING_MIN_LIMIT: int = 4
+    LOAD_SHEDDING_MAX_LIMIT: int = 200
+    LOAD_SHEDDING_LATENCY_TOLERANCE: float = 2.0  # latency up to this multiple of the baseline doesn't shrink the limit
     
     # Application
     API_V1_PREFIX: str = "/api/v1"
     CORS_ORIGINS: str = "http://localhost:3000"
     
+    # Observability
+    DEBUG: bool = False  # adds X-DB-Statements / X-DB-Time-Ms response headers
+    SQL_STRICT_LOADING: bool = False  # raise instead of lazy-loading relationships (catches N+1)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: int = 100
+    LOOP_BLOCKED_STACK_THRESHOLD_MS: int = 250  # log the blocking stack when the loop stalls this long
+    
+    # Per-request sampling profiler (middleware is only installed when enabled)
+    PROFILING_ENABLED: bool = False
+    PROFILING_ADMIN_TOKEN: str = ""  # requests with "X-Profile: <token>" are profiled
+    PROFILING_SAMPLE_RATE: float = 0.0  # fraction of all requests to profile
+    PROFILING_INTERVAL_MS: int = 5
+    PROFILING_OUTPUT_DIR: str = "profiles"
+    SLOW_REQUEST_THRESHOLD_MS: int = 2000  # requests slower than this are logged with DB/LLM breakdown
+    
     @property
     def cors_origins_list(self) -> list[str]:
         """Parse CORS_ORIGINS string into a list"""
@@ -1,136 +1,340 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from typing import Any, Dict
 from app.config import settings
 import openai
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
+from pydantic import ValidationError
+from app.llm.json_repair import JSONRepairError, parse_json, parse_stats
+from app.llm import metrics
+from app.llm.deadline import deadline_passed
+from app.observability.context import current_request_stats
 from app.llm.modes import (
+    MODES,
+    compile_schema,
     SuggestPlanResponse, PlanOverview, PlanTopicSchema,
     GenerateQuestionsResponse, QuestionSchema,
     EvaluateAnswerResponse, Anchor,
     ReconcileSessionResponse, QuestionAttemptSummary, BestAnchor,
     GenerateStoryStructureResponse,
 )
+from app.llm.token_budget import token_budget
+from app.llm.usage import usage_stats
+
+logger = logging.getLogger(__name__)
+
+# Anthropic ignores cache breakpoints on prefixes shorter than this (Sonnet/Opus)
+ANTHROPIC_MIN_CACHEABLE_TOKENS = 1024
+
+
+class TruncatedResponseError(Exception):
+    """Raised when the provider stopped generating because max_tokens was reached"""
+
+    def __init__(self, max_tokens: int):
+        super().__init__(f"LLM output truncated at max_tokens={max_tokens}")
+        self.max_tokens = max_tokens
+
+
+class MalformedResponseError(Exception):
+    """Raised when LLM output can't be repaired into a valid response for its mode"""
+
+
+@dataclass
+class LLMCompletion:
+    """Raw provider output plus the usage details needed by the LLM layer"""
+    content: str
+    output_tokens: int | None = None
+    truncated: bool = False
+    input_tokens: int | None = None
+    cached_input_tokens: int | None = None
+    fell_back: bool = False
 
 
 class LLMClient(ABC):
     """Abstract base class for LLM clients"""
+
+    provider: str = "unknown"
+    model: str = "unknown"
     
-    @abstractmethod
     async def generate_structured(
         self,
         prompt: str,
         response_schema: Dict[str, Any],
         temperature: float = 0.7,
-        max_tokens: int = 2000
+        max_tokens: int = 2000,
+        mode: str | None = None,
+        system: str | None = None,
     ) -> Dict[str, Any]:
-        """Generate structured output matching the provided schema"""
+        """
+        Generate structured output matching the provided schema.
+
+        `system` holds the fixed per-mode instructions and `prompt` only the
+        per-request data, so the provider can cache the stable prefix.
+        When `mode` is given, max_tokens is treated as the ceiling and the actual
+        limit comes from the observed output sizes for that mode. A truncated
+        response is retried once with a higher limit, never past the mode's
+        ceiling in MODES, before giving up, unless the request's deadline has
+        passed or the limit can't be raised.
+        """
+        system_prompt = self._system_prompt(system, response_schema)
+        limit = token_budget.max_tokens_for(mode, max_tokens) if mode else max_tokens
+        completion = await self._timed_complete(mode, prompt, system_prompt, response_schema, temperature, limit)
+        retry_limit = self._retry_limit(mode, limit, max_tokens)
+        if completion.truncated and retry_limit > limit and not deadline_passed():
+            self._record_usage(mode, completion)
+            limit = retry_limit
+            completion = await self._timed_complete(mode, prompt, system_prompt, response_schema, temperature, limit)
+        self._record_usage(mode, completion)
+        if completion.truncated:
+            raise TruncatedResponseError(limit)
+        return self._parse(completion.content, mode)
+
+    @abstractmethod
+    async def _complete(
+        self,
+        prompt: str,
+        system_prompt: str,
+        response_schema: Dict[str, Any],
+        temperature: float,
+        max_tokens: int,
+        mode: str | None,
+    ) -> LLMCompletion:
+        """Call the provider and return its raw text output and usage"""
         raise NotImplementedError
 
+    async def _timed_complete(self, mode: str | None, *args) -> LLMCompletion:
+        """Run one provider attempt and record its latency, tokens and cost"""
+        started = time.perf_counter()
+        try:
+            completion = await self._complete(*args, mode)
+        except asyncio.CancelledError:
+            # Deadline or disconnect: the provider request is dropped, so its output isn't generated
+            duration = time.perf_counter() - started
+            self._add_request_llm_time(duration)
+            metrics.observe_cancelled(
+                mode or "unknown",
+                self.provider,
+                self.model,
+                duration,
+                "deadline" if deadline_passed() else "cancelled",
+                token_budget.typical_output_tokens(mode) if mode else None,
+            )
+            raise
+        except Exception:
+            duration = time.perf_counter() - started
+            self._add_request_llm_time(duration)
+            metrics.observe_failure(mode or "unknown", self.provider, self.model, duration)
+            raise
+        duration = time.perf_counter() - started
+        self._add_request_llm_time(duration)
+        metrics.observe_completion(mode or "unknown", self.provider, self.model, completion, duration)
+        return completion
+
+    @staticmethod
+    def _add_request_llm_time(duration: float) -> None:
+        stats = current_request_stats()
+        if stats is not None:
+            stats.llm_time += duration
+            stats.llm_calls += 1
+
+    @staticmethod
+    def _retry_limit(mode: str | None, limit: int, max_tokens: int) -> int:
+        """max_tokens for retrying a truncated response: doubled, at least max_tokens, at most the mode's ceiling"""
+        ceiling = MODES[mode]["max_tokens"] if mode in MODES else max_tokens
+        return min(max(limit * 2, max_tokens), ceiling)
+
+    @staticmethod
+    def _system_prompt(system: str | None, response_schema: Dict[str, Any]) -> str:
+        """Stable prompt prefix: mode instructions followed by the compact response schema"""
+        instructions = system or "You are a helpful AI assistant."
+        return (
+            f"{instructions}\n\nAlways respond with valid JSON only, no other text, "
+            f"matching this TypeScript-style type: {compile_schema(response_schema)}"
+        )
+
+    @staticmethod
+    def _record_usage(mode: str | None, completion: LLMCompletion) -> None:
+        if not mode:
+            return
+        token_budget.record(mode, completion.output_tokens, truncated=completion.truncated)
+        usage_stats.record(
+            mode,
+            completion.input_tokens,
+            completion.cached_input_tokens,
+            completion.output_tokens,
+        )
+
+    @staticmethod
+    def _parse(content: str, mode: str | None = None) -> Dict[str, Any]:
+        """
+        Parse and validate provider output, repairing malformed JSON locally.
+
+        Only if repair or validation against the mode's response model fails is
+        MalformedResponseError raised, which lets with_retry re-issue the call.
+        """
+        stats_key = mode or "unknown"
+        try:
+            data, repaired = parse_json(content)
+            if mode:
+                data = MODES[mode]["response_model"].model_validate(data).model_dump()
+        except (JSONRepairError, ValidationError) as e:
+            parse_stats.record(stats_key, "recalled")
+            metrics.LLM_JSON_PARSE.labels(stats_key, "recalled").inc()
+            raise MalformedResponseError(str(e)) from e
+        if repaired:
+            logger.info("Repaired malformed LLM JSON locally for mode %s", stats_key)
+        outcome = "repaired" if repaired else "clean"
+        parse_stats.record(stats_key, outcome)
+        metrics.LLM_JSON_PARSE.labels(stats_key, outcome).inc()
+        return data
+
 
 class OpenAIClient(LLMClient):
     """OpenAI client implementation"""
-    
+
+    provider = "openai"
+
     def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        # Async SDK clients, so cancelling a call closes its HTTP request instead of leaving it to finish in a thread
+        self.client = openai.AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+        )
         self.model = settings.OPENAI_MODEL
-    
-    async def generate_structured(
+
+    async def _complete(
         self,
         prompt: str,
+        system_prompt: str,
         response_schema: Dict[str, Any],
-        temperature: float = 0.7,
-        max_tokens: int = 2000
-    ) -> Dict[str, Any]:
+        temperature: float,
+        max_tokens: int,
+        mode: str | None,
+    ) -> LLMCompletion:
         """Generate structured output using OpenAI"""
+        # The system message is identical across calls for a mode, so OpenAI's
+        # automatic prefix caching applies once it exceeds the minimum length.
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        fell_back = False
         try:
             # Try using structured outputs (beta feature)
-            response = self.client.beta.chat.completions.parse(
+            response = await self.client.beta.chat.completions.parse(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI assistant. Always respond with valid JSON matching the requested schema."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages,
                 response_format=response_schema,
                 temperature=temperature,
                 max_tokens=max_tokens
             )
-            
-            # Parse the response
-            if hasattr(response.choices[0].message, 'parsed') and response.choices[0].message.parsed:
-                return response.choices[0].message.parsed
-            else:
-                # Fallback to JSON parsing if structured output not available
-                import json
-                content = response.choices[0].message.content
-                return json.loads(content)
         except Exception:
             # Fallback to regular chat completion with JSON mode
-            import json
-            response = self.client.chat.completions.create(
+            fell_back = True
+            response = await self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI assistant. Always respond with valid JSON matching this schema: " + str(response_schema)},
-                    {"role": "user", "content": prompt + "\n\nRespond with valid JSON only, no other text."}
-                ],
+                messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
                 response_format={"type": "json_object"}
             )
-            content = response.choices[0].message.content
-            return json.loads(content)
+        choice = response.choices[0]
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        return LLMCompletion(
+            content=choice.message.content or "",
+            output_tokens=getattr(usage, "completion_tokens", None),
+            truncated=choice.finish_reason == "length",
+            input_tokens=getattr(usage, "prompt_tokens", None),
+            cached_input_tokens=getattr(details, "cached_tokens", None),
+            fell_back=fell_back,
+        )
 
 
 class AnthropicClient(LLMClient):
     """Anthropic client implementation"""
-    
+
+    provider = "anthropic"
+
     def __init__(self):
-        self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.client = AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            base_url=settings.ANTHROPIC_BASE_URL or None,
+        )
         self.model = settings.ANTHROPIC_MODEL
-    
-    async def generate_structured(
+
+    async def _complete(
         self,
         prompt: str,
+        system_prompt: str,
         response_schema: Dict[str, Any],
-        temperature: float = 0.7,
-        max_tokens: int = 2000
-    ) -> Dict[str, Any]:
+        temperature: float,
+        max_tokens: int,
+        mode: str | None,
+    ) -> LLMCompletion:
         """Generate structured output using Anthropic"""
         # Anthropic uses tool use for structured outputs
-        # For now, we'll use JSON mode and parse manually
-        response = self.client.messages.create(
+        # For now, we'll use JSON mode and parse manually.
+        response = await self.client.messages.create(
             model=self.model,
             max_tokens=max_tokens,
             temperature=temperature,
+            system=self._system_blocks(system_prompt),
             messages=[
-                {"role": "user", "content": f"{prompt}\n\nRespond with valid JSON matching this schema: {response_schema}"}
+                {"role": "user", "content": prompt}
             ]
         )
-        
-        import json
-        content = response.content[0].text
-        # Extract JSON from markdown code blocks if present
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-        
-        return json.loads(content)
+        usage = response.usage
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        return LLMCompletion(
+            content=response.content[0].text,
+            output_tokens=usage.output_tokens,
+            truncated=response.stop_reason == "max_tokens",
+            # Anthropic reports cached tokens separately from input_tokens
+            input_tokens=usage.input_tokens + cache_read + cache_write,
+            cached_input_tokens=cache_read,
+        )
+
+    @staticmethod
+    def _system_blocks(system_prompt: str) -> str | list[Dict[str, Any]]:
+        """
+        Mark the system prompt (instructions + schema) as a cache breakpoint when
+        it is long enough for Anthropic to cache; shorter prefixes are sent as a
+        plain string, since a breakpoint on them is silently ignored.
+        """
+        if len(system_prompt) // 4 < ANTHROPIC_MIN_CACHEABLE_TOKENS:
+            return system_prompt
+        return [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
 
 
 class StubLLMClient(LLMClient):
     """Stub LLM client that returns hardcoded responses for testing"""
+
+    provider = "stub"
+    model = "stub"
     
-    async def generate_structured(
+    async def _complete(
         self,
         prompt: str,
+        system_prompt: str,
         response_schema: Dict[str, Any],
-        temperature: float = 0.7,
-        max_tokens: int = 2000
-    ) -> Dict[str, Any]:
+        temperature: float,
+        max_tokens: int,
+        mode: str | None,
+    ) -> LLMCompletion:
         """
-        Generate structured output matching the provided schema.
-        Returns hardcoded responses based on the schema type.
+        Return a hardcoded response serialized as JSON, based on the schema type.
         """
+        return LLMCompletion(content=json.dumps(self._response_for(response_schema)))
+
+    def _response_for(self, response_schema: Dict[str, Any]) -> Dict[str, Any]:
         # Detect schema type by checking properties
         props = response_schema.get("properties", {})
         
@@ -139,7 +343,11 @@ class StubLLMClient(LLMClient):
         elif "questions" in props:
             return self._get_generate_questions_response()
         elif "score" in props and "positive_feedback" in props:
-            return self._get_evaluate_answer_response()
+            # Also serves evaluate_answer_with_anchors, whose schema omits anchors
+            response = self._get_evaluate_answer_response()
+            return {key: value for key, value in response.items() if key in props}
+        elif "anchors" in props:
+            return {"anchors": self._get_evaluate_answer_response()["anchors"]}
         elif "question_attempts" in props:
             return self._get_reconcile_session_response()
         elif "structure_text" in props:
@@ -273,10 +481,112 @@ class StubLLMClient(LLMClient):
         return response.model_dump()
 
 
+class FakeLLMError(Exception):
+    """Injected provider failure from FakeLLMClient"""
+
+    def __init__(self, message: str, status_code: int = 500, retry_after: float | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class FakeLLMClient(StubLLMClient):
+    """
+    Stub responses with production-like behaviour injected from Settings:
+    per-mode lognormal latency, slow output streaming, 5xx/429 errors, and
+    truncated, repairable-malformed or unparseable output. All randomness comes
+    from one RNG seeded by FAKE_LLM_SEED, so a run is reproducible.
+    """
+
+    provider = "fake"
+    model = "fake"
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self, mode: str) -> dict:
+        latencies = settings.FAKE_LLM_LATENCY_MS
+        median_ms = latencies.get(mode, latencies.get("default", 0))
+        with self._lock:
+            outcome = self.rng.random()
+            jitter = self.rng.lognormvariate(0, settings.FAKE_LLM_LATENCY_SIGMA)
+        thresholds = [
+            ("error", settings.FAKE_LLM_ERROR_RATE),
+            ("rate_limited", settings.FAKE_LLM_RATE_LIMIT_RATE),
+            ("truncated", settings.FAKE_LLM_TRUNCATION_RATE),
+            ("malformed", settings.FAKE_LLM_MALFORMED_RATE),
+            ("invalid", settings.FAKE_LLM_INVALID_RATE),
+        ]
+        kind = "ok"
+        cumulative = 0.0
+        for name, rate in thresholds:
+            cumulative += rate
+            if outcome < cumulative:
+                kind = name
+                break
+        return {"kind": kind, "ttft": median_ms * jitter / 1000}
+
+    async def _complete(
+        self,
+        prompt: str,
+        system_prompt: str,
+        response_schema: Dict[str, Any],
+        temperature: float,
+        max_tokens: int,
+        mode: str | None,
+    ) -> LLMCompletion:
+        """Return a canned response after simulated latency, or an injected failure"""
+        draw = self._draw(mode or "default")
+        await asyncio.sleep(draw["ttft"])
+        if draw["kind"] == "error":
+            raise FakeLLMError("Injected provider error", status_code=500)
+        if draw["kind"] == "rate_limited":
+            raise FakeLLMError("Injected rate limit", status_code=429, retry_after=1.0)
+
+        content = json.dumps(self._response_for(response_schema))
+        output_tokens = max(1, len(content) // 4)
+        truncated = draw["kind"] == "truncated" or output_tokens > max_tokens
+        if truncated:
+            output_tokens = min(output_tokens, max_tokens)
+            content = content[: len(content) // 2]
+        elif draw["kind"] == "malformed":
+            content = f"Here is the result:\n```json\n{content[:-1]},}}\n```\nLet me know if you need more."
+        elif draw["kind"] == "invalid":
+            content = "I'm sorry, I can't produce that right now."
+        if settings.FAKE_LLM_TOKENS_PER_SECOND > 0:
+            await asyncio.sleep(output_tokens / settings.FAKE_LLM_TOKENS_PER_SECOND)
+        return LLMCompletion(
+            content=content,
+            output_tokens=output_tokens,
+            truncated=truncated,
+            input_tokens=max(1, (len(system_prompt) + len(prompt)) // 4),
+        )
+
+
+_fake_client: FakeLLMClient | None = None
+
+
+def get_fake_llm_client() -> FakeLLMClient:
+    """Process-wide fake client, so its seeded RNG advances across calls"""
+    global _fake_client
+    if _fake_client is None:
+        _fake_client = FakeLLMClient(settings.FAKE_LLM_SEED)
+    return _fake_client
+
+
+def reset_fake_llm_client() -> None:
+    """Re-seed the fake client, e.g. between benchmark runs"""
+    global _fake_client
+    _fake_client = None
+
+
 def get_llm_client() -> LLMClient:
     """Factory function to get the appropriate LLM client"""
     if settings.USE_STUB_LLM:
         return StubLLMClient()
+    elif settings.LLM_PROVIDER == "fake":
+        return get_fake_llm_client()
     elif settings.LLM_PROVIDER == "openai":
         return OpenAIClient()
     elif settings.LLM_PROVIDER == "anthropic":
@@ -0,0 +1,40 @@
+"""
+Deadline for the LLM work done on behalf of a request.
+
+The deadline is held in a context variable, set per route by the
+llm_deadline dependency. with_retry bounds each attempt by the time
+remaining and won't back off past it, and generate_structured won't
+re-issue a truncated call once it has passed.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("llm_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when LLM work runs past the request's deadline"""
+
+
+def remaining() -> float | None:
+    """Seconds left before the current deadline, or None when there is none"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def deadline_passed() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+@contextmanager
+def deadline_after(seconds: float):
+    """Set a deadline for the enclosed LLM work; an enclosing earlier deadline still applies"""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
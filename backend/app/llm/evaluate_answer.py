@@ -2,11 +2,39 @@ from app.llm.client import get_llm_client
 from app.llm.modes import MODES, EvaluateAnswerResponse
 from app.llm.retry import with_retry
 
+# Fixed instructions go in the system prompt so the provider can cache them;
+# the per-request question and answer follow in the user message.
+SYSTEM_PROMPT = """You are an expert interview coach. Evaluate the interview answer you are given.
+
+Evaluate the answer and provide:
+1. A score from 1-10 (1 = very bad, 10 = very good)
+2. 0-3 positive feedback points (what they did well, max 30 words each)
+3. 0-3 improvement areas (what could be better, max 30 words each)
+4. Answer anchors (key points that should be covered, max 3 words for name, max 50 words for anchor)
+
+Be constructive and specific. Focus on helping the user improve.
+
+Respond with a JSON object matching the required schema."""
+
+# Used when the question already has stored anchors: they are the rubric, so
+# the model only scores and gives feedback (much shorter output).
+SYSTEM_PROMPT_WITH_ANCHORS = """You are an expert interview coach. Evaluate the interview answer you are given against the rubric of answer anchors (key points a strong answer covers).
+
+Evaluate the answer and provide:
+1. A score from 1-10 (1 = very bad, 10 = very good), based on how well the answer covers the anchors
+2. 0-3 positive feedback points (what they did well, max 30 words each)
+3. 0-3 improvement areas (what could be better, max 30 words each)
+
+Be constructive and specific. Focus on helping the user improve.
+
+Respond with a JSON object matching the required schema."""
+
 
 async def evaluate_answer(
     question: str,
     answer: str,
-    question_context: str | None = None
+    question_context: str | None = None,
+    anchors: list[dict] | None = None,
 ) -> EvaluateAnswerResponse:
     """
     Evaluate a user's answer to an interview question.
@@ -15,6 +43,8 @@ async def evaluate_answer(
         question: The interview question
         answer: The user's answer
         question_context: Additional context about the question (topic, difficulty, etc.)
+        anchors: Stored anchors for the question; when given they are used as the
+            rubric and returned unchanged instead of being regenerated
     
     Returns:
         EvaluateAnswerResponse with score, feedback, and anchors
@@ -25,30 +55,28 @@ async def evaluate_answer(
     if question_context:
         context_text = f"\n\nQuestion Context: {question_context}"
     
-    prompt = f"""You are an expert interview coach. Evaluate the following interview answer.
+    rubric_text = ""
+    if anchors:
+        rubric_text = "\n\nAnswer Anchors:\n" + "\n".join(f"- {a['name']}: {a['anchor']}" for a in anchors)
 
-Question: {question}{context_text}
+    prompt = f"""Question: {question}{context_text}{rubric_text}
 
 User's Answer:
-{answer}
-
-Evaluate this answer and provide:
-1. A score from 1-10 (1 = very bad, 10 = very good)
-2. 0-3 positive feedback points (what they did well, max 30 words each)
-3. 0-3 improvement areas (what could be better, max 30 words each)
-4. Answer anchors (key points that should be covered, max 3 words for name, max 50 words for anchor)
-
-Be constructive and specific. Focus on helping the user improve.
-
-Respond with a JSON object matching the required schema."""
+{answer}"""
     
-    mode_config = MODES["evaluate_answer"]
+    mode = "evaluate_answer_with_anchors" if anchors else "evaluate_answer"
+    mode_config = MODES[mode]
     response = await with_retry(
         lambda: client.generate_structured(
             prompt=prompt,
+            system=SYSTEM_PROMPT_WITH_ANCHORS if anchors else SYSTEM_PROMPT,
             response_schema=mode_config["response_schema"],
             max_tokens=mode_config["max_tokens"],
             temperature=0.5,
-        )
+            mode=mode,
+        ),
+        mode=mode,
     )
+    if anchors:
+        return EvaluateAnswerResponse(**response, anchors=anchors)
     return EvaluateAnswerResponse(**response)
@@ -0,0 +1,31 @@
+from app.llm.client import get_llm_client
+from app.llm.modes import MODES, GenerateAnchorsResponse
+from app.llm.retry import with_retry
+
+SYSTEM_PROMPT = """You are an expert interview coach. List the answer anchors for the interview question you are given: the key points a strong answer should cover.
+
+Provide 2-5 anchors, each with a name (max 3 words) and an anchor description (max 50 words).
+
+Respond with a JSON object matching the required schema."""
+
+
+async def generate_anchors(question: str, question_context: str | None = None) -> GenerateAnchorsResponse:
+    """
+    Generate answer anchors (the evaluation rubric) for an interview question.
+    """
+    client = get_llm_client()
+    context_text = f"\n\nQuestion Context: {question_context}" if question_context else ""
+    prompt = f"Question: {question}{context_text}"
+    mode_config = MODES["generate_anchors"]
+    response = await with_retry(
+        lambda: client.generate_structured(
+            prompt=prompt,
+            system=SYSTEM_PROMPT,
+            response_schema=mode_config["response_schema"],
+            max_tokens=mode_config["max_tokens"],
+            temperature=0.3,
+            mode="generate_anchors",
+        ),
+        mode="generate_anchors",
+    )
+    return GenerateAnchorsResponse(**response)
@@ -2,11 +2,24 @@ from app.llm.client import get_llm_client
 from app.llm.modes import MODES, GenerateQuestionsResponse
 from app.llm.retry import with_retry
 
+SYSTEM_PROMPT = """You are an expert interview coach. Generate interview questions for practice on the topic you are given.
+
+Generate a mix of questions that:
+1. Cover different aspects of the topic
+2. Vary in difficulty (easy, medium, hard)
+3. Include both new questions and questions to redo (if previous attempts were weak)
+4. Focus on areas that need more practice
+
+For questions marked as "redo", include the reason (weak_answer, incomplete, time_pressure, or high_value).
+
+Respond with a JSON object matching the required schema."""
+
 
 async def generate_questions(
     topic_name: str,
     topic_description: str,
-    previously_asked: list[dict] | None = None
+    previously_asked: list[dict] | None = None,
+    difficulties: dict[str, int] | None = None,
 ) -> GenerateQuestionsResponse:
     """
     Generate interview questions for a specific topic.
@@ -15,6 +28,7 @@ async def generate_questions(
         topic_name: Name of the topic
         topic_description: Description of the topic
         previously_asked: List of previously asked questions with their ratings
+        difficulties: How many questions of each difficulty to generate (default: model's choice)
     
     Returns:
         GenerateQuestionsResponse with list of questions
@@ -29,28 +43,24 @@ async def generate_questions(
             rating = q.get("rating", "N/A")
             previous_questions_text += f"- {question} (Rating: {rating})\n"
     
-    prompt = f"""You are an expert interview coach. Generate interview questions for practice.
+    count_text = ""
+    if difficulties:
+        wanted = ", ".join(f"{n} {level}" for level, n in difficulties.items() if n)
+        count_text = f"\n\nGenerate exactly {sum(difficulties.values())} questions: {wanted}."
 
-Topic: {topic_name}
-Description: {topic_description}{previous_questions_text}
-
-Generate a mix of questions that:
-1. Cover different aspects of the topic
-2. Vary in difficulty (easy, medium, hard)
-3. Include both new questions and questions to redo (if previous attempts were weak)
-4. Focus on areas that need more practice
-
-For questions marked as "redo", include the reason (weak_answer, incomplete, time_pressure, or high_value).
-
-Respond with a JSON object matching the required schema."""
+    prompt = f"""Topic: {topic_name}
+Description: {topic_description}{previous_questions_text}{count_text}"""
     
     mode_config = MODES["generate_questions"]
     response = await with_retry(
         lambda: client.generate_structured(
             prompt=prompt,
+            system=SYSTEM_PROMPT,
             response_schema=mode_config["response_schema"],
             max_tokens=mode_config["max_tokens"],
             temperature=0.8,
-        )
+            mode="generate_questions",
+        ),
+        mode="generate_questions",
     )
     return GenerateQuestionsResponse(**response)
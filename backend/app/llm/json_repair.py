@@ -0,0 +1,135 @@
+"""Tolerant JSON extraction and repair for LLM output."""
+import json
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Iterator
+
+_CLOSING_FENCE_RE = re.compile(r"\s*```\s*$")
+_FENCED_BLOCK_RE = re.compile(r"```(?:json)?[ \t]*\n(.*?)\n[ \t]*```", re.DOTALL)
+_VALUE_START_RE = re.compile(r"[{\[]")
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+_SMART_QUOTES_RE = re.compile(r"[“”]")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+MAX_CANDIDATES = 20  # `{`/`[` positions tried before giving up and re-calling the LLM
+
+
+class JSONRepairError(ValueError):
+    """Raised when LLM output cannot be turned into JSON locally"""
+
+
+def json_candidates(text: str) -> Iterator[str]:
+    """
+    Yield the spans of `text` that may hold its JSON object/array, most likely first.
+
+    A fenced ```json block comes first, then the balanced value starting at each
+    `{` or `[` in turn, so brackets in leading prose ("[see below]") don't hide the
+    real value. Starts nested inside an earlier balanced span are skipped, and at
+    most MAX_CANDIDATES are tried. String contents are respected so braces inside
+    values don't confuse the scan. A value that is never closed is yielded as the
+    rest of the text (less a closing fence), left for repair_json to deal with.
+    """
+    fenced = _FENCED_BLOCK_RE.search(text)
+    if fenced:
+        yield fenced.group(1).strip()
+    scanned_to = 0
+    tried = 0
+    for match in _VALUE_START_RE.finditer(text):
+        start = match.start()
+        if start < scanned_to:
+            continue
+        if tried == MAX_CANDIDATES:
+            return
+        tried += 1
+        end = _balanced_end(text, start)
+        if end is None:
+            yield _CLOSING_FENCE_RE.sub("", text[start:]).strip()
+        else:
+            scanned_to = end
+            yield text[start:end]
+
+
+def _balanced_end(text: str, start: int) -> int | None:
+    """End of the object/array opening at `start`, or None if it is never closed."""
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+def _replace_outside_strings(text: str, pattern: re.Pattern, repl) -> str:
+    """Apply a regex substitution only to the parts of `text` outside JSON strings."""
+    parts = re.split(r'("(?:[^"\\]|\\.)*")', text)
+    return "".join(part if i % 2 else pattern.sub(repl, part) for i, part in enumerate(parts))
+
+
+def repair_json(text: str) -> str:
+    """Apply common fixes: smart quotes, trailing commas, Python literals (none inside strings)."""
+    text = _replace_outside_strings(text, _SMART_QUOTES_RE, '"')
+    text = _replace_outside_strings(text, _TRAILING_COMMA_RE, r"\1")
+    text = _replace_outside_strings(
+        text, re.compile(r"\b(True|False|None)\b"), lambda m: _PY_LITERALS[m.group(1)]
+    )
+    return text
+
+
+def parse_json(text: str) -> tuple[Any, bool]:
+    """
+    Parse LLM output as JSON, repairing it locally if needed.
+
+    Returns (value, repaired). Raises JSONRepairError if no repair works.
+    """
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError:
+        pass
+    for candidate in json_candidates(text):
+        for attempt in (candidate, repair_json(candidate)):
+            try:
+                return json.loads(attempt), True
+            except json.JSONDecodeError:
+                continue
+    raise JSONRepairError("LLM output is not valid JSON after repair")
+
+
+class ParseStats:
+    """Per-mode counts of clean parses, local repairs and parse failures (which trigger a re-call)"""
+
+    def __init__(self):
+        self._counts: dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record(self, mode: str, outcome: str) -> None:
+        with self._lock:
+            self._counts[mode][outcome] += 1
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            return {
+                mode: {key: counts[key] for key in ("clean", "repaired", "recalled")}
+                for mode, counts in self._counts.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+parse_stats = ParseStats()
@@ -0,0 +1,117 @@
+"""Prometheus metrics for LLM calls, labelled by mode, provider and model."""
+from typing import TYPE_CHECKING
+
+from prometheus_client import Counter, Gauge, Histogram
+
+if TYPE_CHECKING:
+    from app.llm.client import LLMCompletion
+
+LABELS = ("mode", "provider", "model")
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICING = {
+    "gpt-4-turbo-preview": (10.0, 10.0, 30.0),
+    "gpt-4o": (2.5, 1.25, 10.0),
+    "gpt-4o-mini": (0.15, 0.075, 0.6),
+    "claude-3-5-sonnet-20241022": (3.0, 0.3, 15.0),
+    "claude-3-5-haiku-20241022": (0.8, 0.08, 4.0),
+}
+
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "Total provider request latency per attempt",
+    LABELS + ("outcome",),
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens consumed by LLM calls",
+    LABELS + ("kind",),
+)
+LLM_COST = Counter(
+    "llm_cost_usd_total",
+    "Estimated LLM spend in USD from MODEL_PRICING",
+    LABELS,
+)
+LLM_RETRIES = Counter(
+    "llm_retries_total",
+    "LLM calls re-issued by with_retry after a failure",
+    ("mode",),
+)
+LLM_FALLBACKS = Counter(
+    "llm_fallbacks_total",
+    "Provider calls that fell back to a secondary API (e.g. OpenAI JSON mode)",
+    LABELS,
+)
+LLM_TRUNCATIONS = Counter(
+    "llm_truncations_total",
+    "Completions that stopped at max_tokens",
+    LABELS,
+)
+LLM_CANCELLED = Counter(
+    "llm_calls_cancelled_total",
+    "Provider attempts abandoned in flight: deadline passed, or cancelled (e.g. client disconnected)",
+    LABELS + ("reason",),
+)
+LLM_TOKENS_SAVED = Counter(
+    "llm_tokens_saved_total",
+    "Estimated output tokens not paid for because attempts were cancelled (median output of the mode)",
+    LABELS,
+)
+LLM_TRUNCATION_RATE = Gauge(
+    "llm_truncation_rate",
+    "Fraction of completions per mode that stopped at the adaptive max_tokens (see token_budget)",
+    ("mode",),
+)
+LLM_JSON_PARSE = Counter(
+    "llm_json_parse_total",
+    "Outcome of parsing LLM output: clean, repaired locally, or recalled",
+    ("mode", "outcome"),
+)
+
+
+def observe_failure(mode: str, provider: str, model: str, duration: float) -> None:
+    """Record the latency of a provider attempt that raised."""
+    LLM_LATENCY.labels(mode, provider, model, "error").observe(duration)
+
+
+def observe_cancelled(
+    mode: str, provider: str, model: str, duration: float, reason: str, saved_tokens: int | None
+) -> None:
+    """Record a provider attempt that was cancelled before it completed."""
+    LLM_LATENCY.labels(mode, provider, model, "cancelled").observe(duration)
+    LLM_CANCELLED.labels(mode, provider, model, reason).inc()
+    if saved_tokens:
+        LLM_TOKENS_SAVED.labels(mode, provider, model).inc(saved_tokens)
+
+
+def estimate_cost(model: str, completion: "LLMCompletion") -> float | None:
+    """Estimated USD cost of a completion, or None if the model isn't priced."""
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return None
+    input_rate, cached_rate, output_rate = pricing
+    cached = completion.cached_input_tokens or 0
+    uncached = max((completion.input_tokens or 0) - cached, 0)
+    output = completion.output_tokens or 0
+    return (uncached * input_rate + cached * cached_rate + output * output_rate) / 1_000_000
+
+
+def observe_completion(mode: str, provider: str, model: str, completion: "LLMCompletion", duration: float) -> None:
+    """Record latency, token and cost metrics for one provider attempt."""
+    labels = (mode, provider, model)
+    LLM_LATENCY.labels(*labels, "truncated" if completion.truncated else "ok").observe(duration)
+    if completion.input_tokens:
+        LLM_TOKENS.labels(*labels, "input").inc(completion.input_tokens)
+    if completion.cached_input_tokens:
+        LLM_TOKENS.labels(*labels, "cached_input").inc(completion.cached_input_tokens)
+    if completion.output_tokens:
+        LLM_TOKENS.labels(*labels, "output").inc(completion.output_tokens)
+    if completion.truncated:
+        LLM_TRUNCATIONS.labels(*labels).inc()
+    if completion.fell_back:
+        LLM_FALLBACKS.labels(*labels).inc()
+    cost = estimate_cost(model, completion)
+    if cost:
+        LLM_COST.labels(*labels).inc(cost)
@@ -4,6 +4,8 @@ LLM Mode Definitions
 Each mode defines the input/output schema and prompt template for a specific LLM operation.
 """
 
+import json
+from functools import lru_cache
 from typing import Dict, Any, List
 from pydantic import BaseModel
 
@@ -54,6 +56,17 @@ class EvaluateAnswerResponse(BaseModel):
     anchors: List[Anchor]
 
 
+class EvaluateWithAnchorsResponse(BaseModel):
+    """Evaluation against stored anchors: no anchors in the output"""
+    score: int  # 1-10
+    positive_feedback: List[str]  # 0-3 items, max 30 words each
+    improvement_areas: List[str]  # 0-3 items, max 30 words each
+
+
+class GenerateAnchorsResponse(BaseModel):
+    anchors: List[Anchor]
+
+
 # ReconcileSession Schema
 class BestAnchor(BaseModel):
     name: str  # max 3 words
@@ -76,29 +89,90 @@ class GenerateStoryStructureResponse(BaseModel):
     structure_text: str  # Structured story outline for the question
 
 
-# Mode definitions with schemas
+# Compact schema rendering
+_JSON_TYPE_NAMES = {"string": "string", "integer": "int", "number": "number", "boolean": "bool", "null": "null"}
+
+
+def _render(node: Dict[str, Any], defs: Dict[str, Any]) -> str:
+    if "$ref" in node:
+        return _render(defs[node["$ref"].split("/")[-1]], defs)
+    if "anyOf" in node:
+        return " | ".join(_render(option, defs) for option in node["anyOf"])
+    if "enum" in node:
+        return " | ".join(json.dumps(value) for value in node["enum"])
+    node_type = node.get("type")
+    if node_type == "array":
+        items = node.get("items", {})
+        item = _render(items, defs)
+        return f"({item})[]" if "anyOf" in items or "enum" in items else f"{item}[]"
+    if node_type == "object" or "properties" in node:
+        required = set(node.get("required", []))
+        fields = [
+            f"{name}{'' if name in required else '?'}: {_render(prop, defs)}"
+            for name, prop in node.get("properties", {}).items()
+        ]
+        return "{" + "; ".join(fields) + "}"
+    return _JSON_TYPE_NAMES.get(node_type, "any")
+
+
+@lru_cache(maxsize=64)
+def _compile_schema_json(schema_json: str) -> str:
+    schema = json.loads(schema_json)
+    return _render(schema, schema.get("$defs", {}))
+
+
+def compile_schema(response_schema: Dict[str, Any]) -> str:
+    """
+    Render a pydantic JSON schema as a compact TypeScript-like signature,
+    e.g. {score: int; anchors: {name: string; anchor: string}[]}.
+
+    Titles and $defs are dropped and refs are inlined, which cuts the schema to a
+    fraction of the tokens of its Python repr. Results are cached per schema.
+    """
+    # Key order is preserved: it drives the order the model generates fields in
+    return _compile_schema_json(json.dumps(response_schema))
+
+
+# Mode definitions with schemas. max_tokens is the ceiling for each mode; the
+# limit actually requested is derived from observed output sizes (see token_budget).
 MODES = {
     "suggest_plan": {
+        "response_model": SuggestPlanResponse,
         "response_schema": SuggestPlanResponse.model_json_schema(),
         "max_tokens": 2000
     },
     "suggest_plan_changes": {
+        "response_model": SuggestPlanResponse,
         "response_schema": SuggestPlanResponse.model_json_schema(),
         "max_tokens": 2000
     },
     "generate_questions": {
+        "response_model": GenerateQuestionsResponse,
         "response_schema": GenerateQuestionsResponse.model_json_schema(),
         "max_tokens": 3000
     },
     "evaluate_answer": {
+        "response_model": EvaluateAnswerResponse,
         "response_schema": EvaluateAnswerResponse.model_json_schema(),
         "max_tokens": 2000
     },
+    "evaluate_answer_with_anchors": {
+        "response_model": EvaluateWithAnchorsResponse,
+        "response_schema": EvaluateWithAnchorsResponse.model_json_schema(),
+        "max_tokens": 800
+    },
+    "generate_anchors": {
+        "response_model": GenerateAnchorsResponse,
+        "response_schema": GenerateAnchorsResponse.model_json_schema(),
+        "max_tokens": 1000
+    },
     "reconcile_session": {
+        "response_model": ReconcileSessionResponse,
         "response_schema": ReconcileSessionResponse.model_json_schema(),
         "max_tokens": 4000
     },
     "generate_story_structure": {
+        "response_model": GenerateStoryStructureResponse,
         "response_schema": GenerateStoryStructureResponse.model_json_schema(),
         "max_tokens": 2000
     }
@@ -2,6 +2,18 @@ from app.llm.client import get_llm_client
 from app.llm.modes import MODES, ReconcileSessionResponse
 from app.llm.retry import with_retry
 
+SYSTEM_PROMPT = """You are an expert interview coach. Reconcile a study session by analyzing all question attempts you are given.
+
+For each question, provide:
+1. The question text (max 30 words)
+2. Number of attempts made
+3. Best score achieved (1-10)
+4. Best answer anchors (key points from the best attempt, max 3 words for name, max 50 words for anchor)
+
+This summary will be used to track progress and plan future study sessions.
+
+Respond with a JSON object matching the required schema."""
+
 
 async def reconcile_session(question_attempts: list[dict]) -> ReconcileSessionResponse:
     """
@@ -15,7 +27,7 @@ async def reconcile_session(question_attempts: list[dict]) -> ReconcileSessionRe
     """
     client = get_llm_client()
     
-    attempts_text = "\n\nQuestion Attempts:\n"
+    attempts_text = "Question Attempts:\n"
     for i, attempt in enumerate(question_attempts, 1):
         question = attempt.get("question", "")
         answer = attempt.get("answer", "")
@@ -24,27 +36,16 @@ async def reconcile_session(question_attempts: list[dict]) -> ReconcileSessionRe
         attempts_text += f"   Answer: {answer}\n"
         attempts_text += f"   Score: {score}\n"
     
-    prompt = f"""You are an expert interview coach. Reconcile a study session by analyzing all question attempts.
-
-{attempts_text}
-
-For each question, provide:
-1. The question text (max 30 words)
-2. Number of attempts made
-3. Best score achieved (1-10)
-4. Best answer anchors (key points from the best attempt, max 3 words for name, max 50 words for anchor)
-
-This summary will be used to track progress and plan future study sessions.
-
-Respond with a JSON object matching the required schema."""
-    
     mode_config = MODES["reconcile_session"]
     response = await with_retry(
         lambda: client.generate_structured(
-            prompt=prompt,
+            prompt=attempts_text,
+            system=SYSTEM_PROMPT,
             response_schema=mode_config["response_schema"],
             max_tokens=mode_config["max_tokens"],
             temperature=0.6,
-        )
+            mode="reconcile_session",
+        ),
+        mode="reconcile_session",
     )
     return ReconcileSessionResponse(**response)
@@ -2,22 +2,61 @@
 import asyncio
 import logging
 
+from app.llm.deadline import DeadlineExceeded, deadline_passed, remaining
+from app.llm.metrics import LLM_RETRIES
+
 logger = logging.getLogger(__name__)
 
 LLM_RETRY_ATTEMPTS = 3
 LLM_RETRY_BASE_DELAY = 1.0  # seconds
 
 
-async def with_retry(coro, attempts: int = LLM_RETRY_ATTEMPTS, base_delay: float = LLM_RETRY_BASE_DELAY):
-    """Execute coroutine with exponential backoff. Raises last exception if all retries fail."""
+def _retry_after(e: Exception) -> float | None:
+    """Seconds the provider asked us to wait (e.g. on a 429), if it said"""
+    retry_after = getattr(e, "retry_after", None)
+    if retry_after is None:
+        response = getattr(e, "response", None)
+        retry_after = getattr(response, "headers", {}).get("retry-after")
+    try:
+        return float(retry_after) if retry_after is not None else None
+    except ValueError:
+        return None  # HTTP-date form; fall back to our own backoff
+
+
+async def with_retry(
+    coro,
+    attempts: int = LLM_RETRY_ATTEMPTS,
+    base_delay: float = LLM_RETRY_BASE_DELAY,
+    mode: str = "unknown",
+):
+    """
+    Execute coroutine with exponential backoff. Raises last exception if all retries fail.
+    A provider's Retry-After is waited out when it is longer than the backoff.
+
+    Under a request deadline each attempt is cut off when it expires, and a
+    retry whose backoff would outlast it isn't attempted; either raises
+    DeadlineExceeded.
+    """
     last_exc = None
     for attempt in range(attempts):
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded(f"LLM deadline passed before attempt {attempt + 1} for mode {mode}") from last_exc
         try:
-            return await coro()
+            async with asyncio.timeout(left):
+                return await coro()
+        except DeadlineExceeded:
+            raise
         except Exception as e:
+            if isinstance(e, TimeoutError) and deadline_passed():
+                raise DeadlineExceeded(f"LLM call for mode {mode} exceeded its deadline") from e
             last_exc = e
-            logger.warning("LLM call failed (attempt %s/%s): %s", attempt + 1, attempts, e)
+            logger.warning("LLM call failed for mode %s (attempt %s/%s): %s", mode, attempt + 1, attempts, e)
             if attempt < attempts - 1:
-                delay = base_delay * (2 ** attempt)
+                delay = max(base_delay * (2 ** attempt), _retry_after(e) or 0)
+                left = remaining()
+                if left is not None and delay >= left:
+                    raise DeadlineExceeded(f"No time left to retry mode {mode} before the deadline") from e
+                LLM_RETRIES.labels(mode).inc()
                 await asyncio.sleep(delay)
     raise last_exc
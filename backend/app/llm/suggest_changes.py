@@ -2,6 +2,17 @@ from app.llm.client import get_llm_client
 from app.llm.modes import MODES, SuggestPlanResponse
 from app.llm.retry import with_retry
 
+SYSTEM_PROMPT = """You are an expert interview coach. Analyze the current study plan you are given and suggest improvements.
+
+Based on the current plan, user progress, and feedback, suggest an updated plan that:
+1. Adjusts time allocation based on progress (spend more time on weak areas, less on mastered topics)
+2. Re-prioritizes topics if needed
+3. Maintains realistic daily time commitments
+4. Addresses any user feedback or concerns
+5. Explains the rationale for changes
+
+Respond with a JSON object matching the required schema."""
+
 
 async def suggest_plan_changes(
     current_plan: dict,
@@ -33,32 +44,24 @@ async def suggest_plan_changes(
     if user_feedback:
         feedback_text = f"\n\nUser Feedback:\n{user_feedback}"
     
-    prompt = f"""You are an expert interview coach. Analyze the current study plan and suggest improvements.
-
-User's Target Role: {role}
+    prompt = f"""User's Target Role: {role}
 
 Current Plan:
 {current_plan}
 
 User Context:
-{user_context}{progress_text}{feedback_text}
-
-Based on the current plan, user progress, and feedback, suggest an updated plan that:
-1. Adjusts time allocation based on progress (spend more time on weak areas, less on mastered topics)
-2. Re-prioritizes topics if needed
-3. Maintains realistic daily time commitments
-4. Addresses any user feedback or concerns
-5. Explains the rationale for changes
-
-Respond with a JSON object matching the required schema."""
+{user_context}{progress_text}{feedback_text}"""
     
     mode_config = MODES["suggest_plan_changes"]
     response = await with_retry(
         lambda: client.generate_structured(
             prompt=prompt,
+            system=SYSTEM_PROMPT,
             response_schema=mode_config["response_schema"],
             max_tokens=mode_config["max_tokens"],
             temperature=0.7,
-        )
+            mode="suggest_plan_changes",
+        ),
+        mode="suggest_plan_changes",
     )
     return SuggestPlanResponse(**response)
@@ -0,0 +1,111 @@
+"""Adaptive max_tokens per LLM mode, derived from observed output sizes."""
+import logging
+import math
+import threading
+from collections import defaultdict, deque
+
+from app.config import settings
+from app.llm.metrics import LLM_TRUNCATION_RATE
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBudget:
+    """
+    Tracks output token counts per mode and derives a p99-plus-margin cap.
+
+    Until a mode has seen enough samples the static default from MODES is used.
+    The derived cap never exceeds that default, so adapting can only shrink the
+    provider-side reservation; truncations are recorded so the rate can be
+    watched and the cap backed off if it turns out too tight.
+    """
+
+    def __init__(
+        self,
+        window: int = 500,
+        min_samples: int = 50,
+        percentile: float = 0.99,
+        margin: float = 1.25,
+        floor: int = 256,
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.margin = margin
+        self.floor = floor
+        self._samples: dict[str, deque[int]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._sorted: dict[str, list[int]] = {}  # sorted copy of _samples, dropped when a sample is added
+        self._calls: dict[str, int] = defaultdict(int)
+        self._truncations: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def max_tokens_for(self, mode: str, default: int) -> int:
+        """Return the max_tokens to request for `mode`, falling back to `default`."""
+        if not settings.LLM_ADAPTIVE_MAX_TOKENS:
+            return default
+        samples = self._sorted_samples(mode)
+        if len(samples) < self.min_samples:
+            return default
+        idx = min(len(samples) - 1, math.ceil(self.percentile * len(samples)) - 1)
+        cap = int(samples[idx] * self.margin)
+        return max(self.floor, min(cap, default))
+
+    def typical_output_tokens(self, mode: str) -> int | None:
+        """Median observed output for `mode`, or None before any samples."""
+        samples = self._sorted_samples(mode)
+        return samples[len(samples) // 2] if samples else None
+
+    def _sorted_samples(self, mode: str) -> list[int]:
+        """Samples for `mode` in order, re-sorted only after new samples arrive."""
+        with self._lock:
+            samples = self._sorted.get(mode)
+            if samples is None:
+                samples = self._sorted[mode] = sorted(self._samples[mode])
+            return samples
+
+    def record(self, mode: str, output_tokens: int | None, truncated: bool = False) -> None:
+        """Record one completion. Truncated outputs are not used to size the cap."""
+        with self._lock:
+            self._calls[mode] += 1
+            if truncated:
+                self._truncations[mode] += 1
+            elif output_tokens is not None:
+                self._samples[mode].append(output_tokens)
+                self._sorted.pop(mode, None)
+            LLM_TRUNCATION_RATE.labels(mode).set(self._truncations[mode] / self._calls[mode])
+        if truncated:
+            logger.warning(
+                "LLM output truncated for mode %s (truncation rate %.2f%%)",
+                mode,
+                self.truncation_rate(mode) * 100,
+            )
+
+    def truncation_rate(self, mode: str) -> float:
+        with self._lock:
+            calls = self._calls[mode]
+            return self._truncations[mode] / calls if calls else 0.0
+
+    def snapshot(self) -> dict[str, dict]:
+        """Per-mode call count, truncation count/rate and sample count."""
+        with self._lock:
+            modes = list(self._calls)
+        return {
+            mode: {
+                "calls": self._calls[mode],
+                "truncations": self._truncations[mode],
+                "truncation_rate": self.truncation_rate(mode),
+                "samples": len(self._samples[mode]),
+            }
+            for mode in modes
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._sorted.clear()
+            self._calls.clear()
+            self._truncations.clear()
+        LLM_TRUNCATION_RATE.clear()
+
+
+token_budget = TokenBudget()
@@ -0,0 +1,41 @@
+"""Per-mode token usage, including prompt-cache hits reported by the provider."""
+import threading
+from collections import Counter, defaultdict
+
+
+class UsageStats:
+    """Accumulates input, cached-input and output token counts per mode"""
+
+    def __init__(self):
+        self._totals: dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        mode: str,
+        input_tokens: int | None,
+        cached_input_tokens: int | None,
+        output_tokens: int | None,
+    ) -> None:
+        with self._lock:
+            totals = self._totals[mode]
+            totals["calls"] += 1
+            totals["input_tokens"] += input_tokens or 0
+            totals["cached_input_tokens"] += cached_input_tokens or 0
+            totals["output_tokens"] += output_tokens or 0
+
+    def snapshot(self) -> dict[str, dict]:
+        """Totals per mode plus the fraction of input tokens served from the prompt cache."""
+        with self._lock:
+            result = {mode: dict(totals) for mode, totals in self._totals.items()}
+        for totals in result.values():
+            inputs = totals.get("input_tokens", 0)
+            totals["cache_hit_ratio"] = totals.get("cached_input_tokens", 0) / inputs if inputs else 0.0
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+usage_stats = UsageStats()
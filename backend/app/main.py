@@ -1,18 +1,50 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client import multiprocess
 from app.config import settings
 from app.database import engine, Base
+from app.api.idempotency import IdempotencyMiddleware
 from app.api.routes import plan, study
+from app.observability.http import RequestMetricsMiddleware
+from app.observability.loop_monitor import create_loop_monitor
+from app.observability.profiling import ProfilingMiddleware
+from app.observability.sql import install_sql_instrumentation
+from app.services.interaction_heartbeats import heartbeats
+from app.services.session_sweeper import session_sweeper
 
 # Create database tables (in production, use Alembic migrations)
 # Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_monitor = create_loop_monitor()
+    if loop_monitor:
+        loop_monitor.start()
+    if settings.HEARTBEAT_BUFFER_ENABLED:
+        heartbeats.start(engine, settings.HEARTBEAT_FLUSH_INTERVAL_SECONDS)
+    if settings.SESSION_SWEEP_ENABLED:
+        session_sweeper.start(engine, settings.SESSION_SWEEP_INTERVAL_SECONDS)
+    yield
+    await session_sweeper.stop()
+    # Write interaction times still buffered (also when the buffer was switched off at runtime)
+    await heartbeats.stop(engine)
+    if loop_monitor:
+        await loop_monitor.stop()
+
+
 app = FastAPI(
     title="Interview Prep API",
     description="AI-powered interview preparation platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Idempotency-Key replay for mutating study endpoints (innermost, so replays get CORS headers too)
+app.add_middleware(IdempotencyMiddleware, routes=app.router.routes)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +54,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency/status metrics and slow-request log (DB and LLM time attributed per request)
+install_sql_instrumentation()
+app.add_middleware(RequestMetricsMiddleware, routes=app.router.routes)
+
+# Opt-in per-request sampling profiler; not installed at all when disabled
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 # Register API routes
 app.include_router(plan.router, prefix=settings.API_V1_PREFIX)
 app.include_router(study.router, prefix=settings.API_V1_PREFIX)
@@ -35,3 +75,14 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics. Aggregates across workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
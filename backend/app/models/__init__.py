@@ -1,7 +1,8 @@
 from app.models.user import User
 from app.models.plan import PlanTopic, TopicProgress
 from app.models.session import StudySession, RawUserContext
-from app.models.question import Question, QuestionAttempt, StoryStructure
+from app.models.idempotency import IdempotencyKey
+from app.models.question import Question, QuestionAttempt, StoryStructure, QuestionBankEntry, AnswerEvaluation
 
 __all__ = [
     "User",
@@ -12,4 +13,7 @@ __all__ = [
     "Question",
     "QuestionAttempt",
     "StoryStructure",
+    "QuestionBankEntry",
+    "AnswerEvaluation",
+    "IdempotencyKey",
 ]
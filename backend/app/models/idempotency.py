@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, LargeBinary
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """Stored response for a client-supplied Idempotency-Key, replayed on retries"""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(String, primary_key=True)  # Clerk user id of the caller (not a FK: recorded before auth)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)  # method, path and body; a reused key must match
+    status = Column(String, nullable=False)  # "in_progress" | "completed"
+    response_status = Column(Integer, nullable=True)
+    response_headers = Column(JSON, nullable=True)  # [[name, value], ...] exactly as sent
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, JSON, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, JSON, DateTime, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -11,11 +11,13 @@ class Question(Base):
     topic_id = Column(Integer, ForeignKey("plan_topics.id"), nullable=False, index=True)
     question = Column(Text, nullable=False)
     answer_anchors = Column(JSON, nullable=True)  # Stores answer anchors as JSON
+    anchors_updated_at = Column(DateTime(timezone=True), nullable=True)  # When answer_anchors were last generated
 
     # Relationships
     plan_topic = relationship("PlanTopic", back_populates="questions")
     question_attempts = relationship("QuestionAttempt", back_populates="question", cascade="all, delete-orphan")
     story_structures = relationship("StoryStructure", back_populates="question", cascade="all, delete-orphan")
+    answer_evaluations = relationship("AnswerEvaluation", back_populates="question", cascade="all, delete-orphan")
 
 
 class QuestionAttempt(Base):
@@ -46,3 +48,32 @@ class StoryStructure(Base):
     # Relationships
     question = relationship("Question", back_populates="story_structures")
     user = relationship("User", back_populates="story_structures")
+
+
+class QuestionBankEntry(Base):
+    """Generated question shared across users whose topics have the same fingerprint"""
+    __tablename__ = "question_bank"
+    __table_args__ = (UniqueConstraint("topic_fingerprint", "question_hash", name="uq_question_bank_topic_question"),)
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    topic_fingerprint = Column(String(32), nullable=False, index=True)  # normalized topic name + description
+    difficulty = Column(String, nullable=False)  # "easy" | "medium" | "hard"
+    question = Column(Text, nullable=False)
+    question_hash = Column(String(32), nullable=False)  # normalized question text, for de-duplication
+    times_served = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class AnswerEvaluation(Base):
+    """Stored evaluation of an answer, reused for exact and near-duplicate resubmissions"""
+    __tablename__ = "answer_evaluations"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False, index=True)
+    answer_hash = Column(String(32), nullable=False)  # normalized answer text
+    minhash = Column(JSON, nullable=False)  # MinHash signature of the answer's word shingles
+    evaluation = Column(JSON, nullable=False)  # EvaluateAnswerResponse as returned to the user
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    # Relationships
+    question = relationship("Question", back_populates="answer_evaluations")
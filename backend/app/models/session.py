@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, String, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -6,6 +6,15 @@ from app.database import Base
 
 class StudySession(Base):
     __tablename__ = "study_sessions"
+    __table_args__ = (
+        # Open sessions by idleness, for the stale-session sweeper
+        Index(
+            "ix_study_sessions_open_last_interaction",
+            "last_interaction_time",
+            postgresql_where=text("end_time IS NULL"),
+            sqlite_where=text("end_time IS NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(String, ForeignKey("users.clerk_user_id"), nullable=False, index=True)
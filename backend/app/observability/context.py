@@ -0,0 +1,30 @@
+"""Per-request timing context shared by the HTTP, SQL and LLM instrumentation."""
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+
+@dataclass
+class RequestStats:
+    """Time spent in the database and in LLM calls while serving one request"""
+    db_time: float = 0.0
+    db_statements: int = 0
+    llm_time: float = 0.0
+    llm_calls: int = 0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def start_request_stats() -> tuple[RequestStats, object]:
+    """Begin collecting stats for the current request. Returns (stats, reset token)."""
+    stats = RequestStats()
+    return stats, _request_stats.set(stats)
+
+
+def end_request_stats(token) -> None:
+    _request_stats.reset(token)
+
+
+def current_request_stats() -> RequestStats | None:
+    """Stats for the request being served, or None outside a request (e.g. scripts, tests)."""
+    return _request_stats.get()
@@ -0,0 +1,110 @@
+"""ASGI middleware recording per-route HTTP metrics and logging slow requests."""
+import json
+import logging
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.routing import Match
+
+from app.config import settings
+from app.observability.context import end_request_stats, start_request_stats
+
+slow_request_logger = logging.getLogger("app.slow_requests")
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+HTTP_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ("method", "route"),
+    multiprocess_mode="livesum",
+)
+HTTP_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "SQL statements issued per request",
+    ("method", "route"),
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+HTTP_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL per request",
+    ("method", "route"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+HTTP_RESPONSES = Counter(
+    "http_responses_total",
+    "HTTP responses by route template and status code",
+    ("method", "route", "status"),
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware, so streaming and background
+    tasks are unaffected). Routes are labelled by their template, e.g.
+    /api/v1/study/session/{session_id}, to keep label cardinality bounded.
+    """
+
+    def __init__(self, app, routes):
+        self.app = app
+        self.routes = routes
+
+    def _route_template(self, scope) -> str:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path_format", route.path)
+        return UNMATCHED_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        status_code = 500
+        stats, token = start_request_stats()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.DEBUG:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-statements", str(stats.db_statements).encode()),
+                        (b"x-db-time-ms", f"{stats.db_time * 1000:.1f}".encode()),
+                    ]
+            await send(message)
+
+        HTTP_IN_PROGRESS.labels(method, route).inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            HTTP_IN_PROGRESS.labels(method, route).dec()
+            HTTP_LATENCY.labels(method, route).observe(duration)
+            HTTP_RESPONSES.labels(method, route, str(status_code)).inc()
+            HTTP_DB_STATEMENTS.labels(method, route).observe(stats.db_statements)
+            HTTP_DB_TIME.labels(method, route).observe(stats.db_time)
+            if duration * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+                slow_request_logger.warning(json.dumps({
+                    "event": "slow_request",
+                    "method": method,
+                    "route": route,
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(duration * 1000, 1),
+                    "db_ms": round(stats.db_time * 1000, 1),
+                    "db_statements": stats.db_statements,
+                    "llm_ms": round(stats.llm_time * 1000, 1),
+                    "llm_calls": stats.llm_calls,
+                }))
+            end_request_stats(token)
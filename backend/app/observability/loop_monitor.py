@@ -0,0 +1,87 @@
+"""
+Event-loop lag monitor.
+
+A coroutine sleeps for a fixed interval and records how late it wakes up; that
+delay is time the loop spent running something else without yielding (a sync
+SDK or ORM call inside an async route, for example). A watchdog thread checks
+the coroutine's heartbeat and, if the loop has been stuck longer than the
+threshold, logs the loop thread's current stack so the blocking call can be found.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from prometheus_client import Histogram
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between when the loop monitor should have woken and when it did",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float, stack_threshold: float):
+        self.interval = interval
+        self.stack_threshold = stack_threshold
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    async def _measure(self) -> None:
+        while True:
+            started = time.monotonic()
+            self._heartbeat = started
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(0.0, time.monotonic() - started - self.interval))
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat - self.interval
+            if stalled_for < self.stack_threshold or heartbeat == reported_heartbeat:
+                continue
+            # Report each stall once, with the stack of whatever is holding the loop
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<unavailable>"
+            logger.warning(
+                "Event loop blocked for %.0f ms; loop thread stack:\n%s",
+                stalled_for * 1000,
+                stack,
+            )
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+def create_loop_monitor() -> LoopLagMonitor | None:
+    if not settings.LOOP_MONITOR_ENABLED:
+        return None
+    return LoopLagMonitor(
+        interval=settings.LOOP_MONITOR_INTERVAL_MS / 1000,
+        stack_threshold=settings.LOOP_BLOCKED_STACK_THRESHOLD_MS / 1000,
+    )
@@ -0,0 +1,96 @@
+"""
+Opt-in per-request sampling profiler.
+
+When PROFILING_ENABLED is set, a request is profiled if it carries
+`X-Profile: <PROFILING_ADMIN_TOKEN>` or is picked by PROFILING_SAMPLE_RATE.
+A background thread samples the event-loop thread's stack every
+PROFILING_INTERVAL_MS and the result is written to PROFILING_OUTPUT_DIR in
+collapsed-stack format ("frame;frame;frame count"), which flamegraph.pl,
+speedscope and inferno read directly.
+
+The loop thread is shared, so samples can include other requests running
+concurrently; profile under low concurrency for a clean picture. When profiling
+is disabled the middleware is not installed at all.
+"""
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+
+
+class StackSampler:
+    """Samples one thread's stack on an interval and aggregates collapsed stacks"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        token = settings.PROFILING_ADMIN_TOKEN
+        if token:
+            for name, value in scope.get("headers", []):
+                if name == PROFILE_HEADER:
+                    return hmac.compare_digest(value.decode("latin-1"), token)
+        return random.random() < settings.PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(threading.get_ident(), settings.PROFILING_INTERVAL_MS / 1000)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.stop()
+            self._write(scope, sampler)
+
+    @staticmethod
+    def _write(scope, sampler: StackSampler) -> None:
+        os.makedirs(settings.PROFILING_OUTPUT_DIR, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", f"{scope['method']}_{scope['path']}").strip("_")
+        path = os.path.join(settings.PROFILING_OUTPUT_DIR, f"{slug}_{time.time_ns()}.collapsed")
+        with open(path, "w") as f:
+            f.write(sampler.collapsed())
+        logger.info("Wrote request profile (%d samples) to %s", sum(sampler.stacks.values()), path)
@@ -0,0 +1,46 @@
+"""SQLAlchemy event hooks that attribute database statements and time to the current request."""
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, raiseload
+
+from app.config import settings
+from app.observability.context import current_request_stats
+
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = current_request_stats()
+    if stats is not None:
+        stats.db_time += time.perf_counter() - started
+        stats.db_statements += 1
+
+
+def _strict_loading(orm_execute_state):
+    """
+    In strict mode every ORM SELECT gets raiseload("*"), so touching a relationship
+    that wasn't loaded explicitly (the usual source of N+1 queries) raises instead
+    of silently issuing a query. Explicit loader options still take precedence.
+    """
+    if not settings.SQL_STRICT_LOADING:
+        return
+    if orm_execute_state.is_select and not orm_execute_state.is_relationship_load:
+        orm_execute_state.statement = orm_execute_state.statement.options(raiseload("*"))
+
+
+def install_sql_instrumentation() -> None:
+    """Listen on every Engine/Session (the app's and any test engine). Safe to call more than once."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Session, "do_orm_execute", _strict_loading)
+    _installed = True
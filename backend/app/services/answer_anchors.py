@@ -0,0 +1,73 @@
+"""
+Background refresh of a question's stored answer anchors.
+
+evaluate_answer uses stored anchors as the rubric, so the model doesn't
+regenerate them on every attempt. Anchors older than
+ANSWER_ANCHORS_MAX_AGE_DAYS (or from before anchors were timestamped) are
+regenerated off the request path, at most once at a time per question in
+this process. The write runs in a worker thread with its own session, so the
+sync database call doesn't block the event loop.
+"""
+import asyncio
+import contextvars
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.llm.generate_anchors import generate_anchors
+from app.models.question import Question
+
+logger = logging.getLogger(__name__)
+
+_refreshing: set[int] = set()
+_tasks: set[asyncio.Task] = set()  # strong references so pending refreshes aren't garbage collected
+
+
+def anchors_are_stale(question: Question) -> bool:
+    updated = question.anchors_updated_at
+    if updated is None:
+        return True
+    if updated.tzinfo is None:
+        updated = updated.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - updated > timedelta(days=settings.ANSWER_ANCHORS_MAX_AGE_DAYS)
+
+
+def schedule_anchor_refresh(db: Session, question_id: int, question_text: str, question_context: str | None) -> None:
+    """Regenerate a question's anchors in the background. Must be called from the event loop."""
+    if question_id in _refreshing:
+        return
+    _refreshing.add(question_id)
+    # Own session on the same engine: the request's session is closed by the time this runs
+    task = asyncio.get_running_loop().create_task(
+        refresh_anchors(db.get_bind(), question_id, question_text, question_context),
+        context=contextvars.Context(),
+    )
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def refresh_anchors(
+    bind: Engine | Connection,
+    question_id: int,
+    question_text: str,
+    question_context: str | None,
+) -> None:
+    try:
+        result = await generate_anchors(question_text, question_context)
+        await asyncio.to_thread(_store_anchors, bind, question_id, [a.model_dump() for a in result.anchors])
+    except Exception as e:
+        logger.warning("Anchor refresh failed for question %s: %s", question_id, e)
+    finally:
+        _refreshing.discard(question_id)
+
+
+def _store_anchors(bind: Engine | Connection, question_id: int, anchors: list[dict]) -> None:
+    with Session(bind=bind) as db:
+        db.query(Question).filter(Question.id == question_id).update({
+            Question.answer_anchors: anchors,
+            Question.anchors_updated_at: datetime.now(timezone.utc),
+        })
+        db.commit()
@@ -0,0 +1,164 @@
+"""
+Reuse of evaluations for resubmitted answers.
+
+Each stored evaluation is indexed by question with an exact hash of the
+normalized answer and a MinHash signature of its word shingles. An answer
+that matches exactly, or whose estimated Jaccard similarity to a stored
+answer reaches ANSWER_REUSE_SIMILARITY, gets that evaluation back without an
+LLM call.
+
+Evaluations are persisted in answer_evaluations (at most
+ANSWER_REUSE_MAX_PER_QUESTION per question). Signatures for recently used
+questions are cached in an LRU of ANSWER_REUSE_CACHE_QUESTIONS entries; a
+new evaluation enters the cache only once its row is committed. Evaluations
+stored by another worker are picked up when the question's
+cache entry is next loaded.
+"""
+import hashlib
+import random
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from prometheus_client import Counter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.llm.modes import EvaluateAnswerResponse
+from app.models.question import AnswerEvaluation
+
+NUM_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)  # fixed so persisted signatures stay comparable across restarts
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)
+]
+NON_WORD = re.compile(r"[^a-z0-9]+")
+PENDING_INFO_KEY = "answer_index_pending"  # Session.info key for entries awaiting commit
+
+ANSWER_REUSE = Counter(
+    "answer_reuse_total",
+    "evaluate_answer requests by reuse outcome: exact, near (MinHash) or miss",
+    ("outcome",),
+)
+
+
+def _words(text: str) -> list[str]:
+    return NON_WORD.sub(" ", text.lower()).split()
+
+
+def answer_hash(answer: str) -> str:
+    return hashlib.sha256(" ".join(_words(answer)).encode()).hexdigest()[:32]
+
+
+def minhash(answer: str) -> list[int]:
+    """MinHash signature over word shingles, for estimating Jaccard similarity"""
+    words = _words(answer)
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(left: list[int], right: list[int]) -> float:
+    return sum(1 for x, y in zip(left, right) if x == y) / NUM_PERMUTATIONS
+
+
+@dataclass
+class _Entry:
+    answer_hash: str
+    signature: list[int]
+    evaluation: dict
+
+
+class AnswerIndex:
+    """Per-question answer fingerprints backed by answer_evaluations, with an LRU of loaded questions"""
+
+    def __init__(self, max_questions: int):
+        self.max_questions = max_questions
+        self._cache: OrderedDict[int, list[_Entry]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, db: Session, question_id: int, answer: str) -> EvaluateAnswerResponse | None:
+        """Stored evaluation for an identical or near-identical answer, if any"""
+        entries = self._entries(db, question_id)
+        digest = answer_hash(answer)
+        for entry in entries:
+            if entry.answer_hash == digest:
+                ANSWER_REUSE.labels("exact").inc()
+                return EvaluateAnswerResponse(**entry.evaluation)
+        signature = minhash(answer)
+        best = max(entries, key=lambda e: similarity(signature, e.signature), default=None)
+        if best is not None and similarity(signature, best.signature) >= settings.ANSWER_REUSE_SIMILARITY:
+            ANSWER_REUSE.labels("near").inc()
+            return EvaluateAnswerResponse(**best.evaluation)
+        ANSWER_REUSE.labels("miss").inc()
+        return None
+
+    def add(self, db: Session, question_id: int, answer: str, evaluation: EvaluateAnswerResponse) -> None:
+        """Stage an evaluation for reuse; it is persisted with the caller's commit"""
+        entry = _Entry(answer_hash(answer), minhash(answer), evaluation.model_dump())
+        # Keep the newest MAX_PER_QUESTION - 1 existing rows, plus the one added below
+        stale_ids = [
+            row_id for (row_id,) in db.query(AnswerEvaluation.id)
+            .filter(AnswerEvaluation.question_id == question_id)
+            .order_by(AnswerEvaluation.id.desc())
+            .offset(settings.ANSWER_REUSE_MAX_PER_QUESTION - 1)
+        ]
+        if stale_ids:
+            db.query(AnswerEvaluation).filter(AnswerEvaluation.id.in_(stale_ids)).delete(synchronize_session=False)
+        db.add(AnswerEvaluation(
+            question_id=question_id,
+            answer_hash=entry.answer_hash,
+            minhash=entry.signature,
+            evaluation=entry.evaluation,
+        ))
+        db.info.setdefault(PENDING_INFO_KEY, []).append((self, question_id, entry))
+
+    def _remember(self, question_id: int, entry: _Entry) -> None:
+        with self._lock:
+            cached = self._cache.get(question_id)
+            if cached is not None:
+                cached.insert(0, entry)
+                del cached[settings.ANSWER_REUSE_MAX_PER_QUESTION:]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def _entries(self, db: Session, question_id: int) -> list[_Entry]:
+        with self._lock:
+            if question_id in self._cache:
+                self._cache.move_to_end(question_id)
+                return list(self._cache[question_id])
+        rows = (
+            db.query(AnswerEvaluation)
+            .filter(AnswerEvaluation.question_id == question_id)
+            .order_by(AnswerEvaluation.id.desc())
+            .limit(settings.ANSWER_REUSE_MAX_PER_QUESTION)
+            .all()
+        )
+        entries = [_Entry(r.answer_hash, r.minhash, r.evaluation) for r in rows]
+        with self._lock:
+            self._cache[question_id] = entries
+            self._cache.move_to_end(question_id)
+            while len(self._cache) > self.max_questions:
+                self._cache.popitem(last=False)
+        return list(entries)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_committed(db: Session) -> None:
+    # Only committed evaluations are cached, so a rolled-back one is never served
+    for index, question_id, entry in db.info.pop(PENDING_INFO_KEY, []):
+        index._remember(question_id, entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(db: Session) -> None:
+    db.info.pop(PENDING_INFO_KEY, None)
+
+
+answer_index = AnswerIndex(max_questions=settings.ANSWER_REUSE_CACHE_QUESTIONS)
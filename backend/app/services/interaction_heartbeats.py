@@ -0,0 +1,119 @@
+"""
+Write-behind buffer for study sessions' last_interaction_time.
+
+Answers (and timer heartbeats) only record the latest interaction time per
+session in memory. A background task writes all pending timestamps in one
+batched UPDATE every HEARTBEAT_FLUSH_INTERVAL_SECONDS, and once more at
+shutdown. A crash loses at most one interval of interaction times, which
+only delays when an idle session is considered stale.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+
+from prometheus_client import Counter
+from sqlalchemy import case, or_
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.session import StudySession
+
+logger = logging.getLogger(__name__)
+
+HEARTBEATS = Counter(
+    "session_heartbeats_total",
+    "Session interaction timestamps by outcome: recorded, or flushed (rows written)",
+    ("outcome",),
+)
+
+
+class HeartbeatBuffer:
+    """Latest pending interaction time per session, flushed in batches"""
+
+    def __init__(self):
+        self._pending: dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    def record(self, session_id: int, when: datetime | None = None) -> None:
+        when = when or datetime.now(timezone.utc)
+        with self._lock:
+            current = self._pending.get(session_id)
+            if current is None or when > current:
+                self._pending[session_id] = when
+        HEARTBEATS.labels("recorded").inc()
+
+    def flush(self, bind: Engine | Connection) -> int:
+        """Write pending timestamps in one UPDATE; returns the number of sessions written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        latest = case(pending, value=StudySession.id)
+        try:
+            with Session(bind=bind) as db:
+                db.query(StudySession).filter(
+                    StudySession.id.in_(list(pending)),
+                    # Never move a session's time backwards (e.g. past another worker's flush)
+                    or_(StudySession.last_interaction_time.is_(None), StudySession.last_interaction_time < latest),
+                ).update({StudySession.last_interaction_time: latest}, synchronize_session=False)
+                db.commit()
+        except Exception:
+            # Keep them for the next flush, without overwriting anything newer recorded meanwhile
+            with self._lock:
+                for session_id, when in pending.items():
+                    current = self._pending.get(session_id)
+                    if current is None or when > current:
+                        self._pending[session_id] = when
+            raise
+        HEARTBEATS.labels("flushed").inc(len(pending))
+        return len(pending)
+
+    def start(self, bind: Engine | Connection, interval: float) -> None:
+        """Flush every interval in the background. Must be called from the event loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run(bind, interval))
+
+    async def stop(self, bind: Engine | Connection) -> None:
+        """Stop the background flush and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.to_thread(self.flush, bind)
+        except Exception as e:
+            logger.error("Final interaction heartbeat flush failed; %s sessions not written: %s", len(self), e)
+
+    async def _run(self, bind: Engine | Connection, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.flush, bind)
+            except Exception as e:
+                logger.warning("Interaction heartbeat flush failed: %s", e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+heartbeats = HeartbeatBuffer()
+
+
+def touch_session(db: Session, session_id: int) -> None:
+    """Record an interaction with a session, buffered unless HEARTBEAT_BUFFER_ENABLED is off"""
+    if settings.HEARTBEAT_BUFFER_ENABLED:
+        heartbeats.record(session_id)
+        return
+    db.query(StudySession).filter(StudySession.id == session_id).update(
+        {StudySession.last_interaction_time: datetime.now(timezone.utc)},
+        synchronize_session=False,
+    )
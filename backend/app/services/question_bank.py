@@ -0,0 +1,191 @@
+"""
+Shared per-topic question bank.
+
+Many users have topics with the same name ("System Design"), so generated
+questions are stored against a fingerprint of the normalized topic name and
+description. A question set is assembled from the bank first, skipping
+questions the user has already mastered, and the LLM is only asked to top up
+the difficulties the bank can't fill. Its output goes back into the bank.
+"""
+import hashlib
+import re
+from dataclasses import dataclass, field
+
+from prometheus_client import Counter
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.llm.generate_questions import generate_questions
+from app.llm.modes import GenerateQuestionsResponse, QuestionSchema
+from app.models.question import QuestionBankEntry
+
+# Candidates loaded per lookup; the least-served questions come first
+BANK_LOOKUP_LIMIT = 200
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it of on or the to with your you".split()
+)
+NON_WORD = re.compile(r"[^a-z0-9]+")
+
+QUESTION_BANK_QUESTIONS = Counter(
+    "question_bank_questions_total",
+    "Questions served in generate_questions sets, by source: bank or llm",
+    ("source",),
+)
+QUESTION_BANK_REQUESTS = Counter(
+    "question_bank_requests_total",
+    "Question sets by bank coverage: full_hit (no LLM call), partial or miss",
+    ("outcome",),
+)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(NON_WORD.sub(" ", text.lower()).split())
+
+
+def topic_fingerprint(name: str, description: str) -> str:
+    """Stable key for equivalent topics: normalized name plus the description's distinct content words"""
+    words = sorted({w for w in _normalize(description).split() if w not in STOPWORDS})
+    key = f"{_normalize(name)}|{' '.join(words)}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def question_hash(question: str) -> str:
+    return hashlib.sha256(_normalize(question).encode()).hexdigest()[:32]
+
+
+@dataclass
+class QuestionSetPlan:
+    """Bank questions chosen for a set, and how many of each difficulty the LLM must supply"""
+    fingerprint: str
+    selected: list[QuestionSchema] = field(default_factory=list)
+    selected_ids: list[int] = field(default_factory=list)
+    mastered: list[str] = field(default_factory=list)  # question hashes the user shouldn't be served
+    gaps: dict[str, int] | None = None  # None: bank disabled, use whatever the LLM returns
+    generated: GenerateQuestionsResponse | None = None
+
+
+def plan_question_set(
+    db: Session,
+    topic_name: str,
+    topic_description: str,
+    previously_asked: list[dict],
+) -> QuestionSetPlan:
+    """Pick bank questions for each difficulty in the configured mix, skipping mastered ones"""
+    plan = QuestionSetPlan(fingerprint=topic_fingerprint(topic_name, topic_description))
+    if not settings.QUESTION_BANK_ENABLED:
+        return plan
+
+    best_rating: dict[str, int] = {}
+    for q in previously_asked:
+        key = question_hash(q["question"])
+        best_rating[key] = max(best_rating.get(key, 0), q["rating"])
+    plan.mastered = [k for k, rating in best_rating.items() if rating >= settings.QUESTION_BANK_MASTERED_SCORE]
+
+    query = db.query(QuestionBankEntry).filter(QuestionBankEntry.topic_fingerprint == plan.fingerprint)
+    if plan.mastered:
+        query = query.filter(QuestionBankEntry.question_hash.notin_(plan.mastered))
+    candidates = (
+        query.order_by(QuestionBankEntry.times_served.asc(), QuestionBankEntry.id.asc())
+        .limit(BANK_LOOKUP_LIMIT)
+        .all()
+    )
+
+    plan.gaps = dict(settings.QUESTION_BANK_DIFFICULTY_MIX)
+    for entry in candidates:
+        if plan.gaps.get(entry.difficulty, 0) <= 0:
+            continue
+        plan.gaps[entry.difficulty] -= 1
+        attempted = entry.question_hash in best_rating
+        plan.selected.append(QuestionSchema(
+            question=entry.question,
+            status="redo" if attempted else "new",
+            redo_reason="weak_answer" if attempted else None,
+            difficulty=entry.difficulty,
+        ))
+        plan.selected_ids.append(entry.id)
+    return plan
+
+
+async def top_up(
+    plan: QuestionSetPlan,
+    topic_name: str,
+    topic_description: str,
+    previously_asked: list[dict],
+) -> QuestionSetPlan:
+    """Ask the LLM for the difficulties the bank couldn't fill (no call when the bank covers the set)"""
+    if plan.gaps is None:
+        plan.generated = await generate_questions(topic_name, topic_description, previously_asked or None)
+    elif any(plan.gaps.values()):
+        plan.generated = await generate_questions(
+            topic_name,
+            topic_description,
+            previously_asked or None,
+            difficulties={level: n for level, n in plan.gaps.items() if n > 0},
+        )
+    return plan
+
+
+def complete_question_set(db: Session, plan: QuestionSetPlan) -> list[QuestionSchema]:
+    """Merge LLM output into the set, store it in the bank, and record bank usage"""
+    if plan.gaps is None:
+        return plan.generated.questions if plan.generated else []
+
+    questions = list(plan.selected)
+    if plan.generated:
+        gaps = dict(plan.gaps)
+        seen = {question_hash(q.question) for q in questions} | set(plan.mastered)
+        leftovers = []
+        for q in plan.generated.questions:
+            key = question_hash(q.question)
+            if key in seen:
+                continue
+            seen.add(key)
+            q.difficulty = q.difficulty.lower()
+            if gaps.get(q.difficulty, 0) > 0:
+                gaps[q.difficulty] -= 1
+                questions.append(q)
+            else:
+                leftovers.append(q)
+        questions.extend(leftovers[:sum(gaps.values())])
+        served = {question_hash(q.question) for q in questions}
+        _store(db, plan.fingerprint, plan.generated.questions, served)
+
+    if plan.selected_ids:
+        db.query(QuestionBankEntry).filter(QuestionBankEntry.id.in_(plan.selected_ids)).update(
+            {QuestionBankEntry.times_served: QuestionBankEntry.times_served + 1},
+            synchronize_session=False,
+        )
+    db.commit()
+
+    from_bank = len(plan.selected)
+    QUESTION_BANK_QUESTIONS.labels("bank").inc(from_bank)
+    QUESTION_BANK_QUESTIONS.labels("llm").inc(len(questions) - from_bank)
+    if plan.generated is None:
+        QUESTION_BANK_REQUESTS.labels("full_hit").inc()
+    else:
+        QUESTION_BANK_REQUESTS.labels("partial" if from_bank else "miss").inc()
+    return questions
+
+
+def _store(db: Session, fingerprint: str, generated: list[QuestionSchema], served: set[str]) -> None:
+    rows = [
+        {
+            "topic_fingerprint": fingerprint,
+            "difficulty": q.difficulty.lower(),
+            "question": q.question,
+            "question_hash": h,
+            "times_served": 1 if h in served else 0,
+        }
+        for h, q in {question_hash(q.question): q for q in generated}.items()
+    ]
+    if not rows:
+        return
+    # Questions already banked (possibly by another worker just now) are skipped row by row;
+    # theirs is as good as ours, and the rest of the batch is still stored
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    db.execute(
+        insert(QuestionBankEntry).values(rows).on_conflict_do_nothing(
+            index_elements=[QuestionBankEntry.topic_fingerprint, QuestionBankEntry.question_hash]
+        )
+    )
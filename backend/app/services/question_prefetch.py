@@ -0,0 +1,102 @@
+"""
+Background question generation kicked off at start_session.
+
+The frontend requests questions immediately after starting a session, so
+start_session schedules the generation and generate_questions claims the
+result (or awaits the in-flight task). Entries live in this process only;
+a request landing on another worker simply generates inline. So does a
+request whose prefetch was skipped (the generation returned None).
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from prometheus_client import Counter
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUESTION_PREFETCH = Counter(
+    "question_prefetch_total",
+    "generate_questions requests by prefetch outcome: ready, in_flight, miss, expired, skipped or failed",
+    ("outcome",),
+)
+
+
+@dataclass
+class PrefetchEntry:
+    task: asyncio.Task
+    created: float = field(default_factory=time.monotonic)
+
+
+class QuestionPrefetcher:
+    """Per-session background question generation with expiry"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[int, PrefetchEntry] = {}
+
+    def start(self, session_id: int, generate: Callable[[], Awaitable[Any]]) -> None:
+        """Schedule generation for a session. Must be called from the event loop."""
+        self._expire()
+        while len(self._entries) >= self.max_entries:
+            self._drop(next(iter(self._entries)))
+        # Empty context so the background LLM time isn't attributed to start_session's request stats
+        task = asyncio.get_running_loop().create_task(generate(), context=contextvars.Context())
+        task.add_done_callback(_log_failure)
+        self._entries[session_id] = PrefetchEntry(task)
+
+    async def claim(self, session_id: int) -> Any | None:
+        """
+        Take the prefetched result for a session, awaiting it if still running.
+        Returns None when there is nothing usable, so the caller generates inline.
+        """
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            QUESTION_PREFETCH.labels("miss").inc()
+            return None
+        task = entry.task
+        if time.monotonic() - entry.created > self.ttl_seconds or task.get_loop() is not asyncio.get_running_loop():
+            task.cancel()
+            QUESTION_PREFETCH.labels("expired").inc()
+            return None
+        outcome = "ready" if task.done() else "in_flight"
+        try:
+            result = await task
+        except Exception:
+            QUESTION_PREFETCH.labels("failed").inc()
+            return None
+        QUESTION_PREFETCH.labels(outcome if result is not None else "skipped").inc()
+        return result
+
+    def discard(self, session_id: int) -> None:
+        self._drop(session_id)
+
+    def _drop(self, session_id: int) -> None:
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            entry.task.cancel()
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        for session_id in [sid for sid, e in self._entries.items() if e.created < cutoff]:
+            self._drop(session_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _log_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Question prefetch failed: %s", task.exception())
+
+
+question_prefetcher = QuestionPrefetcher(
+    ttl_seconds=settings.QUESTION_PREFETCH_TTL_SECONDS,
+    max_entries=settings.QUESTION_PREFETCH_MAX_ENTRIES,
+)
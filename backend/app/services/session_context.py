@@ -0,0 +1,111 @@
+"""
+Per-worker cache of active study session context.
+
+evaluate_answer, generate_questions and generate_story only need to know
+that the session belongs to the caller and which topic (name and
+description) it is for. start_session caches that, so these calls skip the
+StudySession and PlanTopic reads. end_session and plan approval invalidate
+entries in this worker, and entries expire after
+SESSION_CONTEXT_CACHE_TTL_SECONDS, which bounds how stale another worker's
+copy can get.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from prometheus_client import Counter
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.plan import PlanTopic
+from app.models.session import StudySession
+
+SESSION_CONTEXT_CACHE = Counter(
+    "session_context_cache_total",
+    "Study session context lookups by outcome: hit or miss",
+    ("outcome",),
+)
+
+
+@dataclass(frozen=True)
+class SessionContext:
+    session_id: int
+    user_id: str
+    topic_id: int
+    topic_name: str | None  # None when the topic no longer exists
+    topic_description: str | None
+
+
+class SessionContextCache:
+    """LRU of active sessions' context with expiry"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[SessionContext, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, context: SessionContext) -> None:
+        if not settings.SESSION_CONTEXT_CACHE_ENABLED:
+            return
+        with self._lock:
+            self._entries[context.session_id] = (context, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(context.session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, session_id: int, user_id: str) -> SessionContext | None:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            context, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+        # Another user's session is treated as unknown, so the caller's DB lookup 404s
+        return context if context.user_id == user_id else None
+
+    def load(self, db: Session, session_id: int, user_id: str) -> SessionContext | None:
+        """Cached context for the user's session, else read (and cache it if still open); None if not theirs"""
+        context = self.get(session_id, user_id)
+        if context is not None:
+            SESSION_CONTEXT_CACHE.labels("hit").inc()
+            return context
+        SESSION_CONTEXT_CACHE.labels("miss").inc()
+        row = (
+            db.query(StudySession.topic_id, StudySession.end_time, PlanTopic.name, PlanTopic.description)
+            .outerjoin(PlanTopic, PlanTopic.id == StudySession.topic_id)
+            .filter(StudySession.id == session_id, StudySession.user_id == user_id)
+            .first()
+        )
+        if row is None:
+            return None
+        context = SessionContext(session_id, user_id, row.topic_id, row.name, row.description)
+        if row.end_time is None:
+            self.put(context)
+        return context
+
+    def invalidate(self, session_id: int) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            for session_id in [sid for sid, (c, _) in self._entries.items() if c.user_id == user_id]:
+                del self._entries[session_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+session_contexts = SessionContextCache(
+    ttl_seconds=settings.SESSION_CONTEXT_CACHE_TTL_SECONDS,
+    max_entries=settings.SESSION_CONTEXT_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,185 @@
+"""
+Periodic auto-close of study sessions left open (e.g. the tab was closed).
+
+Open sessions idle for longer than SESSION_IDLE_TIMEOUT_MINUTES are found
+through the partial index on open sessions' last_interaction_time. Each
+batch of up to SESSION_SWEEP_BATCH_SIZE sessions is closed with a single
+UPDATE, with end_time set to the last interaction. Topic progress for the
+whole batch is then updated set-wise: planned time is summed per user and
+topic, and strength is the average attempt score. No LLM reconciliation
+runs, unlike end_session.
+
+Batches lock their rows with FOR UPDATE SKIP LOCKED and take a transaction
+advisory lock on PostgreSQL, so concurrent sweeps in several workers never
+close or count a session twice.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from prometheus_client import Counter
+from sqlalchemy import func, insert, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.plan import TopicProgress
+from app.models.question import QuestionAttempt
+from app.models.session import StudySession
+from app.services.interaction_heartbeats import heartbeats
+from app.services.session_context import session_contexts
+
+logger = logging.getLogger(__name__)
+
+SWEEP_LOCK_KEY = 0x5E55_0001  # pg advisory lock id for sweep batches
+
+SESSIONS_AUTO_CLOSED = Counter(
+    "study_sessions_auto_closed_total",
+    "Idle study sessions closed by the stale-session sweeper",
+)
+
+
+def stale_session_ids(db: Session, idle_before: datetime, limit: int, lock: bool = True) -> list[int]:
+    """Oldest open sessions idle since before idle_before (served by ix_study_sessions_open_last_interaction)"""
+    query = (
+        db.query(StudySession.id)
+        .filter(StudySession.end_time.is_(None), StudySession.last_interaction_time < idle_before)
+        .order_by(StudySession.last_interaction_time)
+        .limit(limit)
+    )
+    if lock:
+        query = query.with_for_update(skip_locked=True)
+    return [session_id for (session_id,) in query]
+
+
+def close_sessions(db: Session, session_ids: list[int]) -> list[int]:
+    """Close still-open sessions and fold them into topic progress; returns the ids closed. Caller commits."""
+    closed = db.execute(
+        update(StudySession)
+        .where(StudySession.id.in_(session_ids), StudySession.end_time.is_(None))
+        .values(end_time=StudySession.last_interaction_time)
+        .returning(StudySession.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if not closed:
+        return []
+
+    minutes = {
+        (user_id, topic_id): total or 0
+        for user_id, topic_id, total in db.query(
+            StudySession.user_id, StudySession.topic_id, func.sum(StudySession.planned_duration)
+        )
+        .filter(StudySession.id.in_(closed))
+        .group_by(StudySession.user_id, StudySession.topic_id)
+    }
+    scores = {
+        (user_id, topic_id): int(avg)
+        for user_id, topic_id, avg in db.query(
+            StudySession.user_id, StudySession.topic_id, func.avg(QuestionAttempt.score_rating)
+        )
+        .join(QuestionAttempt, QuestionAttempt.study_session_id == StudySession.id)
+        .filter(StudySession.id.in_(closed), QuestionAttempt.score_rating.is_not(None))
+        .group_by(StudySession.user_id, StudySession.topic_id)
+    }
+    existing = {
+        (p.user_id, p.topic_id): p
+        for p in db.query(TopicProgress.id, TopicProgress.user_id, TopicProgress.topic_id,
+                          TopicProgress.strength_rating, TopicProgress.total_time_spent)
+        .filter(
+            TopicProgress.user_id.in_({user_id for user_id, _ in minutes}),
+            TopicProgress.topic_id.in_({topic_id for _, topic_id in minutes}),
+        )
+    }
+    updates, inserts = [], []
+    for key, total in minutes.items():
+        progress = existing.get(key)
+        if progress is None:
+            inserts.append({
+                "user_id": key[0],
+                "topic_id": key[1],
+                "strength_rating": scores.get(key),
+                "total_time_spent": total,
+            })
+        else:
+            updates.append({
+                "id": progress.id,
+                "strength_rating": scores.get(key, progress.strength_rating),
+                "total_time_spent": (progress.total_time_spent or 0) + total,
+            })
+    if updates:
+        db.execute(update(TopicProgress), updates)
+    if inserts:
+        db.execute(insert(TopicProgress), inserts)
+    return closed
+
+
+def sweep_stale_sessions(
+    bind: Engine | Connection,
+    idle_minutes: float,
+    batch_size: int,
+    max_batches: int,
+) -> int:
+    """Close idle open sessions in committed batches; returns how many were closed"""
+    idle_before = datetime.now(timezone.utc) - timedelta(minutes=idle_minutes)
+    total = 0
+    for _ in range(max_batches):
+        with Session(bind=bind) as db:
+            if db.get_bind().dialect.name == "postgresql":
+                if not db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": SWEEP_LOCK_KEY}).scalar():
+                    break  # another worker is sweeping
+            candidates = stale_session_ids(db, idle_before, batch_size)
+            if not candidates:
+                break
+            closed = close_sessions(db, candidates)
+            db.commit()
+        for session_id in closed:
+            session_contexts.invalidate(session_id)
+        total += len(closed)
+        if len(candidates) < batch_size:
+            break
+    if total:
+        SESSIONS_AUTO_CLOSED.inc(total)
+        logger.info("Auto-closed %s idle study sessions", total)
+    return total
+
+
+class SessionSweeper:
+    """Runs sweep_stale_sessions every interval in the background"""
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    def start(self, bind: Engine | Connection, interval: float) -> None:
+        """Must be called from the event loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run(bind, interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, bind: Engine | Connection, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.sweep, bind)
+            except Exception as e:
+                logger.warning("Stale session sweep failed: %s", e)
+
+    @staticmethod
+    def sweep(bind: Engine | Connection) -> int:
+        # This worker's buffered interactions first, so active sessions don't look idle
+        heartbeats.flush(bind)
+        return sweep_stale_sessions(
+            bind,
+            idle_minutes=settings.SESSION_IDLE_TIMEOUT_MINUTES,
+            batch_size=settings.SESSION_SWEEP_BATCH_SIZE,
+            max_batches=settings.SESSION_SWEEP_MAX_BATCHES,
+        )
+
+
+session_sweeper = SessionSweeper()
@@ -0,0 +1,87 @@
+"""
+Compare output tokens and latency of the two evaluate_answer modes: full
+evaluation (regenerates answer anchors) versus evaluation against stored
+anchors (score and feedback only).
+
+    python -m benchmarks.evaluate_modes --calls 20
+    python -m benchmarks.evaluate_modes --calls 5 --provider configured   # real API from .env
+
+The default fake provider streams output at --tokens-per-second after a fixed
+time to first token, so latency scales with output length as it does with
+real models.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.config import settings
+from app.llm.evaluate_answer import evaluate_answer
+from app.llm.usage import usage_stats
+from benchmarks.loadtest import percentile
+
+QUESTION = "Design a URL shortener that handles 100 million new links per day."
+ANSWER = (
+    "I'd start with requirements: writes around 1,200 per second, reads far higher, so the design is read-heavy. "
+    "Keys are base62 encodings of a counter allocated in ranges per app server to avoid coordination. "
+    "Mappings live in a key-value store partitioned by key, with a cache in front for hot links. "
+    "Redirects are 302s so we can collect analytics asynchronously through a queue."
+)
+ANCHORS = [
+    {"name": "Capacity estimates", "anchor": "Quantify write and read QPS and storage growth to justify a read-heavy design."},
+    {"name": "Key generation", "anchor": "Collision-free short keys, e.g. base62 counters allocated in ranges or hashing with retries."},
+    {"name": "Storage and caching", "anchor": "Partitioned key-value store for mappings with a cache for hot links."},
+    {"name": "Redirect semantics", "anchor": "301 versus 302 trade-off between caching and analytics."},
+]
+
+
+async def run(calls: int) -> dict:
+    usage_stats.reset()
+    results = {}
+    for mode, anchors in (("evaluate_answer", None), ("evaluate_answer_with_anchors", ANCHORS)):
+        latencies = []
+        for _ in range(calls):
+            started = time.perf_counter()
+            await evaluate_answer(QUESTION, ANSWER, "System design", anchors=anchors)
+            latencies.append(time.perf_counter() - started)
+        ordered = sorted(latencies)
+        totals = usage_stats.snapshot().get(mode, {})
+        results[mode] = {
+            "calls": calls,
+            "mean_output_tokens": round(totals.get("output_tokens", 0) / max(totals.get("calls", 0), 1), 1),
+            "mean_input_tokens": round(totals.get("input_tokens", 0) / max(totals.get("calls", 0), 1), 1),
+            "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+            "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+            "mean_ms": round(statistics.fmean(ordered) * 1000, 1),
+        }
+    full, reuse = results["evaluate_answer"], results["evaluate_answer_with_anchors"]
+    if full["mean_output_tokens"]:
+        results["output_tokens_saved_pct"] = round(
+            100 * (1 - reuse["mean_output_tokens"] / full["mean_output_tokens"]), 1
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="evaluate_answer output tokens and latency per mode")
+    parser.add_argument("--calls", type=int, default=20, help="Evaluations per mode")
+    parser.add_argument("--provider", choices=("fake", "configured"), default="fake")
+    parser.add_argument("--ttft-ms", type=float, default=400, help="Fake provider time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80, help="Fake provider output speed")
+    args = parser.parse_args()
+
+    if args.provider == "fake":
+        from app.llm.client import reset_fake_llm_client
+
+        settings.USE_STUB_LLM = False
+        settings.LLM_PROVIDER = "fake"
+        settings.FAKE_LLM_LATENCY_MS = {"default": args.ttft_ms}
+        settings.FAKE_LLM_LATENCY_SIGMA = 0.0
+        settings.FAKE_LLM_TOKENS_PER_SECOND = args.tokens_per_second
+        reset_fake_llm_client()
+    print(json.dumps(asyncio.run(run(args.calls)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
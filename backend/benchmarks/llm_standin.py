@@ -0,0 +1,175 @@
+"""
+Local stand-in for the OpenAI chat-completions and Anthropic messages APIs.
+
+Lets the real OpenAIClient / AnthropicClient code paths (SDK overhead,
+connection pooling, retries) be benchmarked without network access:
+
+    # Record real responses once (forwards to the real API with your key)
+    python -m benchmarks.llm_standin --mode record --cassettes cassettes/
+
+    # Replay them deterministically with injected latency
+    python -m benchmarks.llm_standin --mode replay --cassettes cassettes/ --latency-ms 800 --jitter-ms 200
+
+Then point the app at it:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8787/v1
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8787
+
+Cassettes are keyed by a hash of the request path and body, excluding
+max_tokens (which the app sizes adaptively) and the stream flag. In record
+mode, upstream errors and non-JSON responses are passed through but not
+recorded. With
+--fallback stub, replay misses are answered with the stub client's canned
+responses in the provider's wire format instead of a 404.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.llm.client import StubLLMClient
+from app.llm.modes import MODES
+
+UPSTREAMS = {
+    "/v1/chat/completions": "https://api.openai.com",
+    "/v1/messages": "https://api.anthropic.com",
+}
+FORWARDED_HEADERS = ("authorization", "x-api-key", "anthropic-version", "anthropic-beta", "content-type")
+KEY_EXCLUDED_FIELDS = ("max_tokens", "stream")
+
+
+def cassette_key(path: str, body: dict) -> str:
+    normalized = {k: v for k, v in body.items() if k not in KEY_EXCLUDED_FIELDS}
+    payload = json.dumps({"path": path, "body": normalized}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _stub_content(body: dict) -> str:
+    """Pick the canned stub response whose schema signature appears in the prompt"""
+    text = json.dumps(body)
+    stub = StubLLMClient()
+    for config in MODES.values():
+        schema = config["response_schema"]
+        if all(f'{name}: ' in text for name in schema.get("properties", {})):
+            return json.dumps(stub._response_for(schema))
+    return "{}"
+
+
+def _stub_response(path: str, body: dict) -> dict:
+    content = _stub_content(body)
+    output_tokens = max(1, len(content) // 4)
+    input_tokens = max(1, len(json.dumps(body)) // 4)
+    if path == "/v1/messages":
+        return {
+            "id": "msg_standin",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "standin"),
+            "content": [{"type": "text", "text": content}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+        }
+    return {
+        "id": "chatcmpl-standin",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "standin"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": input_tokens,
+            "completion_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        },
+    }
+
+
+def create_app(
+    mode: str,
+    cassette_dir: str,
+    latency_ms: float = 0,
+    jitter_ms: float = 0,
+    seed: int = 0,
+    fallback: str = "none",
+    upstream_transport: httpx.AsyncBaseTransport | None = None,
+) -> FastAPI:
+    cassettes = Path(cassette_dir)
+    cassettes.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    upstream = httpx.AsyncClient(timeout=120, transport=upstream_transport) if mode == "record" else None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield
+        if upstream is not None:
+            await upstream.aclose()
+
+    app = FastAPI(title="LLM stand-in", lifespan=lifespan)
+
+    async def handle(request: Request) -> Response:
+        path = request.url.path
+        body = await request.json()
+        cassette = cassettes / f"{cassette_key(path, body)}.json"
+
+        if mode == "record":
+            headers = {k: v for k, v in request.headers.items() if k.lower() in FORWARDED_HEADERS}
+            response = await upstream.post(UPSTREAMS[path] + path, json=body, headers=headers)
+            content_type = response.headers.get("content-type", "")
+            if not response.is_success or not content_type.startswith("application/json"):
+                # Rate limits, overloads and HTML error pages shouldn't be replayed as the answer
+                return Response(response.content, status_code=response.status_code, media_type=content_type or None)
+            recorded = response.json()
+            cassette.write_text(json.dumps({
+                "request": {"path": path, "body": body},
+                "response": {"status": response.status_code, "body": recorded},
+            }, indent=2))
+            return JSONResponse(recorded, status_code=response.status_code)
+
+        if latency_ms or jitter_ms:
+            await asyncio.sleep(max(0.0, latency_ms + rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+        if cassette.exists():
+            recorded = json.loads(cassette.read_text())["response"]
+            return JSONResponse(recorded["body"], status_code=recorded["status"])
+        if fallback == "stub":
+            return JSONResponse(_stub_response(path, body))
+        return JSONResponse(
+            {"error": {"type": "not_found", "message": f"No cassette for request {cassette.name}"}},
+            status_code=404,
+        )
+
+    app.add_api_route("/v1/chat/completions", handle, methods=["POST"])
+    app.add_api_route("/v1/messages", handle, methods=["POST"])
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local OpenAI/Anthropic stand-in with record/replay")
+    parser.add_argument("--mode", choices=("record", "replay"), default="replay")
+    parser.add_argument("--cassettes", default="cassettes")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fallback", choices=("none", "stub"), default="none")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    args = parser.parse_args()
+    app = create_app(args.mode, args.cassettes, args.latency_ms, args.jitter_ms, args.seed, args.fallback)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
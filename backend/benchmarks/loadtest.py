@@ -0,0 +1,239 @@
+"""
+End-to-end HTTP load test driving realistic study-session scenarios.
+
+Each virtual user creates and approves a plan, then repeatedly runs a study
+session: suggested_session -> start_session -> generate_questions ->
+several evaluate_answer calls -> end_session. Latency is recorded per
+endpoint template and written as a JSON report.
+
+In-process (default): the FastAPI app is driven through an ASGI transport
+against DATABASE_URL (a fresh SQLite file unless overridden) with the fake
+LLM provider, so no server, network or API key is needed:
+
+    python -m benchmarks.loadtest --users 50 --sessions 3 --llm-latency-ms 1500 --report report.json
+
+Against a running server (configure LLM_PROVIDER=fake there):
+
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:8000 --users 50
+
+Virtual users authenticate with unsigned bearer tokens whose `sub` is the
+user id, which the MVP Clerk verification accepts.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+import jwt
+
+API = "/api/v1"
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+class Recorder:
+    """Collects per-endpoint latencies, keyed by method and path template"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, method: str, path: str, **kwargs) -> httpx.Response | None:
+        name = f"{method} {ID_SEGMENT.sub('/{id}', path)}"
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, API + path, **kwargs)
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            self.latencies[name].append(time.perf_counter() - started)
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            return None
+        return response
+
+    def report(self, duration: float) -> dict:
+        endpoints = {}
+        total = 0
+        for name, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            total += len(ordered)
+            endpoints[name] = {
+                "count": len(ordered),
+                "errors": self.errors[name],
+                "throughput_rps": round(len(ordered) / duration, 2),
+                "mean_ms": round(statistics.fmean(ordered) * 1000, 1),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+            }
+        return {
+            "duration_s": round(duration, 2),
+            "requests": total,
+            "errors": sum(self.errors.values()),
+            "throughput_rps": round(total / duration, 2),
+            "endpoints": endpoints,
+        }
+
+
+async def study_session_scenario(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    rng: random.Random,
+    sessions: int,
+    answers_per_session: int,
+    think_time: float,
+) -> int:
+    """One virtual user's journey. Returns the number of completed sessions."""
+
+    async def think():
+        if think_time:
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * think_time)
+
+    plan = await recorder.request(client, "POST", "/plan/suggest_new", json={
+        "role": "Software Engineer",
+        "raw_user_context": "Five years of backend Python; preparing for senior interviews.",
+        "time_available_minutes": 90,
+    })
+    if plan is None:
+        return 0
+    approved = await recorder.request(client, "POST", "/plan/approve_plan", json={"plan": plan.json()})
+    if approved is None:
+        return 0
+    topic_ids = approved.json()["topic_ids"]
+
+    completed = 0
+    for _ in range(sessions):
+        await think()
+        suggestion = await recorder.request(client, "GET", "/study/suggested_session")
+        topic_id = suggestion.json()["topic_id"] if suggestion is not None else rng.choice(topic_ids)
+        started = await recorder.request(client, "POST", "/study/start_session", json={
+            "topic_id": topic_id,
+            "planned_study_time": 30,
+        })
+        if started is None:
+            continue
+        session_id = started.json()["id"]
+        generated = await recorder.request(client, "POST", f"/study/generate_questions/{session_id}")
+        questions = [q["question"] for q in generated.json()["questions"]] if generated is not None else []
+        for i in range(answers_per_session):
+            if not questions:
+                break
+            await think()
+            await recorder.request(client, "POST", f"/study/evaluate_answer/{session_id}", json={
+                "question": questions[i % len(questions)],
+                "raw_answer": " ".join(["I would start by clarifying requirements."] * rng.randint(5, 40)),
+                "answer_time_seconds": rng.randint(30, 300),
+            })
+        if await recorder.request(client, "PUT", f"/study/end_session/{session_id}") is not None:
+            completed += 1
+    return completed
+
+
+def _auth_headers(user_id: str) -> dict:
+    token = jwt.encode({"sub": user_id}, "loadtest", algorithm="HS256")
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def run(args) -> dict:
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        transport = httpx.ASGITransport(app=_in_process_app(args))
+        base_url = "http://loadtest"
+
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users)
+
+    async def virtual_user(n: int) -> int:
+        rng = random.Random(args.seed * 100_003 + n)
+        async with httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            headers=_auth_headers(f"loadtest_{args.seed}_{n}"),
+            timeout=args.timeout,
+            limits=limits,
+        ) as client:
+            await asyncio.sleep(rng.uniform(0, args.ramp_up))
+            return await study_session_scenario(
+                client, recorder, rng, args.sessions, args.answers, args.think_ms / 1000
+            )
+
+    started = time.perf_counter()
+    completed = await asyncio.gather(*(virtual_user(n) for n in range(args.users)))
+    report = recorder.report(time.perf_counter() - started)
+    report["sessions_completed"] = sum(completed)
+    report["config"] = {
+        "users": args.users,
+        "sessions_per_user": args.sessions,
+        "answers_per_session": args.answers,
+        "think_ms": args.think_ms,
+        "llm_latency_ms": args.llm_latency_ms,
+        "seed": args.seed,
+        "target": args.base_url or "in-process",
+    }
+    return report
+
+
+def _in_process_app(args):
+    """Configure settings for an offline run, then import the app."""
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///loadtest_{args.seed}.db")
+    from app.config import settings
+    from app.database import Base, engine
+    from app.llm.client import reset_fake_llm_client
+    from app.main import app
+
+    settings.USE_STUB_LLM = False
+    settings.LLM_PROVIDER = "fake"
+    settings.FAKE_LLM_SEED = args.seed
+    settings.FAKE_LLM_LATENCY_MS = {"default": args.llm_latency_ms}
+    settings.FAKE_LLM_ERROR_RATE = args.llm_error_rate
+    settings.RATE_LIMIT_ENABLED = False  # measure capacity, not per-user admission
+    settings.LOAD_SHEDDING_ENABLED = args.load_shedding
+    reset_fake_llm_client()
+    if settings.DATABASE_URL.startswith("sqlite"):
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end study-session load test")
+    parser.add_argument("--base-url", default="", help="Target a running server instead of the in-process app")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--sessions", type=int, default=2, help="Study sessions per user")
+    parser.add_argument("--answers", type=int, default=3, help="evaluate_answer calls per session")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean think time between user actions")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="Seconds over which users start")
+    parser.add_argument("--llm-latency-ms", type=float, default=1000, help="Fake LLM median latency (in-process)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fake LLM error rate (in-process)")
+    parser.add_argument("--load-shedding", action="store_true", help="Enable adaptive load shedding (in-process)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default="", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
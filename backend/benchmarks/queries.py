@@ -0,0 +1,259 @@
+"""
+Database query micro-benchmarks for the hot read paths.
+
+Times the queries behind suggested_session, list_sessions, view_plan,
+generate_questions' attempt-history load, end_session's attempts join and
+the stale-session sweeper's candidate scan on seeded databases of increasing
+size, and reports latency percentiles, SQL statement counts and EXPLAIN
+plans per case, so index and query changes can be compared objectively:
+
+    python -m benchmarks.queries --sizes 100,1000,5000 --report queries.json
+
+--database-url is a template; "{users}" is replaced with each size so every
+size gets its own database (default: sqlite:///bench_{users}.db). Empty
+databases are seeded with benchmarks.seed; existing ones are reused unless
+--fresh is given. For PostgreSQL the per-size databases must already exist.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import random
+import statistics
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import create_engine, event, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.routes.plan import view_plan
+from app.api.routes.study import _session_attempts, _topic_attempt_history, list_sessions, suggested_session
+from app.database import Base
+from app.models import StudySession, User
+from app.services.session_sweeper import stale_session_ids
+from benchmarks.loadtest import percentile
+from benchmarks.seed import TABLES, SeedConfig, seed_database
+
+
+@dataclass
+class Target:
+    """The user (and one of their sessions) a case is run against"""
+    user: User
+    topic_id: int
+    session_id: int
+
+
+# Route handler cases return coroutines; benchmark_size drives them on its own event loop
+CASES: dict[str, Callable[[Session, Target], object]] = {
+    "suggested_session": lambda db, t: suggested_session(current_user=t.user, db=db),
+    "list_sessions": lambda db, t: list_sessions(limit=20, offset=0, topic_id=None, current_user=t.user, db=db),
+    "view_plan": lambda db, t: view_plan(current_user=t.user, db=db),
+    "generate_questions_history": lambda db, t: _topic_attempt_history(db, t.topic_id),
+    "end_session_attempts": lambda db, t: _session_attempts(db, t.session_id),
+    "stale_session_scan": lambda db, t: stale_session_ids(db, datetime.now(timezone.utc), 500, lock=False),
+}
+
+
+class StatementRecorder:
+    """Captures statements (with parameters) executed on an engine"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: list[tuple[str, object]] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def explain(engine: Engine, statements: list[tuple[str, object]], analyze: bool = False) -> list[dict]:
+    """EXPLAIN each captured statement using the dialect's syntax"""
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    else:
+        prefix = "EXPLAIN "
+    plans = []
+    with engine.connect() as conn:
+        raw = conn.connection.cursor()
+        for statement, parameters in statements:
+            raw.execute(prefix + statement, parameters)
+            rows = raw.fetchall()
+            # SQLite returns (id, parent, notused, detail); others one text column
+            lines = [str(row[-1]) for row in rows]
+            plans.append({"sql": " ".join(statement.split()), "plan": lines})
+        raw.close()
+    return plans
+
+
+def _table_counts(engine: Engine) -> dict[str, int]:
+    with engine.connect() as conn:
+        return {
+            model.__tablename__: conn.execute(select(func.count()).select_from(model.__table__)).scalar()
+            for model in TABLES
+        }
+
+
+def _pick_targets(db: Session, rng: random.Random, count: int) -> list[Target]:
+    """Sample users that have at least one session, heaviest user first"""
+    session_counts = (
+        db.query(StudySession.user_id, func.count(StudySession.id).label("n"))
+        .group_by(StudySession.user_id)
+        .order_by(text("n DESC"), StudySession.user_id)
+        .all()
+    )
+    if not session_counts:
+        raise SystemExit("Database has no study sessions; seed it first")
+    user_ids = [session_counts[0][0]] + rng.sample(
+        [uid for uid, _ in session_counts[1:]], min(count - 1, len(session_counts) - 1)
+    )
+    targets = []
+    for user_id in user_ids:
+        user = db.get(User, user_id)
+        session = (
+            db.query(StudySession)
+            .filter(StudySession.user_id == user_id)
+            .order_by(StudySession.start_time.desc())
+            .first()
+        )
+        targets.append(Target(user=user, topic_id=session.topic_id, session_id=session.id))
+    return targets
+
+
+def benchmark_size(engine: Engine, cases: list[str], repeat: int, users: int, seed: int, analyze: bool) -> dict:
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    rng = random.Random(seed)
+    results = {}
+    # The route handlers are async but don't await anything DB-related; one loop drives them all
+    loop = asyncio.new_event_loop()
+
+    def call(name: str, db: Session, target: Target):
+        result = CASES[name](db, target)
+        return loop.run_until_complete(result) if inspect.iscoroutine(result) else result
+
+    with closing(loop), SessionLocal() as db:
+        targets = _pick_targets(db, rng, users)
+        for name in cases:
+            call(name, db, targets[0])  # warm caches
+            timings, statement_counts = [], []
+            recorder = StatementRecorder(engine)
+            for i in range(repeat):
+                target = targets[i % len(targets)]
+                db.expire_all()
+                with recorder:
+                    started = time.perf_counter()
+                    call(name, db, target)
+                    timings.append(time.perf_counter() - started)
+                statement_counts.append(len(recorder.statements))
+            # Plans for the heaviest user, whose queries touch the most rows
+            db.expire_all()
+            with recorder:
+                call(name, db, targets[0])
+            ordered = sorted(timings)
+            results[name] = {
+                "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+                "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+                "statements": max(statement_counts),
+                "plans": explain(engine, recorder.statements, analyze=analyze),
+            }
+    return results
+
+
+def prepare_database(url: str, users: int, seed: int, fresh: bool) -> Engine:
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    if fresh:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        empty = conn.execute(select(func.count()).select_from(User)).scalar() == 0
+    if empty:
+        seed_database(url, SeedConfig(users=users, seed=seed))
+    # Refresh planner statistics so plans reflect the seeded data
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return engine
+
+
+def run(args) -> dict:
+    sizes = [int(s) for s in args.sizes.split(",")]
+    cases = args.cases.split(",") if args.cases else list(CASES)
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        raise SystemExit(f"Unknown cases: {', '.join(sorted(unknown))}")
+
+    report = {"cases": cases, "repeat": args.repeat, "sizes": []}
+    for size in sizes:
+        engine = prepare_database(args.database_url.format(users=size), size, args.seed, args.fresh)
+        try:
+            report["dialect"] = engine.dialect.name
+            report["sizes"].append({
+                "users": size,
+                "rows": _table_counts(engine),
+                "results": benchmark_size(engine, cases, args.repeat, args.sample_users, args.seed, args.analyze),
+            })
+        finally:
+            engine.dispose()
+
+    # Scaling curve: p50 at each size relative to the smallest
+    report["scaling"] = {
+        name: {
+            "p50_ms": [entry["results"][name]["p50_ms"] for entry in report["sizes"]],
+            "growth": round(
+                report["sizes"][-1]["results"][name]["p50_ms"] / max(report["sizes"][0]["results"][name]["p50_ms"], 1e-6),
+                2,
+            ),
+        }
+        for name in cases
+    }
+    return report
+
+
+def print_summary(report: dict) -> None:
+    sizes = [entry["users"] for entry in report["sizes"]]
+    header = f"{'case':<28}" + "".join(f"{f'{n} users':>14}" for n in sizes) + f"{'growth':>9}{'stmts':>7}"
+    print(header)
+    print("-" * len(header))
+    for name in report["cases"]:
+        curve = report["scaling"][name]
+        statements = report["sizes"][-1]["results"][name]["statements"]
+        cells = "".join(f"{f'{ms:.2f} ms':>14}" for ms in curve["p50_ms"])
+        print(f"{name:<28}{cells}{curve['growth']:>8}x{statements:>7}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark hot-path DB queries across database sizes")
+    parser.add_argument("--database-url", default="sqlite:///bench_{users}.db", help='URL template; "{users}" is replaced per size')
+    parser.add_argument("--sizes", default="100,1000,5000", help="Comma-separated user counts")
+    parser.add_argument("--cases", default="", help=f"Comma-separated subset of: {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed iterations per case")
+    parser.add_argument("--sample-users", type=int, default=20, help="Users to rotate through per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fresh", action="store_true", help="Drop and reseed each database")
+    parser.add_argument("--analyze", action="store_true", help="Use EXPLAIN ANALYZE on PostgreSQL")
+    parser.add_argument("--report", default="", help="Write the JSON report (with plans) to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+    print_summary(report)
+
+
+if __name__ == "__main__":
+    main()
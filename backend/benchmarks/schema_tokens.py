@@ -0,0 +1,61 @@
+"""
+Compare prompt tokens spent on the response schema per LLM mode: the old
+str(model_json_schema()) embedding versus the compact compiled signature.
+
+Usage (from backend/):
+    python -m benchmarks.schema_tokens [--json]
+
+Uses tiktoken's cl100k_base encoding when installed, otherwise estimates
+tokens as characters / 4.
+"""
+import argparse
+import json
+
+from app.llm.modes import MODES, compile_schema
+
+try:
+    import tiktoken
+
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+
+    TOKENIZER = "cl100k_base"
+except ImportError:
+    def count_tokens(text: str) -> int:
+        return max(1, round(len(text) / 4))
+
+    TOKENIZER = "chars/4 estimate"
+
+
+def run() -> list[dict]:
+    rows = []
+    for mode, config in MODES.items():
+        before = count_tokens(str(config["response_schema"]))
+        after = count_tokens(compile_schema(config["response_schema"]))
+        rows.append({
+            "mode": mode,
+            "before_tokens": before,
+            "after_tokens": after,
+            "saved_pct": round(100 * (before - after) / before, 1),
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Schema token benchmark per LLM mode")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+    args = parser.parse_args()
+    rows = run()
+    if args.json:
+        print(json.dumps({"tokenizer": TOKENIZER, "modes": rows}, indent=2))
+        return
+    print(f"Schema tokens per mode ({TOKENIZER})")
+    print(f"{'mode':<26}{'before':>8}{'after':>8}{'saved':>8}")
+    for row in rows:
+        print(f"{row['mode']:<26}{row['before_tokens']:>8}{row['after_tokens']:>8}{row['saved_pct']:>7}%")
+
+
+if __name__ == "__main__":
+    main()
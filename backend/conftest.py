@@ -2,7 +2,8 @@
 Pytest configuration and fixtures for testing
 """
 import pytest
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
@@ -80,6 +81,75 @@ def override_get_current_user(test_user: User):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def strict_sql_loading(monkeypatch):
+    """Make lazy relationship loads raise in tests so N+1 patterns fail loudly"""
+    from app import config
+    monkeypatch.setattr(config.settings, "SQL_STRICT_LOADING", True)
+
+
+@pytest.fixture(scope="function")
+def assert_max_queries():
+    """
+    Pin the number of SQL statements a block may issue, e.g.
+
+        with assert_max_queries(3):
+            test_client.get("/api/v1/plan/view")
+    """
+    @contextmanager
+    def _assert_max_queries(limit: int):
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "after_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "after_cursor_execute", _record)
+        assert len(statements) <= limit, (
+            f"Expected at most {limit} SQL statements, got {len(statements)}:\n" + "\n".join(statements)
+        )
+
+    return _assert_max_queries
+
+
+@pytest.fixture(autouse=True)
+def clear_answer_index():
+    """Question ids are reused across tests' fresh databases, so drop cached answer signatures"""
+    from app.services.answer_reuse import answer_index
+    answer_index.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_session_contexts():
+    """Session ids are reused across tests' fresh databases too"""
+    from app.services.session_context import session_contexts
+    session_contexts.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_heartbeats():
+    """Drop interaction times buffered by earlier tests, whose databases are gone"""
+    from app.services.interaction_heartbeats import heartbeats
+    heartbeats.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Every test authenticates as the same user, so start each with empty buckets"""
+    from app.api.rate_limit import reset_rate_limits
+    reset_rate_limits()
+
+
+@pytest.fixture(autouse=True)
+def reset_load_shedding():
+    """The adaptive limit learns from every request, so don't carry it across tests"""
+    from app.api.load_shedding import reset_load_shedding
+    reset_load_shedding()
+
+
 @pytest.fixture(autouse=True)
 def enable_stub_llm(monkeypatch):
     """Automatically enable stub LLM for all tests"""
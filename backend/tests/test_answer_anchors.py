@@ -0,0 +1,61 @@
+"""
+Tests for evaluating against stored answer anchors
+"""
+from datetime import datetime, timedelta, timezone
+
+from prometheus_client import REGISTRY
+
+from app.models.plan import PlanTopic
+from app.models.question import Question
+from app.models.session import StudySession
+from app.services.answer_anchors import anchors_are_stale, refresh_anchors
+
+
+def _parsed(mode: str) -> float:
+    return REGISTRY.get_sample_value("llm_json_parse_total", {"mode": mode, "outcome": "clean"}) or 0.0
+
+
+def test_second_evaluation_reuses_stored_anchors(test_client, db_session, test_user):
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="Algorithms", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.flush()
+    session = StudySession(user_id=test_user.clerk_user_id, topic_id=topic.id, planned_duration=30)
+    db_session.add(session)
+    db_session.commit()
+    question_text = "What is a heap?"
+    full, reuse = _parsed("evaluate_answer"), _parsed("evaluate_answer_with_anchors")
+
+    first = test_client.post(f"/api/v1/study/evaluate_answer/{session.id}", json={
+        "question": question_text, "raw_answer": "A tree with the heap property.",
+    })
+    second = test_client.post(f"/api/v1/study/evaluate_answer/{session.id}", json={
+        "question": question_text, "raw_answer": "A complete binary tree where parents order before children.",
+    })
+
+    assert first.status_code == second.status_code == 200
+    assert _parsed("evaluate_answer") == full + 1
+    assert _parsed("evaluate_answer_with_anchors") == reuse + 1
+    question = db_session.query(Question).one()
+    assert question.anchors_updated_at is not None
+    assert second.json()["anchors"] == question.answer_anchors == first.json()["anchors"]
+
+
+async def test_stale_anchors_are_refreshed(db_session, test_user):
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="Algorithms", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.flush()
+    question = Question(
+        topic_id=topic.id,
+        question="What is a heap?",
+        answer_anchors=[{"name": "Old", "anchor": "Outdated rubric"}],
+        anchors_updated_at=datetime.now(timezone.utc) - timedelta(days=90),
+    )
+    db_session.add(question)
+    db_session.commit()
+    assert anchors_are_stale(question)
+
+    await refresh_anchors(db_session.get_bind(), question.id, question.question, None)
+
+    db_session.refresh(question)
+    assert question.answer_anchors[0]["name"] != "Old"
+    assert not anchors_are_stale(question)
@@ -0,0 +1,91 @@
+"""
+Tests for reusing evaluations of exact and near-duplicate answers
+"""
+from prometheus_client import REGISTRY
+
+from app import config
+from app.llm.modes import EvaluateAnswerResponse
+from app.models.plan import PlanTopic
+from app.models.question import AnswerEvaluation, Question, QuestionAttempt
+from app.models.session import StudySession
+from app.services.answer_reuse import answer_index, minhash, similarity
+
+ANSWER = (
+    "I would start by clarifying the requirements and the expected traffic, then sketch an API with "
+    "create and resolve endpoints. Keys come from a counter encoded in base62 and allocated in ranges "
+    "so servers never coordinate on each write. The mapping lives in a partitioned key value store with "
+    "a cache in front because reads dominate, and redirects use 302 so analytics events can be queued "
+    "and processed asynchronously without slowing the redirect path down for the user."
+)
+
+
+def _reuse(outcome: str) -> float:
+    return REGISTRY.get_sample_value("answer_reuse_total", {"outcome": outcome}) or 0.0
+
+
+def test_minhash_similarity_tracks_small_edits():
+    edited = ANSWER.replace("clarifying", "confirming")
+    assert similarity(minhash(ANSWER), minhash(edited)) >= 0.85
+    assert similarity(minhash(ANSWER), minhash("Use a hash map and return the first duplicate.")) < 0.2
+
+
+def test_resubmitted_answer_reuses_evaluation(test_client, db_session, test_user):
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="System Design", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.flush()
+    session = StudySession(user_id=test_user.clerk_user_id, topic_id=topic.id, planned_duration=30)
+    db_session.add(session)
+    db_session.commit()
+    url = f"/api/v1/study/evaluate_answer/{session.id}"
+    question = "Design a URL shortener."
+    exact, near = _reuse("exact"), _reuse("near")
+
+    first = test_client.post(url, json={"question": question, "raw_answer": ANSWER})
+    retry = test_client.post(url, json={"question": question, "raw_answer": ANSWER.upper()})
+    edited = test_client.post(url, json={"question": question, "raw_answer": ANSWER.replace("302", "301")})
+
+    assert first.status_code == retry.status_code == edited.status_code == 200
+    assert retry.json() == edited.json() == first.json()
+    assert (_reuse("exact"), _reuse("near")) == (exact + 1, near + 1)
+    assert db_session.query(QuestionAttempt).count() == 3
+    assert db_session.query(AnswerEvaluation).count() == 1
+
+
+def test_stored_evaluations_are_bounded_per_question(db_session, test_user, monkeypatch):
+    monkeypatch.setattr(config.settings, "ANSWER_REUSE_MAX_PER_QUESTION", 2)
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="System Design", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.flush()
+    question = Question(topic_id=topic.id, question="Design a URL shortener.")
+    db_session.add(question)
+    db_session.commit()
+    evaluation = EvaluateAnswerResponse(score=5, positive_feedback=[], improvement_areas=[], anchors=[])
+
+    for answer in ("first answer text here", "second completely different reply", "third unrelated response words"):
+        answer_index.add(db_session, question.id, answer, evaluation)
+        db_session.commit()
+
+    stored = db_session.query(AnswerEvaluation).order_by(AnswerEvaluation.id).all()
+    assert len(stored) == 2
+    answer_index.clear()
+    assert answer_index.lookup(db_session, question.id, "first answer text here") is None
+    assert answer_index.lookup(db_session, question.id, "third unrelated response words") is not None
+
+
+def test_rolled_back_evaluation_is_not_served_from_cache(db_session, test_user):
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="System Design", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.flush()
+    question = Question(topic_id=topic.id, question="Design a URL shortener.")
+    db_session.add(question)
+    db_session.commit()
+    evaluation = EvaluateAnswerResponse(score=5, positive_feedback=[], improvement_areas=[], anchors=[])
+    assert answer_index.lookup(db_session, question.id, "hash the long url") is None  # question now cached
+
+    answer_index.add(db_session, question.id, "hash the long url", evaluation)
+    db_session.rollback()
+    assert answer_index.lookup(db_session, question.id, "hash the long url") is None
+
+    answer_index.add(db_session, question.id, "hash the long url", evaluation)
+    db_session.commit()
+    assert answer_index.lookup(db_session, question.id, "hash the long url") is not None
@@ -0,0 +1,113 @@
+"""
+Tests for LLM deadlines and cancellation when the client disconnects
+"""
+import asyncio
+import json
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.llm import suggest_plan as suggest_plan_module
+from app.llm.client import LLMCompletion, StubLLMClient, token_budget
+from app.llm.deadline import DeadlineExceeded, deadline_after
+from app.llm.modes import MODES
+from app.llm.retry import with_retry
+from app.main import app
+
+
+class SlowClient(StubLLMClient):
+    provider = "slow"
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.calls = 0
+
+    async def _complete(self, prompt, system_prompt, response_schema, temperature, max_tokens, mode) -> LLMCompletion:
+        self.calls += 1
+        await asyncio.sleep(self.seconds)
+        return await super()._complete(prompt, system_prompt, response_schema, temperature, max_tokens, mode)
+
+
+def _cancelled(reason: str) -> float:
+    labels = {"mode": "suggest_plan", "provider": "slow", "model": "stub", "reason": reason}
+    return REGISTRY.get_sample_value("llm_calls_cancelled_total", labels) or 0.0
+
+
+def _tokens_saved() -> float:
+    labels = {"mode": "suggest_plan", "provider": "slow", "model": "stub"}
+    return REGISTRY.get_sample_value("llm_tokens_saved_total", labels) or 0.0
+
+
+async def test_deadline_cuts_off_attempt_and_counts_saved_tokens(monkeypatch):
+    monkeypatch.setattr(token_budget, "typical_output_tokens", lambda mode: 400)
+    client = SlowClient(seconds=5)
+    schema = MODES["suggest_plan"]["response_schema"]
+    cancelled, saved = _cancelled("deadline"), _tokens_saved()
+
+    started = time.perf_counter()
+    with deadline_after(0.05), pytest.raises(DeadlineExceeded):
+        await with_retry(lambda: client.generate_structured("Role: SRE", schema, mode="suggest_plan"), mode="suggest_plan")
+
+    assert time.perf_counter() - started < 1
+    assert client.calls == 1
+    assert _cancelled("deadline") == cancelled + 1
+    assert _tokens_saved() == saved + 400
+
+
+async def test_retry_backoff_is_skipped_when_it_would_outlast_the_deadline():
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        raise ValueError("provider error")
+
+    with deadline_after(0.5), pytest.raises(DeadlineExceeded):
+        await with_retry(failing, base_delay=1.0)
+    assert calls == 1
+
+
+async def test_client_disconnect_cancels_llm_call(override_get_db, override_get_current_user, monkeypatch):
+    client = SlowClient(seconds=5)
+    monkeypatch.setattr(suggest_plan_module, "get_llm_client", lambda: client)
+    cancelled = _cancelled("cancelled")
+    body = json.dumps({"role": "SRE", "raw_user_context": "Ops background."}).encode()
+    disconnect_at = time.monotonic() + 0.1
+    received_body = False
+
+    async def receive():
+        nonlocal received_body
+        if not received_body:
+            received_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        if time.monotonic() >= disconnect_at:
+            return {"type": "http.disconnect"}
+        await asyncio.sleep(3600)
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/v1/plan/suggest_new",
+        "raw_path": b"/api/v1/plan/suggest_new",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"test")],
+        "client": ("test", 123),
+        "server": ("test", 80),
+    }
+    started = time.perf_counter()
+    await app(scope, receive, send)
+
+    assert time.perf_counter() - started < 2
+    assert client.calls == 1
+    assert messages[0]["status"] == 499
+    assert _cancelled("cancelled") == cancelled + 1
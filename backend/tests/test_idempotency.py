@@ -0,0 +1,178 @@
+"""
+Tests for Idempotency-Key handling on mutating study endpoints
+"""
+import asyncio
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import config
+from app.api import idempotency
+from app.api.rate_limit import reset_rate_limits
+from app.api.routes import study
+from app.llm.modes import EvaluateAnswerResponse
+from app.database import Base
+from app.main import app
+from app.models.plan import PlanTopic
+from app.models.question import QuestionAttempt
+from app.models.session import StudySession
+
+
+@pytest.fixture
+def db_session(tmp_path, monkeypatch):
+    """
+    A file database instead of conftest's single in-memory connection: the middleware keeps
+    its keys through sessions of its own in worker threads, as in production.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(idempotency, "SessionLocal", SessionLocal)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _headers(user, key: str) -> dict:
+    token = jwt.encode({"sub": user.clerk_user_id}, "test", algorithm="HS256")
+    return {"Authorization": f"Bearer {token}", "Idempotency-Key": key}
+
+
+def _topic(db_session, user) -> PlanTopic:
+    topic = PlanTopic(user_id=user.clerk_user_id, name="Algorithms", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.commit()
+    return topic
+
+
+def test_retried_start_session_is_replayed(test_client, db_session, test_user):
+    topic = _topic(db_session, test_user)
+    body = {"topic_id": topic.id, "planned_study_time": 30}
+
+    first = test_client.post("/api/v1/study/start_session", json=body, headers=_headers(test_user, "k1"))
+    retry = test_client.post("/api/v1/study/start_session", json=body, headers=_headers(test_user, "k1"))
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.content == first.content
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert db_session.query(StudySession).count() == 1
+
+    other = test_client.post(
+        "/api/v1/study/start_session", json={**body, "planned_study_time": 45}, headers=_headers(test_user, "k1")
+    )
+    assert other.status_code == 422
+
+
+async def test_concurrent_duplicate_waits_for_first_result(
+    override_get_db, override_get_current_user, db_session, test_user, monkeypatch
+):
+    topic = _topic(db_session, test_user)
+    session = StudySession(user_id=test_user.clerk_user_id, topic_id=topic.id, planned_duration=30)
+    db_session.add(session)
+    db_session.commit()
+    calls = 0
+
+    async def slow_evaluate(**kwargs):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.2)
+        return EvaluateAnswerResponse(score=6, positive_feedback=["Clear"], improvement_areas=[], anchors=[])
+
+    monkeypatch.setattr(study, "evaluate_answer", slow_evaluate)
+    body = {"question": "What is a heap?", "raw_answer": "A tree with the heap property."}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first, duplicate = await asyncio.gather(*(
+            client.post(f"/api/v1/study/evaluate_answer/{session.id}", json=body, headers=_headers(test_user, "k2"))
+            for _ in range(2)
+        ))
+
+    assert first.status_code == duplicate.status_code == 200
+    assert first.content == duplicate.content
+    assert calls == 1
+    assert db_session.query(QuestionAttempt).count() == 1
+
+
+def test_throttled_request_is_not_replayed(test_client, db_session, test_user, monkeypatch):
+    monkeypatch.setattr(config.settings, "RATE_LIMITS", {"evaluate_answer": {"per_minute": 1, "burst": 1}})
+    topic = _topic(db_session, test_user)
+    session = StudySession(user_id=test_user.clerk_user_id, topic_id=topic.id, planned_duration=30)
+    db_session.add(session)
+    db_session.commit()
+    url = f"/api/v1/study/evaluate_answer/{session.id}"
+    body = {"question": "What is a heap?", "raw_answer": "A tree with the heap property."}
+
+    assert test_client.post(url, json=body).status_code == 200
+    throttled = test_client.post(url, json=body, headers=_headers(test_user, "k3"))
+    reset_rate_limits()
+    retry = test_client.post(url, json=body, headers=_headers(test_user, "k3"))
+
+    assert throttled.status_code == 429
+    assert retry.status_code == 200
+    assert "idempotent-replayed" not in retry.headers
+
+
+async def test_request_abandoned_by_client_is_not_replayed(
+    override_get_db, override_get_current_user, db_session, test_user, monkeypatch
+):
+    topic = _topic(db_session, test_user)
+    session = StudySession(user_id=test_user.clerk_user_id, topic_id=topic.id, planned_duration=30)
+    db_session.add(session)
+    db_session.commit()
+    delay = 5
+
+    async def slow_evaluate(**kwargs):
+        await asyncio.sleep(delay)
+        return EvaluateAnswerResponse(score=6, positive_feedback=["Clear"], improvement_areas=[], anchors=[])
+
+    monkeypatch.setattr(study, "evaluate_answer", slow_evaluate)
+    path = f"/api/v1/study/evaluate_answer/{session.id}"
+    body = json.dumps({"question": "What is a heap?", "raw_answer": "A tree with the heap property."}).encode()
+    headers = _headers(test_user, "k4")
+    disconnect_at = time.monotonic() + 0.1
+    received_body = False
+
+    async def receive():
+        nonlocal received_body
+        if not received_body:
+            received_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        if time.monotonic() >= disconnect_at:
+            return {"type": "http.disconnect"}
+        await asyncio.sleep(3600)
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await app({
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"host", b"test")]
+        + [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("test", 123),
+        "server": ("test", 80),
+    }, receive, send)
+    assert messages[0]["status"] == 499
+
+    delay = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        retry = await client.post(path, content=body, headers={**headers, "Content-Type": "application/json"})
+
+    assert retry.status_code == 200
+    assert "idempotent-replayed" not in retry.headers
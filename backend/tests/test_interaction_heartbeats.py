@@ -0,0 +1,61 @@
+"""
+Tests for write-behind buffering of session interaction times
+"""
+from datetime import datetime, timedelta, timezone
+
+from app.models.plan import PlanTopic
+from app.models.session import StudySession
+from app.services.interaction_heartbeats import HeartbeatBuffer, heartbeats
+
+START = datetime(2026, 1, 1, 9, 0)
+
+
+def _sessions(db_session, user, count: int) -> list[StudySession]:
+    topic = PlanTopic(user_id=user.clerk_user_id, name="Algorithms", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.commit()
+    sessions = [
+        StudySession(user_id=user.clerk_user_id, topic_id=topic.id, planned_duration=30, last_interaction_time=START)
+        for _ in range(count)
+    ]
+    db_session.add_all(sessions)
+    db_session.commit()
+    return sessions
+
+
+def _last_interaction(db_session, session: StudySession) -> datetime:
+    db_session.refresh(session)
+    return session.last_interaction_time.replace(tzinfo=None)
+
+
+def test_heartbeats_are_coalesced_into_one_update(db_session, test_user, assert_max_queries):
+    first, second = _sessions(db_session, test_user, 2)
+    buffer = HeartbeatBuffer()
+    for minutes in (1, 5, 3):
+        buffer.record(first.id, (START + timedelta(minutes=minutes)).replace(tzinfo=timezone.utc))
+    buffer.record(second.id, (START + timedelta(minutes=2)).replace(tzinfo=timezone.utc))
+
+    with assert_max_queries(1):
+        assert buffer.flush(db_session.get_bind()) == 2
+
+    assert _last_interaction(db_session, first) == START + timedelta(minutes=5)
+    assert _last_interaction(db_session, second) == START + timedelta(minutes=2)
+    assert len(buffer) == 0
+
+    # An older timestamp (e.g. from a lagging worker) doesn't move the time backwards
+    buffer.record(first.id, (START + timedelta(minutes=4)).replace(tzinfo=timezone.utc))
+    buffer.flush(db_session.get_bind())
+    assert _last_interaction(db_session, first) == START + timedelta(minutes=5)
+
+
+def test_heartbeat_endpoint_buffers_until_flush(test_client, db_session, test_user):
+    (session,) = _sessions(db_session, test_user, 1)
+
+    response = test_client.post(f"/api/v1/study/heartbeat/{session.id}")
+
+    assert response.status_code == 204
+    assert len(heartbeats) == 1
+    assert _last_interaction(db_session, session) == START
+    heartbeats.flush(db_session.get_bind())
+    assert _last_interaction(db_session, session) > START
+    assert test_client.post("/api/v1/study/heartbeat/9999").status_code == 404
@@ -0,0 +1,292 @@
+"""
+Tests for the LLM client layer: adaptive max_tokens, truncation handling and JSON repair
+"""
+import pytest
+from prometheus_client import REGISTRY
+
+from app.llm.client import AnthropicClient, LLMClient, LLMCompletion, MalformedResponseError, TruncatedResponseError
+from app.llm.json_repair import JSONRepairError, parse_json, parse_stats
+from app.llm.modes import MODES, compile_schema
+from app.llm.token_budget import TokenBudget, token_budget
+from app.llm.usage import usage_stats
+
+
+class ScriptedClient(LLMClient):
+    """Returns queued completions and records the max_tokens of each call"""
+
+    def __init__(self, completions):
+        self.completions = list(completions)
+        self.max_tokens_seen = []
+
+    async def _complete(self, prompt, system_prompt, response_schema, temperature, max_tokens, mode):
+        self.max_tokens_seen.append(max_tokens)
+        return self.completions.pop(0)
+
+
+@pytest.fixture(autouse=True)
+def reset_llm_stats():
+    token_budget.reset()
+    parse_stats.reset()
+    usage_stats.reset()
+    yield
+    token_budget.reset()
+    parse_stats.reset()
+    usage_stats.reset()
+
+
+def test_token_budget_uses_default_until_enough_samples():
+    budget = TokenBudget(min_samples=10, margin=1.0, floor=1)
+    for _ in range(9):
+        budget.record("evaluate_answer", 300)
+    assert budget.max_tokens_for("evaluate_answer", 2000) == 2000
+    budget.record("evaluate_answer", 300)
+    assert budget.max_tokens_for("evaluate_answer", 2000) == 300
+
+
+def test_token_budget_p99_with_margin_capped_at_default():
+    budget = TokenBudget(min_samples=100, margin=1.5, floor=1)
+    for i in range(1, 101):
+        budget.record("generate_questions", i * 10)
+    # p99 of 10..1000 is 990, plus 50% margin
+    assert budget.max_tokens_for("generate_questions", 3000) == 1485
+    assert budget.max_tokens_for("generate_questions", 1000) == 1000
+    # Sorted once, reused until the next sample
+    cached = budget._sorted["generate_questions"]
+    assert budget.max_tokens_for("generate_questions", 3000) == 1485
+    assert budget._sorted["generate_questions"] is cached
+    budget.record("generate_questions", 2000)
+    assert budget.max_tokens_for("generate_questions", 3000) == 1500
+
+
+def test_token_budget_truncation_rate():
+    budget = TokenBudget()
+    budget.record("reconcile_session", 100)
+    budget.record("reconcile_session", None, truncated=True)
+    assert budget.truncation_rate("reconcile_session") == 0.5
+    assert budget.snapshot()["reconcile_session"]["truncations"] == 1
+    assert REGISTRY.get_sample_value("llm_truncation_rate", {"mode": "reconcile_session"}) == 0.5
+
+
+async def test_truncated_response_retried_once_with_higher_limit():
+    client = ScriptedClient([
+        LLMCompletion(content='{"structure_text": ', output_tokens=500, truncated=True),
+        LLMCompletion(content='{"structure_text": "## Situation"}', output_tokens=20),
+    ])
+    result = await client.generate_structured("prompt", {}, max_tokens=500, mode="generate_story_structure")
+    assert result == {"structure_text": "## Situation"}
+    assert client.max_tokens_seen == [500, 1000]
+    assert token_budget.truncation_rate("generate_story_structure") == 0.5
+
+
+async def test_truncation_retry_never_exceeds_mode_ceiling():
+    ceiling = MODES["generate_story_structure"]["max_tokens"]
+    client = ScriptedClient([
+        LLMCompletion(content="{", truncated=True),
+        LLMCompletion(content="{", truncated=True),
+    ])
+    with pytest.raises(TruncatedResponseError):
+        await client.generate_structured("prompt", {}, max_tokens=ceiling - 500, mode="generate_story_structure")
+    assert client.max_tokens_seen == [ceiling - 500, ceiling]
+
+    # Already at the ceiling: nothing to gain from a retry
+    client = ScriptedClient([LLMCompletion(content="{", truncated=True)])
+    with pytest.raises(TruncatedResponseError):
+        await client.generate_structured("prompt", {}, max_tokens=ceiling, mode="generate_story_structure")
+    assert client.max_tokens_seen == [ceiling]
+
+
+async def test_truncated_twice_raises():
+    client = ScriptedClient([
+        LLMCompletion(content="{", truncated=True),
+        LLMCompletion(content="{", truncated=True),
+    ])
+    with pytest.raises(TruncatedResponseError):
+        await client.generate_structured("prompt", {}, max_tokens=100, mode="evaluate_answer")
+
+
+@pytest.mark.parametrize("raw", [
+    'Here is the outline:\n```json\n{"structure_text": "a {b} c"}\n```\nHope this helps!',
+    '```json\n{"structure_text": "a {b} c"}',
+    '{"structure_text": "a {b} c",}',
+    '{\u201cstructure_text\u201d: "a {b} c"}',
+])
+def test_parse_json_repairs_common_defects(raw):
+    value, repaired = parse_json(raw)
+    assert value == {"structure_text": "a {b} c"}
+    assert repaired is True
+
+
+@pytest.mark.parametrize("raw", [
+    'Here you go:\n```json\n{"structure_text": "Wrap it in ```python``` fences"}\n```',
+    '{"structure_text": "Wrap it in ```python``` fences",}',
+])
+def test_parse_json_repairs_leave_fences_inside_strings(raw):
+    value, _ = parse_json(raw)
+    assert value == {"structure_text": "Wrap it in ```python``` fences"}
+
+
+def test_parse_json_repairs_leave_smart_quotes_inside_strings():
+    value, repaired = parse_json('{\u201cstructure_text\u201d: "She said \u201cit\u2019s fine\u201d",}')
+    assert value == {"structure_text": "She said \u201cit\u2019s fine\u201d"}
+    assert repaired is True
+
+
+@pytest.mark.parametrize("raw", [
+    'Per the outline [see below], here it is: {"structure_text": "a {b} c"}',
+    'Fill in {placeholders} like this:\n```json\n{"structure_text": "a {b} c"}\n```',
+    'Roughly { this: {"structure_text": "a {b} c"}',
+])
+def test_parse_json_skips_brackets_in_prose(raw):
+    value, repaired = parse_json(raw)
+    assert value == {"structure_text": "a {b} c"}
+    assert repaired is True
+
+
+def test_parse_json_gives_up_on_garbage():
+    with pytest.raises(JSONRepairError):
+        parse_json("I cannot help with that.")
+
+
+async def test_malformed_output_repaired_without_recall():
+    client = ScriptedClient([
+        LLMCompletion(content='Sure! {"score": 7, "positive_feedback": [], "improvement_areas": [], "anchors": [],}'),
+    ])
+    result = await client.generate_structured("prompt", {}, mode="evaluate_answer")
+    assert result["score"] == 7
+    assert parse_stats.snapshot()["evaluate_answer"] == {"clean": 0, "repaired": 1, "recalled": 0}
+
+
+async def test_output_failing_validation_raises_for_recall():
+    client = ScriptedClient([LLMCompletion(content='{"score": 7}')])
+    with pytest.raises(MalformedResponseError):
+        await client.generate_structured("prompt", {}, mode="evaluate_answer")
+    assert parse_stats.snapshot()["evaluate_answer"]["recalled"] == 1
+
+
+async def test_cached_tokens_recorded_per_mode():
+    client = ScriptedClient([
+        LLMCompletion(
+            content='{"structure_text": "x"}',
+            output_tokens=10,
+            input_tokens=2000,
+            cached_input_tokens=1500,
+        ),
+    ])
+    await client.generate_structured("prompt", {}, system="instructions", mode="generate_story_structure")
+    stats = usage_stats.snapshot()["generate_story_structure"]
+    assert stats["cached_input_tokens"] == 1500
+    assert stats["cache_hit_ratio"] == 0.75
+
+
+def test_anthropic_cache_breakpoint_only_on_cacheable_prefix():
+    assert AnthropicClient._system_blocks("short instructions") == "short instructions"
+    long_prompt = "x" * 4096
+    assert AnthropicClient._system_blocks(long_prompt) == [
+        {"type": "text", "text": long_prompt, "cache_control": {"type": "ephemeral"}}
+    ]
+
+
+def test_compile_schema_renders_compact_signature():
+    schema = MODES["generate_questions"]["response_schema"]
+    assert compile_schema(schema) == (
+        "{questions: {question: string; status: string; redo_reason?: string | null; difficulty: string}[]}"
+    )
+    assert len(compile_schema(schema)) < len(str(schema)) / 4
+
+
+async def test_llm_metrics_exported(test_client):
+    client = ScriptedClient([
+        LLMCompletion(content='{"structure_text": "x"}', output_tokens=10, input_tokens=100),
+    ])
+    client.provider, client.model = "anthropic", "claude-3-5-sonnet-20241022"
+    await client.generate_structured("prompt", {}, mode="generate_story_structure")
+
+    labels = {"mode": "generate_story_structure", "provider": "anthropic", "model": "claude-3-5-sonnet-20241022"}
+    assert REGISTRY.get_sample_value("llm_request_duration_seconds_count", {**labels, "outcome": "ok"}) >= 1
+    assert REGISTRY.get_sample_value("llm_tokens_total", {**labels, "kind": "output"}) >= 10
+    assert REGISTRY.get_sample_value("llm_cost_usd_total", labels) > 0
+
+    response = test_client.get("/metrics")
+    assert response.status_code == 200
+    assert "llm_request_duration_seconds_bucket" in response.text
+
+
+def _fake_settings(monkeypatch, **overrides):
+    from app.config import settings
+
+    for name, value in overrides.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+async def _fake_outcomes(seed: int, calls: int) -> list[str]:
+    from app.llm.client import FakeLLMClient, FakeLLMError
+
+    client = FakeLLMClient(seed)
+    schema = MODES["evaluate_answer"]["response_schema"]
+    outcomes = []
+    for _ in range(calls):
+        try:
+            await client.generate_structured("prompt", schema, mode="evaluate_answer")
+            outcomes.append("ok")
+        except FakeLLMError as e:
+            outcomes.append(str(e.status_code))
+        except (MalformedResponseError, TruncatedResponseError) as e:
+            outcomes.append(type(e).__name__)
+    return outcomes
+
+
+async def test_fake_llm_is_deterministic_for_a_seed(monkeypatch):
+    _fake_settings(
+        monkeypatch,
+        FAKE_LLM_ERROR_RATE=0.2,
+        FAKE_LLM_RATE_LIMIT_RATE=0.2,
+        FAKE_LLM_MALFORMED_RATE=0.2,
+        FAKE_LLM_INVALID_RATE=0.2,
+    )
+    first = await _fake_outcomes(seed=42, calls=30)
+    assert first == await _fake_outcomes(seed=42, calls=30)
+    assert {"ok", "500", "429", "MalformedResponseError"} <= set(first)
+    # Malformed-but-repairable output is fixed locally rather than failing
+    assert parse_stats.snapshot()["evaluate_answer"]["repaired"] > 0
+
+
+async def test_fake_llm_injects_latency(monkeypatch):
+    import time
+    from app.llm.client import FakeLLMClient
+
+    _fake_settings(monkeypatch, FAKE_LLM_LATENCY_MS={"default": 0, "evaluate_answer": 50}, FAKE_LLM_LATENCY_SIGMA=0.0)
+    client = FakeLLMClient(seed=1)
+    started = time.perf_counter()
+    await client.generate_structured("prompt", MODES["evaluate_answer"]["response_schema"], mode="evaluate_answer")
+    assert time.perf_counter() - started >= 0.05
+
+
+async def test_fake_llm_profiles_latency_by_the_callers_mode(monkeypatch):
+    import time
+    from app.llm.client import FakeLLMClient
+
+    # suggest_plan_changes shares suggest_plan's schema
+    _fake_settings(monkeypatch, FAKE_LLM_LATENCY_MS={"default": 0, "suggest_plan_changes": 50}, FAKE_LLM_LATENCY_SIGMA=0.0)
+    client = FakeLLMClient(seed=1)
+    started = time.perf_counter()
+    await client.generate_structured("prompt", MODES["suggest_plan"]["response_schema"], mode="suggest_plan_changes")
+    assert time.perf_counter() - started >= 0.05
+
+
+async def test_retry_waits_for_provider_retry_after():
+    import time
+    from app.llm.client import FakeLLMError
+    from app.llm.retry import with_retry
+
+    calls = 0
+
+    async def rate_limited_once():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise FakeLLMError("Injected rate limit", status_code=429, retry_after=0.1)
+        return "ok"
+
+    started = time.perf_counter()
+    assert await with_retry(rate_limited_once, base_delay=0.001) == "ok"
+    assert time.perf_counter() - started >= 0.1
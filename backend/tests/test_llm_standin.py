@@ -0,0 +1,82 @@
+"""
+Tests for the local OpenAI/Anthropic stand-in server driving the real SDK clients
+"""
+import json
+
+import anthropic
+import httpx
+import openai
+import pytest
+
+from app.llm.client import AnthropicClient, OpenAIClient
+from app.llm.modes import MODES
+from benchmarks.llm_standin import cassette_key, create_app
+
+
+def _http_client(app, **kwargs) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://standin", **kwargs)
+
+
+def _openai_client(http_client) -> OpenAIClient:
+    client = OpenAIClient()
+    client.client = openai.AsyncOpenAI(api_key="test", base_url="http://standin/v1", http_client=http_client, max_retries=0)
+    return client
+
+
+async def test_replay_serves_recorded_cassette(tmp_path):
+    app = create_app("replay", str(tmp_path))
+    client = _openai_client(_http_client(app))
+    schema = MODES["generate_story_structure"]["response_schema"]
+
+    # Capture the exact request the client sends, then record a response for it
+    recorded = {}
+
+    async def capture(request):
+        recorded.update(json.loads(request.content))
+
+    capturing = _http_client(app, event_hooks={"request": [capture]})
+    with pytest.raises(openai.NotFoundError):
+        await _openai_client(capturing).generate_structured("Question: Tell me about a conflict", schema)
+    (tmp_path / f"{cassette_key('/v1/chat/completions', recorded)}.json").write_text(json.dumps({
+        "request": {},
+        "response": {"status": 200, "body": {
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": '{"structure_text": "recorded"}'}}],
+            "usage": {"prompt_tokens": 50, "completion_tokens": 5, "total_tokens": 55},
+        }},
+    }))
+
+    result = await client.generate_structured("Question: Tell me about a conflict", schema)
+    assert result == {"structure_text": "recorded"}
+
+
+async def test_stub_fallback_speaks_anthropic_wire_format(tmp_path):
+    app = create_app("replay", str(tmp_path), fallback="stub")
+    client = AnthropicClient()
+    client.client = anthropic.AsyncAnthropic(
+        api_key="test", base_url="http://standin", http_client=_http_client(app), max_retries=0
+    )
+    result = await client.generate_structured(
+        "Question: Tell me about a time you failed",
+        MODES["evaluate_answer"]["response_schema"],
+        mode="evaluate_answer",
+    )
+    assert result["score"] == 7
+
+
+async def test_record_passes_upstream_errors_through_unrecorded(tmp_path):
+    def upstream(request):
+        if request.url.path == "/v1/messages":
+            return httpx.Response(529, text="<html>Overloaded</html>", headers={"content-type": "text/html"})
+        return httpx.Response(200, json={"id": "chatcmpl-1", "choices": []})
+
+    app = create_app("record", str(tmp_path), upstream_transport=httpx.MockTransport(upstream))
+    async with _http_client(app) as client:
+        overloaded = await client.post("/v1/messages", json={"model": "claude"})
+        recorded = await client.post("/v1/chat/completions", json={"model": "gpt"})
+
+    assert overloaded.status_code == 529
+    assert overloaded.text == "<html>Overloaded</html>"
+    assert recorded.json() == {"id": "chatcmpl-1", "choices": []}
+    assert [path.name for path in tmp_path.iterdir()] == [f"{cassette_key('/v1/chat/completions', {'model': 'gpt'})}.json"]
@@ -0,0 +1,91 @@
+"""
+Tests for adaptive load shedding on LLM-backed endpoints
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app import config
+from app.api import load_shedding
+from app.api.load_shedding import AdaptiveConcurrencyLimiter
+from app.api.routes import plan
+from app.main import app
+from app.observability.context import end_request_stats, start_request_stats
+
+
+def _limiter() -> AdaptiveConcurrencyLimiter:
+    return AdaptiveConcurrencyLimiter(initial_limit=20, min_limit=2, max_limit=100, tolerance=2.0)
+
+
+def _run(limiter: AdaptiveConcurrencyLimiter, latency: float, requests: int) -> None:
+    # Keep the limiter busy so growth isn't suppressed as unused capacity
+    for _ in range(requests):
+        while limiter.try_acquire():
+            pass
+        limiter.release(latency)
+
+
+def test_limit_grows_at_steady_latency_and_shrinks_when_latency_rises():
+    limiter = _limiter()
+    _run(limiter, 1.0, 20)
+    assert limiter.limit > 20
+    grown = limiter.limit
+
+    _run(limiter, 4.0, 20)
+    assert limiter.limit < grown / 2
+
+    failed = _limiter()
+    assert failed.try_acquire()
+    failed.release(failed=True)
+    assert failed.limit < 20
+
+
+def test_idle_traffic_does_not_grow_limit():
+    limiter = _limiter()
+    for _ in range(20):
+        assert limiter.try_acquire()
+        limiter.release(1.0)
+    assert limiter.limit == 20
+
+
+async def test_requests_over_limit_are_shed_with_retry_after(
+    override_get_db, override_get_current_user, monkeypatch
+):
+    monkeypatch.setattr(load_shedding, "llm_limiter", AdaptiveConcurrencyLimiter(1, 1, 1, 2.0))
+    monkeypatch.setattr(config.settings, "RATE_LIMITS", {"suggest_new": {"concurrency": 5}})
+    suggest_plan = plan.suggest_plan
+
+    async def slow_suggest_plan(**kwargs):
+        await asyncio.sleep(0.1)
+        return await suggest_plan(**kwargs)
+
+    monkeypatch.setattr(plan, "suggest_plan", slow_suggest_plan)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        responses = await asyncio.gather(*(
+            client.post("/api/v1/plan/suggest_new", json={"role": "Backend Engineer", "raw_user_context": "Five years of Python."}) for _ in range(3)
+        ))
+        read_only = await asyncio.gather(*(client.get("/api/v1/plan/can_refine") for _ in range(3)))
+
+    assert sorted(r.status_code for r in responses) == [200, 503, 503]
+    assert all(int(r.headers["Retry-After"]) >= 1 for r in responses if r.status_code == 503)
+    assert [r.status_code for r in read_only] == [200, 200, 200]
+
+
+async def test_only_requests_that_call_the_provider_feed_the_baseline(monkeypatch):
+    limiter = _limiter()
+    monkeypatch.setattr(load_shedding, "llm_limiter", limiter)
+    stats, token = start_request_stats()
+    try:
+        for llm_calls in (0, 1):
+            admitted = load_shedding.shed_load(None)
+            await admitted.__anext__()
+            stats.llm_calls += llm_calls
+            with pytest.raises(StopAsyncIteration):
+                await admitted.__anext__()
+            if not llm_calls:
+                assert limiter.baseline is None
+    finally:
+        end_request_stats(token)
+    assert limiter.baseline is not None
+    assert limiter.in_flight == 0
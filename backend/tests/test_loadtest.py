@@ -0,0 +1,23 @@
+"""
+Smoke test for the load-test scenario so it keeps up with API changes
+"""
+import random
+
+import httpx
+
+from app.main import app
+from benchmarks.loadtest import Recorder, study_session_scenario
+
+
+async def test_study_session_scenario_completes(override_get_db, override_get_current_user):
+    recorder = Recorder()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest") as client:
+        completed = await study_session_scenario(
+            client, recorder, random.Random(0), sessions=2, answers_per_session=2, think_time=0
+        )
+
+    assert completed == 2
+    report = recorder.report(duration=1.0)
+    assert report["errors"] == 0
+    assert report["endpoints"]["POST /study/evaluate_answer/{id}"]["count"] == 4
+    assert {"p50_ms", "p95_ms", "p99_ms"} <= set(report["endpoints"]["PUT /study/end_session/{id}"])
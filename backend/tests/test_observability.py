@@ -0,0 +1,163 @@
+"""
+Tests for HTTP request metrics, the slow-request log and per-request SQL counts
+"""
+import json
+import logging
+
+from prometheus_client import REGISTRY
+
+from app.config import settings
+
+
+def test_http_metrics_labelled_by_route_template(test_client):
+    labels = {"method": "GET", "route": "/api/v1/study/session/{session_id}", "status": "404"}
+    before = REGISTRY.get_sample_value("http_responses_total", labels) or 0
+
+    response = test_client.get("/api/v1/study/session/12345")
+    assert response.status_code == 404
+
+    assert REGISTRY.get_sample_value("http_responses_total", labels) == before + 1
+    assert REGISTRY.get_sample_value(
+        "http_request_duration_seconds_count",
+        {"method": "GET", "route": "/api/v1/study/session/{session_id}"},
+    ) >= 1
+    assert REGISTRY.get_sample_value(
+        "http_requests_in_progress",
+        {"method": "GET", "route": "/api/v1/study/session/{session_id}"},
+    ) == 0
+
+
+def test_slow_request_log_includes_db_and_llm_time(test_client, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+        response = test_client.post(
+            "/api/v1/plan/suggest_new",
+            json={"role": "Software Engineer", "raw_user_context": "Two years of Python."},
+        )
+    assert response.status_code == 200
+
+    entry = json.loads(caplog.records[-1].getMessage())
+    assert entry["route"] == "/api/v1/plan/suggest_new"
+    assert entry["status"] == 200
+    assert entry["db_statements"] > 0
+    assert entry["llm_calls"] == 1
+
+
+def _seed_sessions(db_session, user_id: str, topics: int = 3, sessions_per_topic: int = 3):
+    from datetime import datetime, timedelta, timezone
+    from app.models.plan import PlanTopic
+    from app.models.question import Question, QuestionAttempt
+    from app.models.session import StudySession
+
+    for i in range(topics):
+        topic = PlanTopic(
+            user_id=user_id,
+            name=f"Topic {i}",
+            description="desc",
+            planned_daily_study_time=30,
+            priority=i + 1,
+        )
+        db_session.add(topic)
+        db_session.flush()
+        question = Question(topic_id=topic.id, question=f"Question {i}?")
+        db_session.add(question)
+        db_session.flush()
+        for j in range(sessions_per_topic):
+            session = StudySession(
+                user_id=user_id,
+                topic_id=topic.id,
+                planned_duration=30,
+                start_time=datetime.now(timezone.utc) - timedelta(days=j + 1),
+            )
+            db_session.add(session)
+            db_session.flush()
+            db_session.add_all([
+                QuestionAttempt(question_id=question.id, study_session_id=session.id, raw_answer="a", score_rating=6),
+                QuestionAttempt(question_id=question.id, study_session_id=session.id, raw_answer="b", score_rating=8),
+            ])
+    db_session.commit()
+
+
+# Query limits include one statement to refresh the test user, which is expired
+# by the commit in _seed_sessions because it shares the test DB session.
+def test_list_sessions_query_count_is_constant(test_client, db_session, test_user, assert_max_queries):
+    _seed_sessions(db_session, test_user.clerk_user_id)
+    with assert_max_queries(4):
+        response = test_client.get("/api/v1/study/sessions")
+    assert response.status_code == 200
+    sessions = response.json()["sessions"]
+    assert len(sessions) == 9
+    assert all(s["questions_answered"] == 2 and s["average_score"] == 7 for s in sessions)
+
+
+def test_suggested_session_query_count_is_constant(test_client, db_session, test_user, assert_max_queries):
+    _seed_sessions(db_session, test_user.clerk_user_id)
+    with assert_max_queries(4):
+        response = test_client.get("/api/v1/study/suggested_session")
+    assert response.status_code == 200
+    assert response.json()["reason"].startswith("Time to practice")
+
+
+def test_view_plan_query_count(test_client, db_session, test_user, assert_max_queries):
+    _seed_sessions(db_session, test_user.clerk_user_id)
+    with assert_max_queries(3):
+        response = test_client.get("/api/v1/plan/view")
+    assert response.status_code == 200
+
+
+def test_debug_mode_adds_db_headers(test_client, monkeypatch):
+    monkeypatch.setattr(settings, "DEBUG", True)
+    response = test_client.get("/api/v1/study/sessions")
+    assert response.status_code == 200
+    assert int(response.headers["x-db-statements"]) >= 1
+    assert "x-db-time-ms" in response.headers
+
+
+async def test_loop_monitor_logs_stack_of_blocking_call(caplog):
+    import asyncio
+    import time
+    from app.observability.loop_monitor import LoopLagMonitor
+
+    def blocking_call_in_handler():
+        time.sleep(0.3)
+
+    monitor = LoopLagMonitor(interval=0.02, stack_threshold=0.1)
+    with caplog.at_level(logging.WARNING, logger="app.observability.loop_monitor"):
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_call_in_handler()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    blocked = [r.getMessage() for r in caplog.records if "Event loop blocked" in r.getMessage()]
+    assert len(blocked) == 1
+    assert "blocking_call_in_handler" in blocked[0]
+    assert REGISTRY.get_sample_value("event_loop_lag_seconds_count") > 0
+
+
+async def test_profiling_middleware_writes_collapsed_stacks(tmp_path, monkeypatch):
+    import asyncio
+    import time
+    from app.observability.profiling import ProfilingMiddleware
+
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "PROFILING_INTERVAL_MS", 1)
+    monkeypatch.setattr(settings, "PROFILING_OUTPUT_DIR", str(tmp_path))
+
+    async def slow_endpoint(scope, receive, send):
+        time.sleep(0.05)
+        await asyncio.sleep(0)
+
+    middleware = ProfilingMiddleware(slow_endpoint)
+    scope = {"type": "http", "method": "GET", "path": "/api/v1/plan/view", "headers": []}
+    await middleware(scope, None, None)
+    assert list(tmp_path.iterdir()) == []
+
+    scope["headers"] = [(b"x-profile", b"secret")]
+    await middleware(scope, None, None)
+    [profile] = list(tmp_path.iterdir())
+    assert profile.name.startswith("GET_api_v1_plan_view_")
+    lines = profile.read_text().splitlines()
+    assert any("slow_endpoint" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
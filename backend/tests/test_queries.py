@@ -0,0 +1,17 @@
+"""
+Tests for the DB query micro-benchmark suite
+"""
+from benchmarks.queries import CASES, benchmark_size, prepare_database
+
+
+def test_query_benchmark_reports_counts_and_plans(tmp_path):
+    engine = prepare_database(f"sqlite:///{tmp_path / 'bench.db'}", users=10, seed=1, fresh=False)
+    try:
+        results = benchmark_size(engine, list(CASES), repeat=5, users=3, seed=1, analyze=False)
+    finally:
+        engine.dispose()
+
+    # Includes refreshing the expired user, as get_current_user loads it per request
+    assert results["view_plan"]["statements"] == 3
+    assert results["end_session_attempts"]["statements"] == 1
+    assert all(r["plans"] and r["plans"][0]["plan"] for r in results.values())
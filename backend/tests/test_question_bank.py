@@ -0,0 +1,89 @@
+"""
+Tests for the shared per-topic question bank
+"""
+from prometheus_client import REGISTRY
+
+from app import config
+from app.models.plan import PlanTopic
+from app.models.question import Question, QuestionAttempt, QuestionBankEntry
+from app.models.session import StudySession
+from app.llm.modes import QuestionSchema
+from app.services.question_bank import _store, question_hash, topic_fingerprint
+
+
+def _bank_requests(outcome: str) -> float:
+    return REGISTRY.get_sample_value("question_bank_requests_total", {"outcome": outcome}) or 0.0
+
+
+def _session_for_topic(db_session, user, name: str) -> StudySession:
+    topic = PlanTopic(
+        user_id=user.clerk_user_id,
+        name=name,
+        description="Arrays, linked lists, trees",
+        planned_daily_study_time=30,
+        priority=1,
+    )
+    db_session.add(topic)
+    db_session.flush()
+    session = StudySession(user_id=user.clerk_user_id, topic_id=topic.id, planned_duration=30)
+    db_session.add(session)
+    db_session.commit()
+    return session
+
+
+def test_topic_fingerprint_ignores_case_punctuation_and_word_order():
+    assert topic_fingerprint("System Design", "Caching, sharding and queues") == topic_fingerprint(
+        "system design!", "queues and caching; sharding"
+    )
+    assert topic_fingerprint("System Design", "") != topic_fingerprint("Databases", "")
+
+
+def test_bank_serves_equivalent_topics_and_skips_mastered(test_client, db_session, test_user, monkeypatch):
+    monkeypatch.setattr(config.settings, "QUESTION_BANK_DIFFICULTY_MIX", {"easy": 1, "medium": 1, "hard": 1})
+    misses, full_hits, partials = _bank_requests("miss"), _bank_requests("full_hit"), _bank_requests("partial")
+
+    first = _session_for_topic(db_session, test_user, "Data Structures")
+    response = test_client.post(f"/api/v1/study/generate_questions/{first.id}")
+    assert response.status_code == 200
+    assert len(response.json()["questions"]) == 3
+    assert db_session.query(QuestionBankEntry).count() == 3
+    assert _bank_requests("miss") == misses + 1
+
+    # Same topic under a different plan: served entirely from the bank
+    second = _session_for_topic(db_session, test_user, "data structures")
+    response = test_client.post(f"/api/v1/study/generate_questions/{second.id}")
+    assert {q["question"] for q in response.json()["questions"]} == {
+        e.question for e in db_session.query(QuestionBankEntry)
+    }
+    assert _bank_requests("full_hit") == full_hits + 1
+
+    # A mastered question is not served again, so the LLM tops up that difficulty
+    mastered = db_session.query(QuestionBankEntry).filter(QuestionBankEntry.difficulty == "hard").one()
+    question = Question(topic_id=second.topic_id, question=mastered.question)
+    db_session.add(question)
+    db_session.flush()
+    db_session.add(QuestionAttempt(question_id=question.id, study_session_id=second.id, raw_answer="...", score_rating=9))
+    db_session.commit()
+    response = test_client.post(f"/api/v1/study/generate_questions/{second.id}")
+    assert response.status_code == 200
+    assert mastered.question not in {q["question"] for q in response.json()["questions"]}
+    assert _bank_requests("partial") == partials + 1
+
+
+def test_question_banked_concurrently_does_not_drop_the_rest_of_the_batch(db_session):
+    fingerprint = topic_fingerprint("Data Structures", "")
+    db_session.add(QuestionBankEntry(
+        topic_fingerprint=fingerprint,
+        difficulty="easy",
+        question="What is a stack?",
+        question_hash=question_hash("What is a stack?"),
+    ))
+    db_session.commit()
+
+    _store(db_session, fingerprint, [
+        QuestionSchema(question="What is a stack?", status="new", difficulty="Easy"),
+        QuestionSchema(question="What is a heap?", status="new", difficulty="Medium"),
+    ], served=set())
+    db_session.commit()
+
+    assert {e.question for e in db_session.query(QuestionBankEntry)} == {"What is a stack?", "What is a heap?"}
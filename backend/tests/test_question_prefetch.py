@@ -0,0 +1,108 @@
+"""
+Tests for background question generation at start_session
+"""
+import asyncio
+
+from prometheus_client import REGISTRY
+
+from app import config
+from app.api.routes import study
+from app.llm.modes import GenerateQuestionsResponse
+from app.models.plan import PlanTopic
+from app.services.question_prefetch import QuestionPrefetcher
+
+
+def _prefetch_count(outcome: str) -> float:
+    return REGISTRY.get_sample_value("question_prefetch_total", {"outcome": outcome}) or 0.0
+
+
+async def _questions(delay: float = 0) -> GenerateQuestionsResponse:
+    await asyncio.sleep(delay)
+    return GenerateQuestionsResponse(questions=[{"question": "Q1", "status": "new", "difficulty": "easy"}])
+
+
+async def test_claim_awaits_in_flight_and_is_single_use():
+    prefetcher = QuestionPrefetcher(ttl_seconds=60, max_entries=10)
+    prefetcher.start(1, lambda: _questions(delay=0.01))
+
+    result = await prefetcher.claim(1)
+
+    assert result.questions[0].question == "Q1"
+    assert await prefetcher.claim(1) is None
+    assert len(prefetcher) == 0
+
+
+async def test_stale_and_discarded_prefetches_are_dropped():
+    prefetcher = QuestionPrefetcher(ttl_seconds=0, max_entries=10)
+    prefetcher.start(1, _questions)
+    before = _prefetch_count("expired")
+    await asyncio.sleep(0.01)
+    assert await prefetcher.claim(1) is None
+    assert _prefetch_count("expired") == before + 1
+
+    prefetcher = QuestionPrefetcher(ttl_seconds=60, max_entries=1)
+    prefetcher.start(1, lambda: _questions(delay=1))
+    prefetcher.start(2, lambda: _questions(delay=1))  # evicts session 1
+    assert len(prefetcher) == 1
+    prefetcher.discard(2)
+    assert len(prefetcher) == 0
+
+
+def test_generate_questions_serves_prefetch(test_client, db_session, test_user):
+    topic = PlanTopic(
+        user_id=test_user.clerk_user_id,
+        name="System Design",
+        description="Design scalable systems",
+        planned_daily_study_time=30,
+        priority=1,
+    )
+    db_session.add(topic)
+    db_session.commit()
+    before = _prefetch_count("ready") + _prefetch_count("in_flight")
+
+    # One portal for both requests so the background task shares their event loop
+    with test_client:
+        session_id = test_client.post(
+            "/api/v1/study/start_session", json={"topic_id": topic.id, "planned_study_time": 30}
+        ).json()["id"]
+        response = test_client.post(f"/api/v1/study/generate_questions/{session_id}")
+
+    assert response.status_code == 200
+    assert response.json()["questions"]
+    assert _prefetch_count("ready") + _prefetch_count("in_flight") == before + 1
+
+
+def test_prefetch_is_charged_to_the_generate_questions_bucket(test_client, db_session, test_user, monkeypatch):
+    monkeypatch.setattr(config.settings, "RATE_LIMITS", {"generate_questions": {"per_minute": 1, "burst": 1}})
+    calls = 0
+
+    async def counting_top_up(plan, *args):
+        nonlocal calls
+        calls += 1
+        return plan
+
+    monkeypatch.setattr(study, "top_up", counting_top_up)
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="System Design", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.commit()
+
+    with test_client:
+        for _ in range(2):
+            session_id = test_client.post(
+                "/api/v1/study/start_session", json={"topic_id": topic.id, "planned_study_time": 30}
+            ).json()["id"]
+        # The second prefetch found the bucket empty, and this request is over the limit too
+        assert test_client.post(f"/api/v1/study/generate_questions/{session_id}").status_code == 429
+
+    assert calls == 1
+
+
+async def test_prefetch_is_skipped_when_shedding_load(monkeypatch):
+    from app.api import load_shedding
+    from app.api.load_shedding import AdaptiveConcurrencyLimiter
+
+    limiter = AdaptiveConcurrencyLimiter(1, 1, 1, 2.0)
+    assert limiter.try_acquire()
+    monkeypatch.setattr(load_shedding, "llm_limiter", limiter)
+
+    assert await study._prefetch_questions("user", lambda: _questions()) is None
@@ -0,0 +1,136 @@
+"""
+Tests for per-user rate limiting on LLM-backed endpoints
+"""
+import asyncio
+
+import httpx
+
+from app import config
+from app.api import rate_limit
+from app.api.rate_limit import InMemoryBackend, RouteLimits
+from app.api.routes import study
+from app.llm.modes import EvaluateAnswerResponse
+from app.main import app
+from app.models.plan import PlanTopic
+from app.models.question import Question, QuestionAttempt
+from app.models.session import StudySession
+
+PLAN_REQUEST = {
+    "role": "Backend Engineer",
+    "raw_user_context": "Five years of Python.",
+    "time_available_minutes": 60,
+}
+
+
+def test_burst_exhaustion_returns_429_with_retry_after(test_client, monkeypatch):
+    monkeypatch.setattr(config.settings, "RATE_LIMITS", {"suggest_new": {"per_minute": 1, "burst": 2}})
+
+    statuses = [test_client.post("/api/v1/plan/suggest_new", json=PLAN_REQUEST).status_code for _ in range(2)]
+    limited = test_client.post("/api/v1/plan/suggest_new", json=PLAN_REQUEST)
+
+    assert statuses == [200, 200]
+    assert limited.status_code == 429
+    assert 0 < int(limited.headers["Retry-After"]) <= 60
+    # Read-only endpoints are not limited
+    assert test_client.get("/api/v1/plan/can_refine").status_code == 200
+
+
+async def test_buckets_are_per_user_and_refill():
+    backend = InMemoryBackend()
+    limits = RouteLimits(per_minute=6000, burst=1, concurrency=1)
+
+    assert await backend.take_token("evaluate_answer:alice", limits) == 0
+    assert await backend.take_token("evaluate_answer:alice", limits) > 0
+    assert await backend.take_token("evaluate_answer:bob", limits) == 0
+    await asyncio.sleep(0.02)
+    assert await backend.take_token("evaluate_answer:alice", limits) == 0
+
+
+async def test_pruning_keeps_slower_routes_drained_buckets(monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_BUCKETS", 1)
+    backend = InMemoryBackend()
+    strict = RouteLimits(per_minute=1, burst=1, concurrency=1)
+    loose = RouteLimits(per_minute=600000, burst=1, concurrency=1)
+
+    assert await backend.take_token("suggest_new:alice", strict) == 0
+    await asyncio.sleep(0.01)
+    # Prunes with the loose route's refill time, which must not free alice's strict bucket
+    assert await backend.take_token("evaluate_answer:bob", loose) == 0
+    assert await backend.take_token("suggest_new:alice", strict) > 0
+
+
+async def test_pruning_is_amortised_while_buckets_stay_live(monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_BUCKETS", 2)
+    backend = InMemoryBackend()
+    strict = RouteLimits(per_minute=1, burst=1, concurrency=1)
+    scans = 0
+    prune = backend._prune
+
+    def counting_prune(now):
+        nonlocal scans
+        scans += 1
+        prune(now)
+
+    monkeypatch.setattr(backend, "_prune", counting_prune)
+    for i in range(64):
+        await backend.take_token(f"suggest_new:user{i}", strict)
+    # Nothing refills, so the threshold doubles after each scan: 3, 6, 12, 24, 48 buckets
+    assert scans == 5
+
+
+async def test_concurrent_requests_over_limit_are_rejected(
+    override_get_db, override_get_current_user, db_session, test_user, monkeypatch
+):
+    monkeypatch.setattr(config.settings, "RATE_LIMITS", {"evaluate_answer": {"concurrency": 1}})
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="Algorithms", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.commit()
+    session = StudySession(user_id=test_user.clerk_user_id, topic_id=topic.id, planned_duration=30)
+    db_session.add(session)
+    db_session.commit()
+
+    async def slow_evaluate(**kwargs):
+        await asyncio.sleep(0.1)
+        return EvaluateAnswerResponse(score=6, positive_feedback=["Clear"], improvement_areas=[], anchors=[])
+
+    monkeypatch.setattr(study, "evaluate_answer", slow_evaluate)
+    url = f"/api/v1/study/evaluate_answer/{session.id}"
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        responses = await asyncio.gather(*(
+            client.post(url, json={"question": "What is a heap?", "raw_answer": f"Answer {i}"}) for i in range(2)
+        ))
+        # The slot is released once the first request finishes
+        after = await client.post(url, json={"question": "What is a heap?", "raw_answer": "Answer 3"})
+
+    assert sorted(r.status_code for r in responses) == [200, 429]
+    assert next(r for r in responses if r.status_code == 429).headers["Retry-After"] == "1"
+    assert after.status_code == 200
+
+
+def test_end_session_over_limit_closes_without_reconciliation(test_client, db_session, test_user, monkeypatch):
+    monkeypatch.setattr(config.settings, "RATE_LIMITS", {"end_session": {"per_minute": 1, "burst": 1, "concurrency": 1}})
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="Algorithms", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.commit()
+    question = Question(topic_id=topic.id, question="What is a heap?")
+    sessions = [StudySession(user_id=test_user.clerk_user_id, topic_id=topic.id, planned_duration=30) for _ in range(2)]
+    db_session.add_all([question, *sessions])
+    db_session.flush()
+    db_session.add_all(
+        QuestionAttempt(question_id=question.id, study_session_id=session.id, raw_answer="a", score_rating=6)
+        for session in sessions
+    )
+    db_session.commit()
+    reconcile = study.reconcile_session
+    reconciled = []
+
+    async def counting_reconcile(attempts):
+        reconciled.append(attempts)
+        return await reconcile(attempts)
+
+    monkeypatch.setattr(study, "reconcile_session", counting_reconcile)
+    statuses = [test_client.put(f"/api/v1/study/end_session/{session.id}").status_code for session in sessions]
+
+    assert statuses == [200, 200]
+    assert len(reconciled) == 1
+    assert all(db_session.get(StudySession, session.id).end_time is not None for session in sessions)
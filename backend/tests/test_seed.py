@@ -0,0 +1,49 @@
+"""
+Tests for the synthetic data seeding CLI
+"""
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from app.models import QuestionAttempt, StudySession, User
+from benchmarks.seed import SeedAlreadyLoadedError, SeedConfig, seed_database
+
+
+def _fingerprint(url: str) -> tuple:
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        answers = conn.execute(select(QuestionAttempt.raw_answer).order_by(QuestionAttempt.id)).scalars().all()
+        sessions = conn.execute(select(func.count()).select_from(StudySession)).scalar()
+    engine.dispose()
+    return sessions, answers
+
+
+def test_seed_is_deterministic_and_appends(tmp_path):
+    config = SeedConfig(users=5, seed=7, batch_users=2)
+    first, second = f"sqlite:///{tmp_path / 'a.db'}", f"sqlite:///{tmp_path / 'b.db'}"
+
+    counts = seed_database(first, config, create_tables=True)
+    seed_database(second, config, create_tables=True)
+
+    assert counts["users"] == 5
+    assert counts["question_attempts"] > 0
+    assert _fingerprint(first) == _fingerprint(second)
+
+    # A second run with another seed continues ids after the existing rows
+    more = seed_database(first, SeedConfig(users=3, seed=8), create_tables=False)
+    engine = create_engine(first)
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(User)).scalar() == 8
+        assert conn.execute(select(func.count()).select_from(QuestionAttempt)).scalar() == (
+            counts["question_attempts"] + more["question_attempts"]
+        )
+    engine.dispose()
+
+
+def test_rerunning_a_seed_is_refused(tmp_path):
+    url = f"sqlite:///{tmp_path / 'seeded.db'}"
+    seed_database(url, SeedConfig(users=2, seed=7), create_tables=True)
+
+    with pytest.raises(SeedAlreadyLoadedError, match="seed 7"):
+        seed_database(url, SeedConfig(users=3, seed=7))
+    # Another seed still appends
+    seed_database(url, SeedConfig(users=1, seed=1))
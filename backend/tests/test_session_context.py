@@ -0,0 +1,60 @@
+"""
+Tests for the active-session context cache on the study hot path
+"""
+from app.models.plan import PlanTopic
+from app.services.session_context import SessionContext, SessionContextCache, session_contexts
+
+
+def _start(test_client, db_session, test_user) -> int:
+    topic = PlanTopic(
+        user_id=test_user.clerk_user_id,
+        name="Algorithms",
+        description="Graphs and dynamic programming",
+        planned_daily_study_time=30,
+        priority=1,
+    )
+    db_session.add(topic)
+    db_session.commit()
+    response = test_client.post("/api/v1/study/start_session", json={"topic_id": topic.id, "planned_study_time": 30})
+    return response.json()["id"]
+
+
+def _lookup_reads(statements: list[str]) -> list[str]:
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT") and ("study_sessions" in s or "plan_topics" in s)]
+
+
+def test_answer_path_reads_no_session_or_topic(test_client, db_session, test_user, assert_max_queries):
+    session_id = _start(test_client, db_session, test_user)
+
+    with assert_max_queries(20) as statements:
+        evaluated = test_client.post(
+            f"/api/v1/study/evaluate_answer/{session_id}",
+            json={"question": "What is a heap?", "raw_answer": "A tree with the heap property."},
+        )
+        story = test_client.post(f"/api/v1/study/generate_story/{session_id}", json={"question": "Tell me about a conflict"})
+
+    assert evaluated.status_code == story.status_code == 200
+    assert _lookup_reads(statements) == []
+
+
+def test_end_session_and_plan_approval_invalidate(test_client, db_session, test_user):
+    ended = _start(test_client, db_session, test_user)
+    assert session_contexts.get(ended, test_user.clerk_user_id) is not None
+    test_client.put(f"/api/v1/study/end_session/{ended}")
+    assert session_contexts.get(ended, test_user.clerk_user_id) is None
+
+    active = _start(test_client, db_session, test_user)
+    response = test_client.post("/api/v1/plan/approve_plan", json={"plan": {
+        "plan_overview": {"target_role": "SRE", "total_daily_minutes": 30, "time_horizon_weeks": 4, "rationale": ""},
+        "plan_topics": [],
+    }})
+    assert response.status_code == 200
+    assert session_contexts.get(active, test_user.clerk_user_id) is None
+
+
+def test_other_users_session_is_not_served_from_cache():
+    cache = SessionContextCache(ttl_seconds=60, max_entries=10)
+    cache.put(SessionContext(1, "owner", topic_id=3, topic_name="Algorithms", topic_description=None))
+
+    assert cache.get(1, "owner").topic_id == 3
+    assert cache.get(1, "someone_else") is None
@@ -0,0 +1,102 @@
+"""
+Tests for auto-closing stale study sessions
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.models.plan import PlanTopic, TopicProgress
+from app.models.question import Question, QuestionAttempt
+from app.api.routes import study
+from app.models.session import StudySession
+from app.services.session_sweeper import sweep_stale_sessions
+
+
+def _session(db_session, user, topic, idle_minutes: float, duration: int, ended: bool = False) -> StudySession:
+    last = datetime.now(timezone.utc) - timedelta(minutes=idle_minutes)
+    session = StudySession(
+        user_id=user.clerk_user_id,
+        topic_id=topic.id,
+        planned_duration=duration,
+        start_time=last - timedelta(minutes=duration),
+        last_interaction_time=last,
+        end_time=last if ended else None,
+    )
+    db_session.add(session)
+    db_session.commit()
+    return session
+
+
+def test_sweep_closes_idle_sessions_in_batches_and_updates_progress(db_session, test_user):
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="Algorithms", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.commit()
+    db_session.add(TopicProgress(user_id=test_user.clerk_user_id, topic_id=topic.id, strength_rating=3, total_time_spent=10))
+    stale = _session(db_session, test_user, topic, idle_minutes=600, duration=30)
+    staler = _session(db_session, test_user, topic, idle_minutes=900, duration=45)
+    active = _session(db_session, test_user, topic, idle_minutes=5, duration=30)
+    ended = _session(db_session, test_user, topic, idle_minutes=900, duration=60, ended=True)
+    question = Question(topic_id=topic.id, question="What is a heap?")
+    db_session.add(question)
+    db_session.flush()
+    db_session.add_all([
+        QuestionAttempt(question_id=question.id, study_session_id=stale.id, raw_answer="a", score_rating=6),
+        QuestionAttempt(question_id=question.id, study_session_id=stale.id, raw_answer="b", score_rating=8),
+    ])
+    db_session.commit()
+
+    closed = sweep_stale_sessions(db_session.get_bind(), idle_minutes=120, batch_size=1, max_batches=5)
+
+    assert closed == 2
+    db_session.expire_all()
+    assert stale.end_time is not None and staler.end_time is not None
+    assert staler.end_time == staler.last_interaction_time
+    assert active.end_time is None
+    progress = db_session.query(TopicProgress).one()
+    assert progress.total_time_spent == 10 + 30 + 45
+    assert progress.strength_rating == 7
+    assert ended.end_time is not None
+    assert sweep_stale_sessions(db_session.get_bind(), idle_minutes=120, batch_size=10, max_batches=5) == 0
+
+
+def test_end_session_after_auto_close_does_not_count_twice(test_client, db_session, test_user):
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="Algorithms", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.commit()
+    session = _session(db_session, test_user, topic, idle_minutes=600, duration=30)
+    sweep_stale_sessions(db_session.get_bind(), idle_minutes=120, batch_size=10, max_batches=1)
+
+    assert test_client.put(f"/api/v1/study/end_session/{session.id}").status_code == 200
+    assert db_session.query(TopicProgress).one().total_time_spent == 30
+
+
+def test_sweep_during_end_session_reconciliation_is_counted_once(test_client, db_session, test_user, monkeypatch):
+    topic = PlanTopic(user_id=test_user.clerk_user_id, name="Algorithms", planned_daily_study_time=30, priority=1)
+    db_session.add(topic)
+    db_session.commit()
+    session = _session(db_session, test_user, topic, idle_minutes=600, duration=30)
+    question = Question(topic_id=topic.id, question="What is a heap?")
+    db_session.add(question)
+    db_session.flush()
+    db_session.add(QuestionAttempt(question_id=question.id, study_session_id=session.id, raw_answer="a", score_rating=6))
+    db_session.commit()
+    reconcile = study.reconcile_session
+    swept = []
+
+    async def reconcile_while_sweeping(attempts):
+        assert not db_session.in_transaction()  # no lock or open transaction held across the LLM call
+        swept.append(sweep_stale_sessions(db_session.get_bind(), idle_minutes=120, batch_size=10, max_batches=1))
+        return await reconcile(attempts)
+
+    monkeypatch.setattr(study, "reconcile_session", reconcile_while_sweeping)
+    assert test_client.put(f"/api/v1/study/end_session/{session.id}").status_code == 200
+    assert swept == [1]
+    assert db_session.query(TopicProgress).one().total_time_spent == 30
+
+
+def test_candidate_scan_uses_partial_index(db_session):
+    plan = db_session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM study_sessions WHERE end_time IS NULL "
+        "AND last_interaction_time < :cutoff ORDER BY last_interaction_time LIMIT 500"
+    ), {"cutoff": "2026-01-01 00:00:00"}).all()
+    assert "ix_study_sessions_open_last_interaction" in " ".join(str(row) for row in plan)